@@ -0,0 +1,248 @@
+"""
+Local fakes of the remote services behind the inference path, served on one
+port: OpenAI embeddings and chat completions (with the function calling
+used for structured output) under /v1, Azure AI Search and the Cosmos DB
+calls of the monitoring writer. Each service answers after a lognormal
+latency around its median and fails a share of the calls with 429 and
+Retry-After, like the real ones under throttling.
+
+    python -m benchmarks.fake_services --port 8900 --latency openai=300 search=60 cosmos=10 --error-rate openai=0.01
+
+Point the app at it with clients.endpoints (benchmarks.load_test does).
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+import time
+import uuid
+
+import numpy as np
+from aiohttp import web
+
+from benchmarks.fakes import fake_vector
+
+SERVICES = ("openai", "search", "cosmos")
+SPAM_WORDS = ("free", "win", "winner", "prize", "claim", "urgent", "cash", "offer", "click")
+
+
+class ServiceProfile:
+    """
+    Latency and error knobs of one fake service.
+    """
+    def __init__(self, latency_ms: float = 0.0, sigma: float = 0.0, error_rate: float = 0.0, error_status: int = 429):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+
+    async def delay(self):
+        if self.latency_ms > 0:
+            await asyncio.sleep(self.latency_ms * random.lognormvariate(0.0, self.sigma) / 1000)
+
+    def should_fail(self) -> bool:
+        self.requests += 1
+        if random.random() < self.error_rate:
+            self.errors += 1
+            return True
+        return False
+
+    def error(self) -> web.Response:
+        return web.json_response(
+            {"error": {"code": str(self.error_status), "message": "Injected by the fake service"}},
+            status=self.error_status,
+            headers={"Retry-After": "0.1", "x-ms-retry-after-ms": "100"},
+        )
+
+    def stats(self) -> dict:
+        return {"latency_ms": self.latency_ms, "sigma": self.sigma, "error_rate": self.error_rate,
+                "requests": self.requests, "errors": self.errors}
+
+
+def fake_label(text: str) -> str:
+    words = text.lower().split()
+    return "spam" if any(word.strip(".,!?:") in SPAM_WORDS for word in words) else "ham"
+
+
+def profiled(service):
+    """
+    Apply the latency and error rate of `service` to a handler.
+    """
+    def decorator(handler):
+        async def wrapper(request):
+            profile = request.app["profiles"][service]
+            await profile.delay()
+            if profile.should_fail():
+                return profile.error()
+            return await handler(request)
+        return wrapper
+    return decorator
+
+
+@profiled("openai")
+async def embeddings(request):
+    body = await request.json()
+    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    data = []
+    for index, text in enumerate(inputs):
+        # Token arrays when the client checks the context length.
+        text = text if isinstance(text, str) else " ".join(map(str, text))
+        vector = fake_vector(text)
+        if body.get("encoding_format") == "base64":
+            vector = base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+        data.append({"object": "embedding", "index": index, "embedding": vector})
+    tokens = sum(len(str(text).split()) for text in inputs)
+    return web.json_response({
+        "object": "list", "data": data, "model": body.get("model"),
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    })
+
+
+@profiled("openai")
+async def chat_completions(request):
+    body = await request.json()
+    content = body["messages"][-1].get("content")
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content)
+    label = fake_label(content or "")
+    arguments = json.dumps({"Classification": label, "Explanation": f"Fake {label} classification"})
+    message = {"role": "assistant", "content": arguments}
+    finish_reason = "stop"
+    if body.get("tools"):
+        function = body["tools"][0]["function"]["name"]
+        message = {
+            "role": "assistant", "content": None,
+            "tool_calls": [{"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+                            "function": {"name": function, "arguments": arguments}}],
+        }
+        finish_reason = "tool_calls"
+    return web.json_response({
+        "id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion", "created": int(time.time()),
+        "model": body.get("model"),
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+        "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+    })
+
+
+@profiled("search")
+async def search(request):
+    body = await request.json()
+    top = body.get("top") or 5
+    examples = request.app["examples"]
+    documents = [
+        {"@search.score": 1.0 / (rank + 1), **examples[(rank + hash(body.get("search") or "")) % len(examples)]}
+        for rank in range(top)
+    ]
+    return web.json_response({"value": documents})
+
+
+async def cosmos_account(request):
+    endpoint = f"{request.scheme}://{request.host}/"
+    location = [{"name": "local", "databaseAccountEndpoint": endpoint}]
+    return web.json_response({
+        "id": "fake", "_rid": request.host, "_self": "", "media": "//media/", "addresses": "//addresses/",
+        "_dbs": "//dbs/", "writableLocations": location, "readableLocations": location,
+        "enableMultipleWriteLocations": False,
+        "userReplicationPolicy": {"asyncReplication": False, "minReplicaSetSize": 1, "maxReplicasetSize": 4},
+        "userConsistencyPolicy": {"defaultConsistencyLevel": "Session"},
+        "systemReplicationPolicy": {"minReplicaSetSize": 1, "maxReplicasetSize": 4},
+        "readPolicy": {"primaryReadCoefficient": 1, "secondaryReadCoefficient": 1},
+        "queryEngineConfiguration": "{}",
+    })
+
+
+@profiled("cosmos")
+async def cosmos_container(request):
+    database, container = request.match_info["database"], request.match_info["container"]
+    return web.json_response({
+        "id": container, "_rid": f"{database}.{container}", "_self": f"dbs/{database}/colls/{container}/",
+        "partitionKey": {"paths": ["/id"], "kind": "Hash"},
+    })
+
+
+@profiled("cosmos")
+async def cosmos_create_item(request):
+    body = await request.json()
+    request.app["cosmos_items"] += 1
+    return web.json_response({**body, "_rid": uuid.uuid4().hex, "_ts": int(time.time())}, status=201)
+
+
+async def stats(request):
+    return web.json_response({
+        "services": {name: profile.stats() for name, profile in request.app["profiles"].items()},
+        "cosmos_items": request.app["cosmos_items"],
+    })
+
+
+def default_examples():
+    return [
+        {"message": "WINNER! Claim your free prize now, reply YES", "label": "spam"},
+        {"message": "Are we still meeting for lunch tomorrow?", "label": "ham"},
+        {"message": "Urgent: your account is suspended, click the link to verify", "label": "spam"},
+        {"message": "Can you pick up milk on the way home", "label": "ham"},
+        {"message": "You have been selected for a cash offer of $1000", "label": "spam"},
+        {"message": "Thanks for yesterday, it was great to see you", "label": "ham"},
+    ]
+
+
+def create_app(profiles: dict) -> web.Application:
+    app = web.Application(client_max_size=32 * 1024 * 1024)
+    app["profiles"] = profiles
+    app["examples"] = default_examples()
+    app["cosmos_items"] = 0
+    app.router.add_post("/v1/embeddings", embeddings)
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/indexes('{index}')/docs/search.post.search", search)
+    app.router.add_get("/", cosmos_account)
+    app.router.add_get("/dbs/{database}/colls/{container}/", cosmos_container)
+    app.router.add_get("/dbs/{database}/colls/{container}", cosmos_container)
+    app.router.add_post("/dbs/{database}/colls/{container}/docs", cosmos_create_item)
+    app.router.add_post("/dbs/{database}/colls/{container}/docs/", cosmos_create_item)
+    app.router.add_get("/_stats", stats)
+    return app
+
+
+def parse_assignments(values, cast=float) -> dict:
+    """
+    {"openai": 300.0} from ["openai=300"].
+    """
+    result = {}
+    for value in values or []:
+        name, _, number = value.partition("=")
+        if name not in SERVICES:
+            raise argparse.ArgumentTypeError(f"Unknown service {name}, expected one of {SERVICES}")
+        result[name] = cast(number)
+    return result
+
+
+def add_profile_arguments(parser):
+    parser.add_argument("--latency", nargs="*", default=["openai=300", "search=60", "cosmos=10"],
+                        help="median latency in ms per service, e.g. openai=300")
+    parser.add_argument("--sigma", type=float, default=0.5, help="sigma of the lognormal latency")
+    parser.add_argument("--error-rate", nargs="*", default=[], help="share of failed calls per service, e.g. openai=0.01")
+    parser.add_argument("--error-status", type=int, default=429)
+
+
+def profiles_from_args(args) -> dict:
+    latency = parse_assignments(args.latency)
+    error_rate = parse_assignments(args.error_rate)
+    return {
+        name: ServiceProfile(latency.get(name, 0.0), args.sigma, error_rate.get(name, 0.0), args.error_status)
+        for name in SERVICES
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    web.run_app(create_app(profiles_from_args(args)), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Local stand-ins for the remote services used by the inference path, so the
+benchmarks can run without credentials or network access.
+"""
+import asyncio
+import hashlib
+import os
+import time
+
+import numpy as np
+
+DUMMY_ENV = {
+    "OPENAI_KEY": "sk-benchmark",
+    "AZURE_SEARCH_SERVICE": "benchmark",
+    "AZURE_SEARCH_INDEX": "benchmark",
+    "AZURE_SEARCH_KEY": "benchmark",
+    "AZURE_COSMOSDB_ACCOUNT": "benchmark",
+    "AZURE_COSMOSDB_ACCOUNT_KEY": "YmVuY2htYXJr",
+    "AZURE_COSMOSDB_DATABASE": "benchmark",
+    "AZURE_COSMOSDB_MONITORING_CONTAINER": "benchmark",
+    "AZURE_COSMOSDB_EVALUATIONS_CONTAINER": "benchmark",
+}
+
+
+def set_dummy_env():
+    """
+    Fill the credentials read through ENV_VARIABLES. Must run before any
+    project module is imported.
+    """
+    for key, value in DUMMY_ENV.items():
+        os.environ.setdefault(key, value)
+
+
+def fake_vector(text, dimensions=1536):
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    rng = np.random.default_rng(seed)
+    vector = rng.standard_normal(dimensions).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeEmbeddings:
+    """
+    Deterministic embeddings with a fixed per-call latency. The sync methods
+    sleep the calling thread, exactly like a blocking HTTP client would.
+    """
+    def __init__(self, latency=0.05, dimensions=1536):
+        self.latency = latency
+        self.dimensions = dimensions
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        time.sleep(self.latency)
+        return fake_vector(text, self.dimensions)
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        time.sleep(self.latency)
+        return [fake_vector(text, self.dimensions) for text in texts]
+
+    async def aembed_query(self, text):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return fake_vector(text, self.dimensions)
+
+    async def aembed_documents(self, texts):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return [fake_vector(text, self.dimensions) for text in texts]
+
+
+def fake_chat_model(classification="spam", explanation="Fake verdict.", latency=0.0):
+    """
+    Chat model answering every request with a ClassificationOutput tool
+    call, supporting with_structured_output(method="function_calling") like
+    ChatOpenAI does.
+    """
+    from typing import Any, List, Optional
+
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, BaseMessage
+    from langchain_core.output_parsers.openai_tools import PydanticToolsParser
+    from langchain_core.outputs import ChatGeneration, ChatResult
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+
+    class FakeStructuredChatModel(BaseChatModel):
+        delay: float = 0.0
+
+        @property
+        def _llm_type(self) -> str:
+            return "fake-structured-chat"
+
+        def _message(self, **kwargs):
+            tools = kwargs.get("tools") or [{"function": {"name": "ClassificationOutput"}}]
+            return AIMessage(content="", tool_calls=[{
+                "name": tools[0]["function"]["name"],
+                "args": {"Classification": classification, "Explanation": explanation},
+                "id": "call_fake",
+            }])
+
+        def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+            if self.delay:
+                time.sleep(self.delay)
+            return ChatResult(generations=[ChatGeneration(message=self._message(**kwargs))])
+
+        async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            return ChatResult(generations=[ChatGeneration(message=self._message(**kwargs))])
+
+        def bind_tools(self, tools, **kwargs):
+            return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+        def with_structured_output(self, schema, *, method="function_calling", include_raw=False, **kwargs):
+            tool_name = convert_to_openai_tool(schema)["function"]["name"]
+            return self.bind_tools([schema], tool_choice=tool_name) | PydanticToolsParser(tools=[schema], first_tool_only=True)
+
+    return FakeStructuredChatModel(delay=latency)
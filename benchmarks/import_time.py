@@ -0,0 +1,77 @@
+"""
+Import-time profile of the app: wall time of `import main` in a fresh
+interpreter, the slowest modules by cumulative import time (python -X
+importtime), and the time until /ready once the lifespan starts.
+
+    python -m benchmarks.import_time --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.fakes import DUMMY_ENV
+
+IMPORT_MAIN = "import time; start = time.perf_counter(); import main; print('import', time.perf_counter() - start)"
+
+READY = """
+import time
+from fastapi.testclient import TestClient
+import main
+start = time.perf_counter()
+with TestClient(main.app) as client:
+    while client.get("/ready").status_code != 200:
+        if not any(m["state"] in ("pending", "loading") for m in main.registry.status()["models"].values()):
+            break
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+print("ready", elapsed)
+"""
+
+
+def run_python(code, *flags):
+    env = {**DUMMY_ENV, **os.environ}
+    return subprocess.run([sys.executable, *flags, "-c", code], capture_output=True, text=True, env=env, check=True)
+
+
+def marked_value(stdout, marker):
+    # The app logs to stdout too, pick the line printed by the snippet.
+    return next(float(line.split()[1]) for line in stdout.splitlines() if line.startswith(marker + " "))
+
+
+def parse_importtime(stderr):
+    """
+    (cumulative us, self us, module) of each line of -X importtime.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--no-ready", action="store_true", help="skip the time to /ready")
+    args = parser.parse_args()
+
+    wall = marked_value(run_python(IMPORT_MAIN).stdout, "import")
+    print(f"import main: {wall * 1000:.0f} ms\n")
+
+    rows = parse_importtime(run_python("import main", "-X", "importtime").stderr)
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, module in sorted(rows, reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {module}")
+
+    if not args.no_ready:
+        start = time.perf_counter()
+        ready = marked_value(run_python(READY).stdout, "ready")
+        print(f"\nlifespan start to /ready: {ready * 1000:.0f} ms (process total {(time.perf_counter() - start) * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
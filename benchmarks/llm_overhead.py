@@ -0,0 +1,96 @@
+"""
+Per-call Python overhead of the LLM classification path against a local fake
+chat model: rebuilding the prompt and the structured runnable on every call
+(the previous behaviour) versus the runnables compiled once at startup.
+
+    python -m benchmarks.llm_overhead --calls 2000
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.fakes import fake_chat_model, set_dummy_env
+
+set_dummy_env()
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+from langchain_core.prompts import ChatPromptTemplate  # noqa: E402
+
+from config.prompt import classification_system_prompt, image_analysis_prompt  # noqa: E402
+from inference.genai.chains import build_classification_prompt  # noqa: E402
+from inference.genai.schemas import ClassificationOutput, get_simple_examples  # noqa: E402
+from inference.multimodal import ImageAnalyser  # noqa: E402
+
+EXAMPLES = get_simple_examples([
+    {"message": f"Example message number {i} claiming a prize", "label": "spam" if i % 2 else "ham"} for i in range(50)
+])
+IMAGE = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+
+
+def legacy_text_runnable(llm):
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", classification_system_prompt),
+        ("human", "# Some classifications examples: {examples} \n\n new message: {text_input}"),
+    ])
+    return prompt | llm.with_structured_output(schema=ClassificationOutput, method="function_calling", include_raw=False)
+
+
+async def legacy_text_call(llm):
+    return await legacy_text_runnable(llm).ainvoke({"text_input": "WIN a prize", "examples": EXAMPLES})
+
+
+async def legacy_image_call(llm):
+    structured_model = llm.with_structured_output(schema=ClassificationOutput, method="function_calling", include_raw=False)
+    return await structured_model.ainvoke([HumanMessage(content=[
+        {"type": "text", "text": image_analysis_prompt},
+        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{IMAGE}"}},
+    ])])
+
+
+async def per_call_us(call, calls, rounds=5):
+    """
+    Best of `rounds` runs, which filters out scheduler and GC noise.
+    """
+    for _ in range(min(50, calls)):
+        await call()
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(calls):
+            await call()
+        timings.append((time.perf_counter() - start) / calls * 1e6)
+    return min(timings)
+
+
+async def build_only(llm):
+    return legacy_text_runnable(llm)
+
+
+async def run(calls):
+    llm = fake_chat_model()
+    runnable = build_classification_prompt() | llm.with_structured_output(
+        schema=ClassificationOutput, method="function_calling", include_raw=False
+    )
+    analyser = ImageAnalyser(llm=llm)
+    analyser.cache = None
+
+    rows = [
+        ("prompt + runnable build", await per_call_us(lambda: build_only(llm), calls)),
+        ("text, rebuilt per call", await per_call_us(lambda: legacy_text_call(llm), calls)),
+        ("text, compiled once", await per_call_us(lambda: runnable.ainvoke({"text_input": "WIN a prize", "examples": EXAMPLES}), calls)),
+        ("image, rebuilt per call", await per_call_us(lambda: legacy_image_call(llm), calls)),
+        ("image, compiled once", await per_call_us(lambda: analyser.apredict(IMAGE), calls)),
+    ]
+    for name, value in rows:
+        print(f"{name:<26} {value:10.1f} us/call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.calls))
+
+
+if __name__ == "__main__":
+    main()
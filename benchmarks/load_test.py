@@ -0,0 +1,256 @@
+"""
+Offline load test: starts benchmarks.fake_services, runs the service under
+gunicorn.conf.py with a copy of the config whose clients.endpoints point at
+the fakes, replays a traffic file at a target rate and reports p50/p95/p99
+latency and throughput per endpoint. No credentials, credits or Azure
+resources are used.
+
+Each line of the traffic file is a request, {"method": "POST", "path":
+"/predict", "json": {...}}, or just {"text": "..."} for /predict. The
+lines are sent in order, cycling, on an open loop schedule so a slow
+service builds up a backlog instead of lowering the offered load.
+
+    python -m benchmarks.load_test --rps 20 --duration 60 --traffic traffic.jsonl --latency openai=400 --error-rate openai=0.02
+
+The report, with the commit and the parameters of the run, is saved as
+JSON under data/reports/load_test/ to compare runs across commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+import numpy as np
+import yaml
+
+from benchmarks.fake_services import add_profile_arguments
+from benchmarks.fakes import DUMMY_ENV
+from config.config import CONFIG_DIR, REPORT_DIR
+
+DEFAULT_TEXTS = [
+    "WINNER! You have won a free cruise, call now to claim your prize",
+    "Hey, are we still on for dinner tonight?",
+    "Your package could not be delivered, confirm your address at the link",
+    "Can you send me the slides from this morning's meeting?",
+    "URGENT: your bank account has been locked, reply with your PIN",
+    "Running 10 minutes late, save me a seat",
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def load_traffic(path):
+    """
+    Requests of the traffic file as (method, path, json), or a mix of
+    /predict and /xgboost/predict over sample messages without one.
+    """
+    if path is None:
+        return [
+            ("POST", endpoint, {"text": text})
+            for text in DEFAULT_TEXTS
+            for endpoint in ("/predict", "/xgboost/predict")
+        ]
+    traffic = []
+    for line in Path(path).read_text().splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        if "path" in item:
+            traffic.append((item.get("method", "POST"), item["path"], item.get("json")))
+        else:
+            traffic.append(("POST", "/predict", {"text": item["text"]}))
+    return traffic
+
+
+def write_config(directory, fakes_url, disable_caches):
+    """
+    Copy of the service config pointing every remote client at the fakes.
+    """
+    config = yaml.safe_load((CONFIG_DIR / "config.yaml").read_text())
+    config["clients"]["endpoints"] = {"openai": f"{fakes_url}/v1", "search": fakes_url, "cosmos": f"{fakes_url}/"}
+    # The tiktoken encoding would be downloaded from the internet.
+    config["embeddings"]["check_ctx_length"] = False
+    config["embeddings"]["cache"]["disk"]["enabled"] = False
+    config["monitoring"]["spill_path"] = str(Path(directory) / "monitoring_spill.jsonl")
+    if disable_caches:
+        config["embeddings"]["cache"]["memory_max_mb"] = 0
+        config["classification_cache"]["enabled"] = False
+    path = Path(directory) / "config.yaml"
+    path.write_text(yaml.safe_dump(config))
+    return path
+
+
+def wait_http(url, timeout, expected=200):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=5).status_code == expected:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} did not answer {expected} in {timeout}s")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def replay(base_url, traffic, rps, duration, poisson, timeout):
+    """
+    Send the traffic at `rps` for `duration` seconds and return
+    (path, status, seconds) of every request, status None on client errors.
+    """
+    results = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        async def send(method, path, body):
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = None
+            results.append((path, status, time.perf_counter() - start))
+
+        tasks = []
+        start = time.perf_counter()
+        scheduled = 0.0
+        for i in range(int(rps * duration)):
+            scheduled += random.expovariate(rps) if poisson else 1 / rps
+            delay = start + scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(*traffic[i % len(traffic)])))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def summarize(results, elapsed):
+    by_path = {}
+    for path, status, seconds in results:
+        by_path.setdefault(path, []).append((status, seconds))
+    by_path["all"] = [(status, seconds) for _, status, seconds in results]
+
+    report = {}
+    for path, rows in by_path.items():
+        latencies = np.array([seconds for _, seconds in rows]) * 1000
+        ok = sum(1 for status, _ in rows if status is not None and status < 400)
+        statuses = {}
+        for status, _ in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        report[path] = {
+            "requests": len(rows),
+            "ok": ok,
+            "error_rate": 1 - ok / len(rows),
+            "throughput_rps": ok / elapsed,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "max_ms": float(latencies.max()),
+            "statuses": statuses,
+        }
+    return report
+
+
+def run(args):
+    traffic = load_traffic(args.traffic)
+    fakes_port, app_port = free_port(), free_port()
+    fakes_url, app_url = f"http://127.0.0.1:{fakes_port}", f"http://127.0.0.1:{app_port}"
+
+    with tempfile.TemporaryDirectory() as directory:
+        config_path = write_config(directory, fakes_url, args.disable_caches)
+        env = {**DUMMY_ENV, **os.environ, "CONFIG_PATH": str(config_path)}
+        fakes = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fake_services", "--port", str(fakes_port),
+             "--latency", *args.latency, "--sigma", str(args.sigma), "--error-rate", *args.error_rate,
+             "--error-status", str(args.error_status)],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        service = None
+        try:
+            wait_http(f"{fakes_url}/_stats", 30)
+            service = subprocess.Popen(
+                [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+                env={**env, "WEB_CONCURRENCY": str(args.workers), "GUNICORN_BIND": f"127.0.0.1:{app_port}"},
+                stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL,
+            )
+            wait_http(f"{app_url}/ready", args.startup_timeout)
+
+            if args.warmup:
+                asyncio.run(replay(app_url, traffic, args.rps, args.warmup, args.poisson, args.timeout))
+            results, elapsed = asyncio.run(replay(app_url, traffic, args.rps, args.duration, args.poisson, args.timeout))
+            telemetry = httpx.get(f"{app_url}/telemetry/stats").json()
+            fakes_stats = httpx.get(f"{fakes_url}/_stats").json()
+        finally:
+            if service is not None:
+                service.terminate()
+                service.wait(timeout=30)
+            fakes.terminate()
+            fakes.wait(timeout=30)
+
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "parameters": {
+            "rps": args.rps, "duration": args.duration, "poisson": args.poisson, "workers": args.workers,
+            "traffic": args.traffic, "disable_caches": args.disable_caches,
+        },
+        "elapsed_seconds": elapsed,
+        "offered_rps": len(results) / elapsed,
+        "endpoints": summarize(results, elapsed),
+        "fakes": fakes_stats,
+        # Stage metrics of the worker that answered the scrape.
+        "telemetry": telemetry,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--traffic", help="JSONL file of requests, a built-in mix if not given")
+    parser.add_argument("--rps", type=float, default=10)
+    parser.add_argument("--duration", type=float, default=30, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of load before measuring")
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival times instead of a fixed rate")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=60, help="client timeout of each request")
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--disable-caches", action="store_true", help="turn off the embedding and classification caches")
+    parser.add_argument("--output", help=f"report path, {REPORT_DIR / 'load_test'}/<time>_<commit>.json by default")
+    parser.add_argument("--verbose", action="store_true", help="show the service logs")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    report = run(args)
+    print(f"{'endpoint':<20} {'requests':>8} {'errors':>7} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for path, stats in report["endpoints"].items():
+        print(f"{path:<20} {stats['requests']:>8} {stats['error_rate']:>6.1%} {stats['throughput_rps']:>7.1f} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}")
+
+    output = Path(args.output) if args.output else (
+        REPORT_DIR / "load_test" / f"{datetime.now():%Y%m%d_%H%M%S}_{report['commit'] or 'unknown'}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nSaved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Recall and latency of the local few-shot index: IVF with several nprobe
+values against the exact brute-force search, plus hybrid (vector + BM25)
+query latency.
+
+    python -m benchmarks.local_index --snapshot data/index/snapshot.jsonl --lists 64
+    python -m benchmarks.local_index --synthetic 50000 --lists 128
+
+Queries are taken from the corpus itself with a little noise added.
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from inference.genai.local_index import LocalVectorIndex, build_index, current_index_path
+
+WORDS = "free win prize call now txt claim urgent hey meeting lunch tomorrow love home reply cash offer".split()
+
+
+def synthetic_snapshot(path, size, dimensions=1536, clusters=200, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(size):
+            vector = centers[rng.integers(clusters)] + 0.5 * rng.standard_normal(dimensions).astype(np.float32)
+            message = " ".join(rng.choice(WORDS, size=rng.integers(3, 20)))
+            f.write(json.dumps({"message": message, "label": "spam" if i % 7 == 0 else "ham", "main_vector": vector.tolist()}) + "\n")
+
+
+def latency_ms(func, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshot")
+    parser.add_argument("--synthetic", type=int, default=20000, help="documents to generate when no snapshot is given")
+    parser.add_argument("--lists", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top", type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    snapshot = args.snapshot
+    if snapshot is None:
+        snapshot = f"{workdir}/snapshot.jsonl"
+        synthetic_snapshot(snapshot, args.synthetic)
+
+    build_index(snapshot, workdir, n_lists=args.lists)
+    index = LocalVectorIndex(current_index_path(workdir))
+    print(f"documents: {index.size}  dimensions: {index.dimensions}  lists: {args.lists}  top: {args.top}")
+
+    rng = np.random.default_rng(1)
+    query_ids = rng.choice(index.size, size=min(args.queries, index.size), replace=False)
+    queries = [
+        (index.documents[i]["message"], np.asarray(index.vectors[i]) + 0.01 * rng.standard_normal(index.dimensions).astype(np.float32))
+        for i in query_ids
+    ]
+    exact = [set(index.vector_search(vector, args.top)[0].tolist()) for _, vector in queries]
+
+    p50, p95 = latency_ms(lambda q: index.vector_search(q[1], args.top), queries)
+    print(f"{'exact':>12}  recall@{args.top}: 1.000  p50: {p50:7.3f} ms  p95: {p95:7.3f} ms")
+
+    if args.lists:
+        for nprobe in (1, 2, 4, 8, 16, 32):
+            if nprobe > args.lists:
+                break
+            recall = np.mean([
+                len(set(index.vector_search(vector, args.top, nprobe)[0].tolist()) & truth) / len(truth)
+                for (_, vector), truth in zip(queries, exact)
+            ])
+            p50, p95 = latency_ms(lambda q: index.vector_search(q[1], args.top, nprobe), queries)
+            print(f"{f'nprobe={nprobe}':>12}  recall@{args.top}: {recall:.3f}  p50: {p50:7.3f} ms  p95: {p95:7.3f} ms")
+
+    p50, p95 = latency_ms(lambda q: index.search(q[0], q[1], args.top, use_hybrid=True), queries)
+    print(f"{'hybrid':>12}  exact vector + BM25 (RRF)    p50: {p50:7.3f} ms  p95: {p95:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Measure event loop lag while /xgboost/predict serves concurrent requests.
+
+A monitor coroutine sleeps for a fixed interval and records how late it
+wakes up. If anything in the request path blocks the loop (a sync embedding
+call, booster predict on the loop thread) the lag grows with the embedding
+latency; with the executor backed engine it stays near zero.
+
+    python -m benchmarks.loop_lag --requests 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.fakes import FakeEmbeddings, set_dummy_env
+
+set_dummy_env()
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from routers.predict import registry, router  # noqa: E402
+
+
+async def monitor_loop(stop, interval, lags):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def measure(n_requests, concurrency, embedding_latency, interval):
+    """
+    Loop lags in ms of the monitor while `n_requests` go through
+    /xgboost/predict, and the seconds they took.
+    """
+    xgboost_manager = await registry.get("xgboost")
+    xgboost_manager.model.vectorizer = FakeEmbeddings(latency=embedding_latency)
+
+    app = FastAPI()
+    app.include_router(router)
+
+    lags = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_loop(stop, interval, lags))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def call(i):
+            async with semaphore:
+                response = await client.post("/xgboost/predict", json={"text": f"WIN a free prize now {i}"})
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(call(i) for i in range(n_requests)))
+        elapsed = time.perf_counter() - start
+
+    stop.set()
+    await monitor
+    return np.array(lags) * 1000, elapsed
+
+
+async def run(n_requests, concurrency, embedding_latency, interval):
+    lags_ms, elapsed = await measure(n_requests, concurrency, embedding_latency, interval)
+    xgboost_manager = await registry.get("xgboost")
+    xgboost_manager.model.engine.shutdown()
+
+    print(f"requests: {n_requests}  concurrency: {concurrency}  embedding latency: {embedding_latency * 1000:.0f} ms")
+    print(f"throughput: {n_requests / elapsed:.1f} req/s")
+    print(f"loop lag  p50: {np.percentile(lags_ms, 50):.2f} ms  p99: {np.percentile(lags_ms, 99):.2f} ms  max: {lags_ms.max():.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="seconds")
+    parser.add_argument("--interval", type=float, default=0.005, help="monitor tick in seconds")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency, args.embedding_latency, args.interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Microbenchmarks of the CPU bound pieces of the request path, compared with
+stored baselines: the run fails (exit code 1) when a case is slower than
+its baseline by more than the threshold. Nothing touches the network.
+
+Each round of a case is timed between two rounds of a fixed calibration
+loop, and the gate compares the median over rounds of the case time
+divided by the calibration time. A machine that is slower for a while
+(other tenants, frequency scaling) slows both alike, so the ratio stays
+put where the raw microseconds drift by up to 50%.
+
+    python -m benchmarks.microbench                      # compare with benchmarks/baselines.json
+    python -m benchmarks.microbench --threshold 0.5 --only booster
+    python -m benchmarks.microbench --save-baseline      # record the current numbers
+
+Baselines only mean something on the machine they were recorded on;
+record them again there after an intended change in speed.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.fakes import set_dummy_env
+
+set_dummy_env()
+
+from fastapi.responses import ORJSONResponse  # noqa: E402
+
+from inference.genai.schemas import (  # noqa: E402
+    ClassificationOutputEx, get_classification_examples, get_simple_examples, tool_example_to_messages,
+)
+from inference.telemetry import Telemetry  # noqa: E402
+from inference.xgboost import booster_predict_proba, load_booster  # noqa: E402
+from modeling.preprocessing import preprocess_text, stem  # noqa: E402
+
+BASELINES_PATH = Path(__file__).parent / "baselines.json"
+# Default allowed slowdown. Set above the spread of the relative costs over
+# repeated runs of an unchanged tree, which stays within about 20%.
+THRESHOLD = 0.3
+
+SHORT_SMS = "Free entry in 2 a wkly comp to win FA Cup final tkts 21st May 2005. Text FA to 87121 to receive entry"
+LONG_SMS = " ".join([
+    "Hi there, just wanted to check whether you are still coming to the meeting tomorrow at the office.",
+    "URGENT! Your mobile number has been awarded a 2000 pound prize guaranteed, call 09061790121 from a land line.",
+    "I was thinking we could grab lunch afterwards and go through the quarterly numbers together if you have time.",
+]) * 4
+RETRIEVED_DOCS = [
+    {"message": f"{SHORT_SMS} #{i}" if i % 2 else f"Are we still on for dinner tonight? #{i}",
+     "label": "spam" if i % 2 else "ham", "score": 1.0 / (i + 1)}
+    for i in range(50)
+]
+
+CASES = {}
+
+
+def case(name):
+    """
+    Register a benchmark: the decorated function does the setup and returns
+    the callable that is timed.
+    """
+    def decorator(setup):
+        CASES[name] = setup
+        return setup
+    return decorator
+
+
+@case("preprocess_text/short")
+def preprocess_short():
+    preprocess_text(SHORT_SMS)
+    return lambda: preprocess_text(SHORT_SMS)
+
+
+@case("preprocess_text/long")
+def preprocess_long():
+    preprocess_text(LONG_SMS)
+    return lambda: preprocess_text(LONG_SMS)
+
+
+@case("preprocess_text/long_cold_stems")
+def preprocess_long_cold():
+    def run():
+        stem.cache_clear()
+        preprocess_text(LONG_SMS)
+    return run
+
+
+@case("get_simple_examples/50")
+def simple_examples():
+    return lambda: get_simple_examples(RETRIEVED_DOCS)
+
+
+@case("get_classification_examples/50")
+def classification_examples():
+    return lambda: get_classification_examples(RETRIEVED_DOCS)
+
+
+@case("tool_example_to_messages/1")
+def tool_example():
+    example = {"input": f"message: {SHORT_SMS}", "tool_calls": [ClassificationOutputEx(Classification="spam")]}
+    return lambda: tool_example_to_messages(example)
+
+
+def booster_case(batch_size):
+    def setup():
+        booster, metadata = load_booster(nthread=1)
+        matrix = np.random.default_rng(0).standard_normal((batch_size, metadata["num_features"])).astype(np.float32)
+        return lambda: booster_predict_proba(booster, matrix)
+    return setup
+
+
+for _batch_size in (1, 8, 32, 128, 256):
+    case(f"booster_predict/{_batch_size}")(booster_case(_batch_size))
+
+
+@case("predict_response/orjson")
+def predict_response():
+    def result(model, explanation=None):
+        metadata = {"time": 0.412, "input_text": SHORT_SMS, "probability": 0.93}
+        if explanation:
+            metadata = {"time": 0.812, "explanation": explanation, "cache_hit": False,
+                        "examples": {"retrieved": 50, "selected": 12, "labels": {"spam": 6, "ham": 6}}}
+        return {"id_pred": "1b4e28ba-2fa1-11d2-883f-0016d3cca427", "result": "spam", "metadata": metadata}
+    response = {
+        "id": "6fa459ea-ee8a-3ca4-894e-db77e160355e",
+        "predId": "886313e1-3b8a-5372-9b90-0c9aee199e5d",
+        "time": "2024-06-01 12:00:00",
+        "xgboost": result("xgboost"),
+        "gpt-4o": result("gpt-4o", "The message promises a prize and asks to text a short code."),
+        "gpt-4o-mini": result("gpt-4o-mini", "Typical premium rate competition spam."),
+        "image": {},
+    }
+    return lambda: ORJSONResponse(response).body
+
+
+@case("telemetry/span")
+def telemetry_span():
+    telemetry = Telemetry()
+
+    def run():
+        with telemetry.span("bench", "microbench"):
+            pass
+    return run
+
+
+_CALIBRATION_MATRIX = np.random.default_rng(0).standard_normal((64, 64))
+
+
+def calibration():
+    """
+    Fixed mix of the work the cases do: bytecode, dict and string
+    operations and a small NumPy product.
+    """
+    counts = {}
+    for i in range(500):
+        key = f"w{i % 61}"
+        counts[key] = counts.get(key, 0) + i * i
+    _CALIBRATION_MATRIX @ _CALIBRATION_MATRIX
+    return counts
+
+
+def _calls(timer, min_time):
+    number, elapsed = timer.autorange()
+    return max(1, int(number * min_time / max(elapsed, 1e-9)))
+
+
+def measure(func, rounds, min_time):
+    """
+    Median time per call in microseconds over `rounds` rounds of about
+    `min_time` seconds, and the median of each round divided by the mean
+    of the calibration rounds timed just before and after it.
+    """
+    case_timer, calibration_timer = timeit.Timer(func), timeit.Timer(calibration)
+    case_calls = _calls(case_timer, min_time)
+    calibration_calls = _calls(calibration_timer, min_time / 2)
+
+    def calibration_round():
+        return calibration_timer.timeit(calibration_calls) / calibration_calls
+
+    times, relative = [], []
+    before = calibration_round()
+    for _ in range(rounds):
+        case = case_timer.timeit(case_calls) / case_calls
+        after = calibration_round()
+        times.append(case)
+        relative.append(case / ((before + after) / 2))
+        before = after
+    return statistics.median(times) * 1e6, statistics.median(relative)
+
+
+def machine():
+    return {"python": platform.python_version(), "machine": platform.machine(), "processor": platform.processor() or None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baselines", default=str(BASELINES_PATH))
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed slowdown over the baseline relative cost, 0.3 = 30%%")
+    parser.add_argument("--only", help="run the cases whose name contains this text")
+    parser.add_argument("--rounds", type=int, default=15)
+    parser.add_argument("--min-time", type=float, default=0.1, help="seconds of each round")
+    parser.add_argument("--retries", type=int, default=2, help="measurements again of a case over the threshold")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store the results, the median of three measurements per case, as the new baselines")
+    args = parser.parse_args()
+
+    path = Path(args.baselines)
+    stored = json.loads(path.read_text()) if path.exists() else {"machine": None, "results": {}}
+    # Baselines of raw times only, from before the calibration, are not comparable.
+    baselines = {name: value for name, value in stored["results"].items() if isinstance(value, dict)}
+    if stored["machine"] and stored["machine"] != machine() and not args.save_baseline:
+        print(f"warning: baselines recorded on {stored['machine']}, running on {machine()}\n")
+
+    results, regressions = {}, []
+    print(f"{'case':<34} {'us/call':>10} {'relative':>10} {'baseline':>10} {'ratio':>7}")
+    for name, setup in CASES.items():
+        if args.only and args.only not in name:
+            continue
+        func = setup()
+        measurements = [measure(func, args.rounds, args.min_time) for _ in range(3 if args.save_baseline else 1)]
+        us, relative = sorted(measurements, key=lambda m: m[1])[len(measurements) // 2]
+        baseline = baselines.get(name, {}).get("relative")
+        for _ in range(args.retries):
+            if not baseline or relative <= baseline * (1 + args.threshold):
+                break
+            # Measure a suspected regression again before failing the run on noise.
+            us, relative = min((us, relative), measure(func, args.rounds, args.min_time), key=lambda m: m[1])
+        results[name] = {"us": us, "relative": relative}
+        ratio = relative / baseline if baseline else None
+        flag = ""
+        if ratio is not None and ratio > 1 + args.threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<34} {us:>10.2f} {relative:>10.3f} {baseline or float('nan'):>10.3f} "
+              f"{ratio or float('nan'):>6.2f}x{flag}")
+
+    if args.save_baseline:
+        path.write_text(json.dumps({"machine": machine(), "results": {**baselines, **results}}, indent=2) + "\n")
+        print(f"\nBaselines saved to {path}")
+        return
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Compare the original per-call preprocessing with modeling.preprocessing on
+the training CSV, checking that both produce identical output.
+
+    python -m benchmarks.preprocessing --path data/train/train.csv --jobs 4
+"""
+import argparse
+import re
+import time
+
+import pandas as pd
+from nltk.corpus import stopwords
+from nltk.stem.porter import PorterStemmer
+
+from modeling.preprocessing import preprocess_batch, stem
+from modeling.utils import load_config
+from config.config import BASE_DIR
+
+config = load_config()
+
+
+def legacy_preprocess_text(text):
+    ps = PorterStemmer()
+    sms = re.sub('[^a-zA-Z]', ' ', text)
+    sms = sms.lower()
+    sms = sms.split()
+    sms = [ps.stem(word) for word in sms if word not in stopwords.words('english')]
+    sms = ' '.join(sms)
+    return sms
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=str(BASE_DIR / config['data']['raw_data_path']))
+    parser.add_argument("--jobs", type=int, default=config['training']['preprocess_jobs'])
+    args = parser.parse_args()
+
+    messages = pd.read_csv(args.path)['message']
+    print(f"messages: {len(messages)}")
+
+    legacy, legacy_time = timed(messages.apply, legacy_preprocess_text)
+    print(f"legacy apply:         {legacy_time:8.3f} s")
+
+    stem.cache_clear()
+    cold, cold_time = timed(preprocess_batch, messages)
+    print(f"batch (cold stems):   {cold_time:8.3f} s  x{legacy_time / cold_time:.1f}")
+
+    warm, warm_time = timed(preprocess_batch, messages)
+    print(f"batch (warm stems):   {warm_time:8.3f} s  x{legacy_time / warm_time:.1f}")
+
+    if args.jobs > 1:
+        parallel, parallel_time = timed(preprocess_batch, messages, n_jobs=args.jobs, chunksize=max(1, len(messages) // (args.jobs * 4)))
+        print(f"batch ({args.jobs} processes):  {parallel_time:8.3f} s  x{legacy_time / parallel_time:.1f}")
+        assert parallel.equals(legacy), "parallel output differs from the legacy implementation"
+
+    assert cold.equals(legacy) and warm.equals(legacy), "output differs from the legacy implementation"
+    print("outputs identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Latency and Python memory peak of /predict for 1-5 MB images sent as base64
+inside JSON, as a multipart file and as the raw request body. Every model
+and remote service is replaced by a local fake, so the numbers only cover
+request parsing, the image stage and response encoding.
+
+    python -m benchmarks.upload --sizes 1 2 5 --requests 10
+"""
+import argparse
+import base64
+import io
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.fakes import FakeEmbeddings, fake_chat_model, set_dummy_env
+
+set_dummy_env()
+
+from fastapi.testclient import TestClient  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from main import app  # noqa: E402
+from inference.models import ModelManager  # noqa: E402
+from inference.multimodal import ImageAnalyser  # noqa: E402
+from routers import predict  # noqa: E402
+
+
+async def fake_prediction(text, context=None):
+    return {"id_pred": "fake", "result": "ham", "metadata": {}}
+
+
+def install_fakes():
+    for model_type in predict.TEXT_MODELS:
+        # The real XGBoost predictor still preprocesses the text in run_models.
+        manager = predict.load_manager(model_type) if model_type == "xgboost" else ModelManager(model_type=model_type)
+        manager.apredict = fake_prediction
+        predict.registry.provide(model_type, manager)
+    embedding_model = FakeEmbeddings(latency=0)
+    predict.get_embedding_model = lambda model: embedding_model
+    multimodal_analyser = ImageAnalyser(llm=fake_chat_model())
+    # Every request must go through the image stage and the model call.
+    multimodal_analyser.cache = None
+    predict.registry.provide("image", multimodal_analyser)
+    predict.registry.enabled.discard("cascade")
+    predict.send_data_to_cosmos = lambda data: None
+
+
+def make_jpeg(megabytes: float) -> bytes:
+    """
+    Noise JPEG of roughly `megabytes`, noise barely compresses.
+    """
+    side = int((megabytes * 1024 * 1024 / 0.9) ** 0.5)
+    pixels = np.random.default_rng(0).integers(0, 255, (side, side, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def measure(send, requests):
+    """
+    Median latency, then the allocation peak of one traced request, since
+    tracing slows down the parsers.
+    """
+    send().raise_for_status()
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        send()
+        latencies.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    send()
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return statistics.median(latencies), peak
+
+
+def run(sizes, requests):
+    install_fakes()
+    client = TestClient(app)
+    print(f"{'image':>8} {'variant':<10} {'body MB':>8} {'p50 ms':>8} {'peak MB':>8}")
+    for megabytes in sizes:
+        image = make_jpeg(megabytes)
+        image_base64 = base64.b64encode(image).decode("ascii")
+        variants = {
+            "json": (len(image_base64), lambda: client.post("/predict", json={"text": "hello", "image": image_base64})),
+            "multipart": (len(image), lambda: client.post("/predict/upload", data={"text": "hello"}, files={"image": ("image.jpg", image, "image/jpeg")})),
+            "raw": (len(image), lambda: client.post("/predict/image", params={"text": "hello"}, content=image, headers={"content-type": "image/jpeg"})),
+        }
+        for name, (body_size, send) in variants.items():
+            latency, peak = measure(send, requests)
+            print(f"{len(image) / 1024 / 1024:>7.1f}M {name:<10} {body_size / 1024 / 1024:>8.2f} {latency:>8.1f} {peak:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 2, 5], help="image sizes in MB")
+    parser.add_argument("--requests", type=int, default=10)
+    args = parser.parse_args()
+    run(args.sizes, args.requests)
+
+
+if __name__ == "__main__":
+    main()
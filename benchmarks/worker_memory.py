@@ -0,0 +1,127 @@
+"""
+Memory per gunicorn worker with and without preload_app: starts the service
+with gunicorn.conf.py, waits until /ready, and reads RSS, PSS and private
+memory of the master and each worker from /proc/<pid>/smaps_rollup. PSS
+splits shared pages between the processes that map them, so its total is
+what the service really costs. Linux only; remote services are not called,
+so this is the memory after startup and the warm-up predict.
+
+    python -m benchmarks.worker_memory --workers 1 2 4 --output data/reports/worker_memory.json
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from benchmarks.fakes import DUMMY_ENV
+
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def smaps_rollup(pid):
+    """
+    Memory of a process in MB, by field of /proc/<pid>/smaps_rollup.
+    """
+    values = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+        name, _, rest = line.partition(":")
+        if name in FIELDS:
+            values[name] = int(rest.split()[0]) / 1024
+    values["Private"] = values["Private_Clean"] + values["Private_Dirty"]
+    return values
+
+
+def children(pid):
+    return [int(child) for child in Path(f"/proc/{pid}/task/{pid}/children").read_text().split()]
+
+
+def wait_ready(url, workers, timeout):
+    """
+    Poll /ready until it answered 200 enough times in a row that every
+    worker has most likely finished its lifespan.
+    """
+    deadline = time.monotonic() + timeout
+    streak = 0
+    while streak < workers * 10:
+        if time.monotonic() > deadline:
+            raise TimeoutError("The service did not get ready in time")
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                streak = streak + 1 if response.status == 200 else 0
+        except (urllib.error.URLError, ConnectionError):
+            streak = 0
+            time.sleep(0.2)
+
+
+def measure(workers, preload, timeout):
+    port = free_port()
+    env = {
+        **DUMMY_ENV,
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+        "GUNICORN_PRELOAD": "1" if preload else "0",
+    }
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(f"http://127.0.0.1:{port}/ready", workers, timeout)
+        # Let the lifespans finish their background work.
+        time.sleep(1)
+        return {
+            "master": smaps_rollup(master.pid),
+            "workers": [smaps_rollup(pid) for pid in children(master.pid)],
+        }
+    finally:
+        master.terminate()
+        master.wait(timeout=30)
+
+
+def summary(result):
+    processes = [result["master"], *result["workers"]]
+    return {
+        "worker_rss_mb": sum(w["Rss"] for w in result["workers"]) / len(result["workers"]),
+        "worker_pss_mb": sum(w["Pss"] for w in result["workers"]) / len(result["workers"]),
+        "worker_private_mb": sum(w["Private"] for w in result["workers"]) / len(result["workers"]),
+        "total_pss_mb": sum(p["Pss"] for p in processes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--output", help="also write the measurements as JSON")
+    args = parser.parse_args()
+
+    report = []
+    print(f"{'workers':>7} {'preload':>7} {'RSS/worker':>11} {'PSS/worker':>11} {'private/worker':>15} {'total PSS':>10}")
+    for workers in args.workers:
+        for preload in (False, True):
+            result = measure(workers, preload, args.timeout)
+            row = {"workers": workers, "preload": preload, **summary(result), **result}
+            report.append(row)
+            print(f"{workers:>7} {str(preload):>7} {row['worker_rss_mb']:>8.1f} MB {row['worker_pss_mb']:>8.1f} MB "
+                  f"{row['worker_private_mb']:>12.1f} MB {row['total_pss_mb']:>7.1f} MB")
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Load time and predict latency of the pickled XGBClassifier (sklearn API)
+against the native UBJSON booster with inplace_predict.
+
+    python -m benchmarks.xgboost_predict --calls 2000 --batch-size 32
+"""
+import argparse
+import pickle
+import statistics
+import time
+import warnings
+
+import numpy as np
+
+from benchmarks.fakes import set_dummy_env
+
+set_dummy_env()
+
+from inference.xgboost import booster_predict_proba, load_booster  # noqa: E402
+
+
+def load_time_ms(load, rounds=5):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        load()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def per_call_us(predict, matrix, calls):
+    for _ in range(min(100, calls)):
+        predict(matrix)
+    start = time.perf_counter()
+    for _ in range(calls):
+        predict(matrix)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def load_pickle(path):
+    with warnings.catch_warnings():
+        # Pickles of older XGBoost versions warn on every load.
+        warnings.simplefilter("ignore")
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def run(pickle_path, booster_path, calls, batch_size, nthread):
+    classifier = load_pickle(pickle_path)
+    booster, metadata = load_booster(booster_path, nthread=nthread)
+    rng = np.random.default_rng(0)
+    single = rng.standard_normal((1, metadata["num_features"])).astype(np.float32)
+    batch = rng.standard_normal((batch_size, metadata["num_features"])).astype(np.float32)
+
+    expected = classifier.predict_proba(batch)[:, 1]
+    actual = booster_predict_proba(booster, batch)
+    print(f"max abs difference of the probabilities: {np.abs(expected - actual).max():.2e}\n")
+
+    rows = [
+        ("load", "ms", load_time_ms(lambda: load_pickle(pickle_path)), load_time_ms(lambda: load_booster(booster_path))),
+        ("predict 1 row", "us", per_call_us(lambda m: classifier.predict_proba(m)[:, 1], single, calls),
+         per_call_us(lambda m: booster_predict_proba(booster, m), single, calls)),
+        (f"predict {batch_size} rows", "us", per_call_us(lambda m: classifier.predict_proba(m)[:, 1], batch, calls),
+         per_call_us(lambda m: booster_predict_proba(booster, m), batch, calls)),
+    ]
+    print(f"{'':<18} {'pickle':>12} {'booster':>12} {'speedup':>8}")
+    for name, unit, legacy, native in rows:
+        print(f"{name:<18} {legacy:>9.1f} {unit} {native:>9.1f} {unit} {legacy / native:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pickle-path", default="models/spam_model.pkl")
+    parser.add_argument("--booster-path", default="models/spam_model.ubj")
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--nthread", type=int, default=1)
+    args = parser.parse_args()
+    run(args.pickle_path, args.booster_path, args.calls, args.batch_size, args.nthread)
+
+
+if __name__ == "__main__":
+    main()
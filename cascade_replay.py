@@ -0,0 +1,126 @@
+"""
+Replay the validation set used by evaluation.py through the current
+always-run-everything /predict policy and through the cascade, and report
+the latency and LLM call savings of the cascade.
+
+    python cascade_replay.py --sample 200 --lower 0.1 --upper 0.9
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score
+
+from inference.cascade import CascadePolicy
+from inference.context import FeatureContext
+from inference.embeddings import get_embedding_model
+from inference.models import ModelManager
+from modeling.data import load_valid_dataset
+from modeling.utils import load_config
+
+from config.config import get_logger, REPORT_DIR
+
+logger = get_logger(__name__)
+config = load_config()
+
+TEXT_MODELS = ("xgboost", "gpt-4o-mini", "gpt-4o")
+
+
+def load_managers():
+    managers = {}
+    for model_type in TEXT_MODELS:
+        managers[model_type] = ModelManager(model_type=model_type)
+        managers[model_type].load_model()
+        # Cached verdicts would make the second policy look free.
+        if hasattr(managers[model_type].model, "cache"):
+            managers[model_type].model.cache = None
+    return managers
+
+
+async def run_all(managers, text, embedding_model):
+    context = FeatureContext(embedding_model)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(managers[m].apredict(text, context=context) for m in TEXT_MODELS))
+    elapsed = time.perf_counter() - start
+    by_model = dict(zip(TEXT_MODELS, results))
+    # Majority vote of the three models stands for the ensemble verdict.
+    votes = [r["result"] for r in results]
+    return {"result": max(set(votes), key=votes.count), "latency": elapsed, "llm_calls": 2, "models": by_model}
+
+
+async def run_cascade(policy, text, embedding_model):
+    context = FeatureContext(embedding_model)
+    start = time.perf_counter()
+    results = await policy.apredict(text, context=context)
+    elapsed = time.perf_counter() - start
+    stages = results["cascade"]["stages"]
+    return {"result": results["cascade"]["result"], "latency": elapsed, "llm_calls": len(stages) - 1, "stages": stages}
+
+
+def summarize(name, rows, labels):
+    latencies = np.array([r["latency"] for r in rows]) * 1000
+    return {
+        "policy": name,
+        "accuracy": accuracy_score(labels, [r["result"] for r in rows]),
+        "latency_ms_mean": float(latencies.mean()),
+        "latency_ms_p50": float(np.percentile(latencies, 50)),
+        "latency_ms_p95": float(np.percentile(latencies, 95)),
+        "llm_calls": int(sum(r["llm_calls"] for r in rows)),
+    }
+
+
+async def replay(sample, lower, upper):
+    df_valid = load_valid_dataset()
+    if sample:
+        df_valid = df_valid.sample(n=min(sample, len(df_valid)), random_state=42)
+    texts, labels = df_valid["message"].tolist(), df_valid["label"].tolist()
+
+    managers = load_managers()
+    policy = CascadePolicy(managers["xgboost"], managers["gpt-4o-mini"], managers["gpt-4o"], lower=lower, upper=upper)
+
+    # Warm the embedding cache so both policies pay the same embedding cost.
+    embedding_model = get_embedding_model("text-embedding-3-small")
+    xgboost = managers["xgboost"].model
+    await embedding_model.aembed_documents(texts + xgboost.preprocess_texts(texts))
+
+    all_rows, cascade_rows = [], []
+    for text in texts:
+        all_rows.append(await run_all(managers, text, embedding_model))
+        cascade_rows.append(await run_cascade(policy, text, embedding_model))
+
+    baseline = summarize("all-models", all_rows, labels)
+    cascade = summarize("cascade", cascade_rows, labels)
+    stages = pd.Series([r["stages"][-1] for r in cascade_rows]).value_counts().to_dict()
+    report = {
+        "messages": len(texts),
+        "band": [lower, upper],
+        "policies": [baseline, cascade],
+        "decided_by": stages,
+        "llm_calls_saved": 1 - cascade["llm_calls"] / baseline["llm_calls"],
+        "mean_latency_saved": 1 - cascade["latency_ms_mean"] / baseline["latency_ms_mean"],
+    }
+    return report
+
+
+def main():
+    cascade_config = config['cascade']
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sample", type=int, default=20, help="messages to replay, 0 for the whole set")
+    parser.add_argument("--lower", type=float, default=cascade_config['lower'])
+    parser.add_argument("--upper", type=float, default=cascade_config['upper'])
+    args = parser.parse_args()
+
+    report = asyncio.run(replay(args.sample, args.lower, args.upper))
+    print(json.dumps(report, indent=2))
+
+    REPORT_DIR.mkdir(parents=True, exist_ok=True)
+    output_path = REPORT_DIR / f"cascade_replay_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output_path.write_text(json.dumps(report, indent=2))
+    logger.info(f"Report saved to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
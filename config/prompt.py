@@ -3,6 +3,39 @@ import uuid
 from langchain_core.pydantic_v1 import BaseModel, Field
 
 
+# Bump when a prompt changes so cached verdicts of the old one are not reused.
+# Also part of the verdict cache keys, so text and image versions must never
+# be equal: the "image:" prefix keeps both modalities apart for the same model.
+classification_prompt_version = "v2"
+image_analysis_prompt_version = "image:v2"
+
+classification_system_prompt = """You are a classifier model designed to determine whether a message is spam or ham (non-spam). Your task is to read the incoming message and classify it into one of these two categories:
+
+Spam: A message that is unsolicited, promotional, or attempting to deceive the recipient.
+Ham: A legitimate message that does not have the characteristics of spam.
+
+For each message, provide the following:
+- The classification (spam or ham).
+- A short explanation justifying why the message fits the category you selected. Use clear and concise reasoning based on features such as:
+        Unsolicited promotional content.
+        Use of financial incentives, prizes, or promotions.
+        Presence of suspicious links or requests for personal information.
+        Informal or irrelevant content typical of personal or legitimate communications.
+
+Here are a few examples of your responses:
+
+Example 1:
+Message: "Free entry in a competition to win £1000! Text WIN to 12345 now."
+Classification: spam.
+Explanation: The message promotes a contest with financial incentives and includes a request for the recipient to take an action (text WIN), which is typical of spam.
+
+Example 2:
+Message: "Hey, are we still meeting for lunch tomorrow?"
+Classification: ham.
+Explanation: This is a personal message without any promotional content or suspicious elements, typical of legitimate communication.
+
+Instructions: After classifying each message, always provide a clear and relevant justification based on the message’s content."""
+
 image_analysis_prompt = """
 You are an image analysis model tasked with determining whether an image is spam or ham. Your job is to carefully analyze the input images and classify them as follows:
 
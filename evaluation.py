@@ -6,8 +6,9 @@ from sklearn.metrics import classification_report
 from azure.cosmos import CosmosClient, exceptions
 
 from inference.models import ModelManager
+from modeling.data import load_valid_dataset
 
-from config.config import get_logger, DATA_DIR, ENV_VARIABLES
+from config.config import get_logger, ENV_VARIABLES
 
 logger = get_logger(__name__)
 
@@ -27,10 +28,6 @@ gpt_4o_manager.load_model()
 gpt_4o_mini_manager = ModelManager(model_type="gpt-4o-mini")
 gpt_4o_mini_manager.load_model()
 
-def load_valid_dataset():
-    df_valid = pd.read_csv(DATA_DIR / "valid"/ "sample.csv")
-    return df_valid
-
 async def evaluate_models():
     df_valid = load_valid_dataset()
     df_valid = df_valid.sample(n=20, random_state=42)
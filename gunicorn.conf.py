@@ -0,0 +1,56 @@
+"""
+gunicorn settings of the service: `gunicorn -c gunicorn.conf.py main:app`.
+
+With preload the app is imported once in the master, which also loads the
+read-only model artifacts (routers.predict.preload_shared_artifacts) before
+forking, so the workers share those pages copy-on-write. The models
+themselves, their thread pools and the warm-up predict are still built by
+the lifespan of each worker, after the fork.
+"""
+import gc
+import os
+
+from modeling.utils import load_config
+
+server_config = load_config()['server']
+
+workers = int(os.environ.get("WEB_CONCURRENCY", server_config['workers']))
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = os.environ.get("GUNICORN_BIND", server_config['bind'])
+timeout = server_config['timeout']
+preload_app = os.environ.get("GUNICORN_PRELOAD", str(server_config['preload'])).lower() in ("1", "true", "yes")
+
+cpus = server_config['cpus'] or len(os.sched_getaffinity(0))
+threads_per_worker = max(1, cpus // workers)
+
+# Set before the app imports numpy, so BLAS and OpenMP pools of each worker
+# stay inside its share of the cores.
+for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(variable, str(threads_per_worker))
+
+if preload_app:
+    # Collections in the master would rewrite the GC headers of objects the
+    # workers share. Off until gc.freeze() in when_ready moves them out of
+    # the collected generations, then on again in the master and the workers.
+    gc.disable()
+
+
+def when_ready(server):
+    """
+    Runs in the master after the app is imported and before the workers
+    are forked.
+    """
+    if not preload_app:
+        return
+    from routers.predict import preload_shared_artifacts
+    preload_shared_artifacts()
+    gc.freeze()
+    # Workers forked from here on inherit it enabled.
+    gc.enable()
+    server.log.info(f"Shared artifacts preloaded, {gc.get_freeze_count()} objects frozen")
+
+
+def post_fork(server, worker):
+    from inference.engine import set_thread_budget
+    set_thread_budget(threads_per_worker)
+    server.log.info(f"Worker {worker.pid} started with {threads_per_worker} threads")
@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+from inference.metrics import Histogram
+from config.config import get_logger
+
+logger = get_logger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_WAIT_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25)
+
+
+class MicroBatcher:
+    """
+    Collect concurrent requests into batches and resolve each caller with its
+    own result.
+
+    A batch is dispatched as soon as it holds max_batch_size items or the
+    oldest item has waited max_wait_ms. `handler` receives the list of items
+    and must return a list of results in the same order.
+    """
+    def __init__(self, handler, max_batch_size: int = 32, max_wait_ms: float = 5.0, name: str = "batcher"):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be greater than 0.")
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+
+        self.batch_size = Histogram(f"{name}_batch_size", buckets=BATCH_SIZE_BUCKETS)
+        self.queue_wait = Histogram(f"{name}_queue_wait_seconds", buckets=QUEUE_WAIT_BUCKETS)
+
+        self._pending = []
+        self._in_flight = set()
+        self._loop = None
+        self._worker = None
+        self._has_items = None
+        self._full = None
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._pending = []
+            self._has_items = asyncio.Event()
+            self._full = asyncio.Event()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, item):
+        """
+        Queue one item and wait for its result.
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+        self._has_items.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._full.set()
+        return await future
+
+    async def _run(self):
+        while True:
+            await self._has_items.wait()
+            if len(self._pending) < self.max_batch_size:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            if len(self._pending) < self.max_batch_size:
+                self._full.clear()
+            if not self._pending:
+                self._has_items.clear()
+
+            # Process in its own task so the next batch can be collected meanwhile.
+            task = self._loop.create_task(self._process(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _process(self, batch):
+        dispatched = time.perf_counter()
+        self.batch_size.observe(len(batch))
+        for _, _, enqueued in batch:
+            self.queue_wait.observe(dispatched - enqueued)
+
+        try:
+            results = await self.handler([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name} handler returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            logger.error(f"Error processing batch of {len(batch)} items in {self.name}: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending": len(self._pending),
+            "batches_in_flight": len(self._in_flight),
+            "batch_size": self.batch_size.snapshot(),
+            "queue_wait_seconds": self.queue_wait.snapshot(),
+        }
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread safe LRU cache bounded by number of entries and optionally by
+    bytes, as measured by `sizeof(value)`, with an optional time to live
+    per entry. Keeps hit/miss/eviction counters for monitoring.
+    """
+    def __init__(self, maxsize: int = 10000, ttl: float = None, maxbytes: int = None, sizeof=None):
+        if maxsize is None and maxbytes is None:
+            raise ValueError("Either maxsize or maxbytes must be given.")
+        if maxsize is not None and maxsize < 1:
+            raise ValueError("maxsize must be greater than 0.")
+        if maxbytes is not None and sizeof is None:
+            raise ValueError("maxbytes needs a sizeof function.")
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _remove(self, key):
+        value, _ = self._data.pop(key)
+        if self.maxbytes is not None:
+            self.nbytes -= self.sizeof(value)
+
+    def _over_limit(self) -> bool:
+        if self.maxsize is not None and len(self._data) > self.maxsize:
+            return True
+        return self.maxbytes is not None and self.nbytes > self.maxbytes
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires_at)
+            if self.maxbytes is not None:
+                self.nbytes += self.sizeof(value)
+            while self._data and self._over_limit():
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "bytes": self.nbytes,
+            "maxbytes": self.maxbytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
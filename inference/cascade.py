@@ -0,0 +1,53 @@
+import time
+
+
+class CascadePolicy:
+    """
+    Early-exit inference over the text models.
+
+    XGBoost runs first. When its spam probability falls outside the
+    uncertainty band [lower, upper] its verdict is final. Otherwise the
+    message escalates to GPT-4o-mini, and to GPT-4o only when GPT-4o-mini
+    disagrees with XGBoost.
+    """
+    def __init__(self, xgboost_manager, gpt_4o_mini_manager, gpt_4o_manager, lower: float = 0.1, upper: float = 0.9):
+        if not 0 <= lower <= upper <= 1:
+            raise ValueError("The uncertainty band must satisfy 0 <= lower <= upper <= 1.")
+        self.xgboost_manager = xgboost_manager
+        self.gpt_4o_mini_manager = gpt_4o_mini_manager
+        self.gpt_4o_manager = gpt_4o_manager
+        self.lower = lower
+        self.upper = upper
+
+    def is_confident(self, probability: float) -> bool:
+        return probability < self.lower or probability > self.upper
+
+    async def apredict(self, input_text, context=None):
+        """
+        Returns the per model results (None for the stages that did not run)
+        and a `cascade` summary with the final verdict and the stages that ran.
+        """
+        start = time.time()
+        results = {"xgboost": None, "gpt-4o-mini": None, "gpt-4o": None}
+
+        xg_result = await self.xgboost_manager.apredict(input_text, context=context)
+        results["xgboost"] = xg_result
+        decided_by = "xgboost"
+
+        if not self.is_confident(xg_result["metadata"]["probability"]):
+            mini_result = await self.gpt_4o_mini_manager.apredict(input_text, context=context)
+            results["gpt-4o-mini"] = mini_result
+            decided_by = "gpt-4o-mini"
+
+            if mini_result["result"] != xg_result["result"]:
+                results["gpt-4o"] = await self.gpt_4o_manager.apredict(input_text, context=context)
+                decided_by = "gpt-4o"
+
+        results["cascade"] = {
+            "result": results[decided_by]["result"],
+            "decided_by": decided_by,
+            "stages": [stage for stage in ("xgboost", "gpt-4o-mini", "gpt-4o") if results[stage] is not None],
+            "band": [self.lower, self.upper],
+            "time": time.time() - start,
+        }
+        return results
@@ -0,0 +1,116 @@
+import aiohttp
+import httpx
+from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.cosmos.aio import CosmosClient
+from azure.search.documents.aio import SearchClient
+
+from modeling.utils import load_config
+from config.config import ENV_VARIABLES, get_logger
+
+logger = get_logger(__name__)
+config = load_config()
+
+
+class ClientRegistry:
+    """
+    Long-lived async clients shared by every request of a worker: one httpx
+    pool for OpenAI and one aiohttp pool behind the Azure Search and Cosmos DB
+    clients. Everything is created on first use and released by `close`,
+    which the FastAPI lifespan calls on shutdown.
+
+    `endpoints` overrides the base URL of the "openai", "search" and "cosmos"
+    services, e.g. to point them at the fakes of the load test.
+    """
+    def __init__(self, max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0, timeout: float = 60.0, endpoints: dict = None):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.endpoints = {name: url for name, url in (endpoints or {}).items() if url}
+
+        self._openai_http_client = None
+        self._azure_session = None
+        self._search_clients = {}
+        self._cosmos_client = None
+        self._cosmos_containers = {}
+
+    @property
+    def openai_http_client(self) -> httpx.AsyncClient:
+        if self._openai_http_client is None:
+            self._openai_http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=self.timeout,
+            )
+        return self._openai_http_client
+
+    @property
+    def openai_base_url(self):
+        """
+        Base URL for the OpenAI clients, None for the default API.
+        """
+        return self.endpoints.get("openai")
+
+    def _azure_transport(self) -> AioHttpTransport:
+        if self._azure_session is None or self._azure_session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=self.keepalive_expiry)
+            self._azure_session = aiohttp.ClientSession(connector=connector)
+        # Each client owns its transport, the session (and its pool) is shared.
+        return AioHttpTransport(session=self._azure_session, session_owner=False)
+
+    def search_client(self, index_name: str = None) -> SearchClient:
+        index_name = index_name or ENV_VARIABLES['AZURE_SEARCH_INDEX']
+        if index_name not in self._search_clients:
+            self._search_clients[index_name] = SearchClient(
+                endpoint=self.endpoints.get("search", f"https://{ENV_VARIABLES['AZURE_SEARCH_SERVICE']}.search.windows.net"),
+                index_name=index_name,
+                credential=AzureKeyCredential(ENV_VARIABLES['AZURE_SEARCH_KEY']),
+                transport=self._azure_transport(),
+            )
+        return self._search_clients[index_name]
+
+    def cosmos_container(self, container_name: str, database_name: str = None):
+        database_name = database_name or ENV_VARIABLES["AZURE_COSMOSDB_DATABASE"]
+        key = (database_name, container_name)
+        if key not in self._cosmos_containers:
+            if self._cosmos_client is None:
+                self._cosmos_client = CosmosClient(
+                    self.endpoints.get("cosmos", f"https://{ENV_VARIABLES['AZURE_COSMOSDB_ACCOUNT']}.documents.azure.com:443/"),
+                    credential=ENV_VARIABLES["AZURE_COSMOSDB_ACCOUNT_KEY"],
+                    transport=self._azure_transport(),
+                )
+            database = self._cosmos_client.get_database_client(database_name)
+            self._cosmos_containers[key] = database.get_container_client(container_name)
+        return self._cosmos_containers[key]
+
+    async def start(self):
+        """
+        Create the pools up front so the first request does not pay for it.
+        """
+        logger.info("Starting shared clients")
+        self.openai_http_client
+        self.search_client()
+
+    async def close(self):
+        logger.info("Closing shared clients")
+        for search_client in self._search_clients.values():
+            await search_client.close()
+        self._search_clients = {}
+        if self._cosmos_client is not None:
+            await self._cosmos_client.close()
+            self._cosmos_client = None
+            self._cosmos_containers = {}
+        if self._azure_session is not None:
+            await self._azure_session.close()
+            self._azure_session = None
+        if self._openai_http_client is not None:
+            await self._openai_http_client.aclose()
+            self._openai_http_client = None
+
+
+clients = ClientRegistry(**config['clients']['http'], endpoints=config['clients']['endpoints'])
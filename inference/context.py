@@ -0,0 +1,44 @@
+import asyncio
+
+
+class FeatureContext:
+    """
+    Per request store of features shared by every model of the ensemble.
+
+    Each distinct embedding input is requested once; concurrent consumers
+    asking for the same text await the same call. `processed_texts` maps a
+    raw text to its preprocessed form once a model has computed it.
+    """
+    def __init__(self, embedding_model):
+        self.embedding_model = embedding_model
+        self.processed_texts = {}
+        self._embeddings = {}
+
+    async def embed(self, text: str):
+        embedding = self._embeddings.get(text)
+        if embedding is None:
+            embedding = asyncio.ensure_future(self.embedding_model.aembed_query(text))
+            self._embeddings[text] = embedding
+        return await embedding
+
+    async def prefetch(self, texts):
+        """
+        Embed all the texts not requested yet with a single batch call.
+        """
+        missing = [text for text in dict.fromkeys(texts) if text not in self._embeddings]
+        if not missing:
+            return
+
+        loop = asyncio.get_running_loop()
+        futures = {text: loop.create_future() for text in missing}
+        self._embeddings.update(futures)
+        try:
+            vectors = await self.embedding_model.aembed_documents(missing)
+        except Exception as e:
+            for future in futures.values():
+                future.set_exception(e)
+                # Retrieved here so an unused feature does not log "exception never retrieved".
+                future.exception()
+            raise
+        for text, vector in zip(missing, vectors):
+            futures[text].set_result(vector)
@@ -0,0 +1,113 @@
+"""
+Request deadlines and hedged calls.
+
+A Deadline is created per request, from the request header or the config
+default, and bounds every model call of the request. It is also published
+in a context variable so nested waits, like the upstream limiter queue,
+never wait past it.
+"""
+import asyncio
+import contextvars
+import time
+from collections import deque
+
+import numpy as np
+
+_current_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    async def wait_for(self, awaitable):
+        """
+        Await `awaitable`, cancelling it with asyncio.TimeoutError when the
+        deadline passes.
+        """
+        if self.expired:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise asyncio.TimeoutError()
+        return await asyncio.wait_for(awaitable, self.remaining())
+
+    def activate(self):
+        """
+        Make this the deadline of the current task and the tasks it creates.
+        """
+        return _current_deadline.set(self)
+
+
+def current_deadline():
+    return _current_deadline.get()
+
+
+class Hedger:
+    """
+    Hedged requests for one model: when a call is still running after the
+    `quantile` of the latencies observed so far, a second identical call is
+    started and the first one to succeed wins; the other is cancelled.
+    Needs `min_samples` latencies before it hedges at all.
+    """
+    def __init__(self, quantile: float = 0.95, min_samples: int = 50, min_delay: float = 0.5, window: int = 500):
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.latencies = deque(maxlen=window)
+        self._delay = None
+        self._observed = 0
+        self.counters = {"calls": 0, "hedged": 0, "hedge_wins": 0}
+
+    def delay(self):
+        if len(self.latencies) < self.min_samples:
+            return None
+        # Recomputed every few samples, not on every call.
+        if self._delay is None or self._observed >= 20:
+            self._delay = max(self.min_delay, float(np.quantile(self.latencies, self.quantile)))
+            self._observed = 0
+        return self._delay
+
+    def observe(self, seconds: float):
+        self.latencies.append(seconds)
+        self._observed += 1
+
+    async def run(self, factory):
+        """
+        Result of `factory()`, a coroutine function, hedged after delay().
+        """
+        self.counters["calls"] += 1
+        delay = self.delay()
+        start = time.monotonic()
+        tasks = [asyncio.ensure_future(factory())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.counters["hedged"] += 1
+                tasks.append(asyncio.ensure_future(factory()))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.counters["hedge_wins"] += task is not tasks[0]
+                        # Observed as the latency of the call, hedged or not, so
+                        # the quantile keeps following the slow tail.
+                        self.observe(time.monotonic() - start)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict:
+        return {**self.counters, "samples": len(self.latencies), "delay": self.delay()}
@@ -0,0 +1,313 @@
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+import unicodedata
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from inference.cache import LRUCache
+from inference.clients import clients
+from inference.limiter import get_limiter
+from inference.telemetry import span
+from modeling.utils import load_config
+from config.config import BASE_DIR, ENV_VARIABLES, get_logger
+
+logger = get_logger(__name__)
+config = load_config()
+
+_WHITESPACE = re.compile(r"\s+")
+# sha256 digest of the key followed by the row of the vector in the vectors file.
+_INDEX_RECORD = struct.Struct("<32sq")
+# Approximate bytes of a memory cache entry besides the vector data: the
+# ndarray object, the key and the OrderedDict slot.
+_ENTRY_OVERHEAD = 300
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalization applied before hashing: unicode NFKC and collapsed
+    whitespace. Case is kept because it changes the embedding.
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def embedding_key(text: str, model: str) -> bytes:
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).digest()
+
+
+class DiskVectorStore:
+    """
+    Append-only on-disk store of float32 vectors shared between processes.
+
+    `vectors.f32` holds the raw rows and is read through a memory map;
+    `index.bin` holds (key, row) records. Appends are serialized with an
+    exclusive file lock and the vector is written before its index record,
+    so readers never see a key pointing to a missing row. Other processes'
+    appends are picked up by `refresh`.
+    """
+    def __init__(self, path, dimensions: int = None):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.path / "vectors.f32"
+        self.index_path = self.path / "index.bin"
+        self.lock_path = self.path / "store.lock"
+        self.meta_path = self.path / "meta.json"
+
+        self.dimensions = dimensions
+        if self.meta_path.exists():
+            self.dimensions = json.loads(self.meta_path.read_text())["dimensions"]
+
+        self._rows = {}
+        self._index_offset = 0
+        self._matrix = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def refresh(self):
+        """
+        Read the index records appended since the last refresh.
+        """
+        if not self.index_path.exists():
+            return
+        with self._lock, open(self.index_path, "rb") as f:
+            f.seek(self._index_offset)
+            data = f.read()
+            usable = len(data) - len(data) % _INDEX_RECORD.size
+            for key, row in _INDEX_RECORD.iter_unpack(data[:usable]):
+                self._rows[key] = row
+            self._index_offset += usable
+
+    def matrix(self) -> np.memmap:
+        """
+        Read-only memory map of every stored vector, indexed by row.
+        """
+        n_rows = os.path.getsize(self.vectors_path) // (self.dimensions * 4) if self.vectors_path.exists() else 0
+        if self._matrix is None or self._matrix.shape[0] != n_rows:
+            if n_rows == 0:
+                return np.empty((0, self.dimensions or 0), dtype=np.float32)
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n_rows, self.dimensions))
+        return self._matrix
+
+    def _vector(self, row: int):
+        if self._matrix is None or row >= self._matrix.shape[0]:
+            self.matrix()
+        return self._matrix[row]
+
+    def rows(self, keys) -> np.ndarray:
+        """
+        Row of each key in `matrix()`, -1 for keys not stored.
+        """
+        self.refresh()
+        return np.fromiter((self._rows.get(key, -1) for key in keys), dtype=np.int64)
+
+    def get(self, key: bytes):
+        row = self._rows.get(key)
+        if row is None:
+            self.refresh()
+            row = self._rows.get(key)
+            if row is None:
+                return None
+        return self._vector(row)
+
+    def put_many(self, items):
+        """
+        Append (key, vector) pairs not stored yet.
+        """
+        items = [(key, np.asarray(vector, dtype=np.float32)) for key, vector in items if key not in self._rows]
+        if not items:
+            return
+
+        if self.dimensions is None:
+            self.dimensions = items[0][1].shape[0]
+        row_bytes = self.dimensions * 4
+
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if not self.meta_path.exists():
+                    self.meta_path.write_text(json.dumps({"dimensions": self.dimensions}))
+                # Pick up other processes' writes so keys are not duplicated.
+                self.refresh()
+                items = [(key, vector) for key, vector in items if key not in self._rows]
+                if not items:
+                    return
+
+                with open(self.vectors_path, "ab") as f:
+                    size = f.tell()
+                    if size % row_bytes:
+                        # Leftover of an interrupted write, never indexed.
+                        size -= size % row_bytes
+                        f.truncate(size)
+                    first_row = size // row_bytes
+                    f.write(b"".join(vector.tobytes() for _, vector in items))
+                    f.flush()
+
+                records = [_INDEX_RECORD.pack(key, first_row + i) for i, (key, _) in enumerate(items)]
+                with open(self.index_path, "ab") as f:
+                    f.write(b"".join(records))
+                    f.flush()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        self.refresh()
+
+
+def _entry_bytes(vector: np.ndarray) -> int:
+    return vector.nbytes + _ENTRY_OVERHEAD
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings client with a two tier cache in front of the provider: an
+    in-process LRU with TTL, bounded in bytes and holding float32 arrays
+    (about 6 KB per 1536 dimension vector instead of 49 KB as a list of
+    floats), and an optional DiskVectorStore, so restarts and other workers
+    start warm. Vectors are converted to lists only when returned.
+    """
+    def __init__(self, embeddings: Embeddings, model: str, memory_maxbytes: int = 256 * 1024 * 1024,
+                 ttl_seconds: float = None, disk_path=None):
+        self.embeddings = embeddings
+        self.model = model
+        self.memory = LRUCache(maxsize=None, ttl=ttl_seconds, maxbytes=memory_maxbytes, sizeof=_entry_bytes)
+        self.disk = DiskVectorStore(disk_path) if disk_path else None
+        self.disk_hits = 0
+
+    def _lookup(self, keys):
+        """
+        Return the cached float32 vectors (None for misses), promoting disk
+        hits to memory.
+        """
+        vectors = []
+        for key in keys:
+            vector = self.memory.get(key)
+            if vector is None and self.disk is not None:
+                stored = self.disk.get(key)
+                if stored is not None:
+                    # Copied out of the memory map, which is replaced as the store grows.
+                    vector = np.array(stored)
+                    self.memory.set(key, vector)
+                    self.disk_hits += 1
+            vectors.append(vector)
+        return vectors
+
+    def _store(self, keys, vectors):
+        for key, vector in zip(keys, vectors):
+            self.memory.set(key, vector)
+
+    @staticmethod
+    def _as_arrays(vectors):
+        return [np.asarray(vector, dtype=np.float32) for vector in vectors]
+
+    def _persist(self, keys, vectors):
+        if self.disk is not None:
+            try:
+                self.disk.put_many(zip(keys, vectors))
+            except OSError as e:
+                logger.error(f"Error writing embeddings to the disk cache: {e}")
+
+    def _pending(self, texts):
+        keys = [embedding_key(text, self.model) for text in texts]
+        vectors = self._lookup(keys)
+        # Distinct texts still missing, mapped to the positions waiting for them.
+        missing = {}
+        for i, (key, vector) in enumerate(zip(keys, vectors)):
+            if vector is None:
+                missing.setdefault(key, (texts[i], []))[1].append(i)
+        return keys, vectors, missing
+
+    @staticmethod
+    def _fill(vectors, missing, new_vectors):
+        for (_, positions), vector in zip(missing.values(), new_vectors):
+            for i in positions:
+                vectors[i] = vector
+        return [vector.tolist() for vector in vectors]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with span("embeddings", self.model):
+            keys, vectors, missing = self._pending(list(texts))
+            new_vectors = []
+            if missing:
+                new_vectors = self._as_arrays(self.embeddings.embed_documents([text for text, _ in missing.values()]))
+                self._store(missing.keys(), new_vectors)
+                self._persist(list(missing.keys()), new_vectors)
+            return self._fill(vectors, missing, new_vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        with span("embeddings", self.model):
+            keys, vectors, missing = self._pending(list(texts))
+            new_vectors = []
+            if missing:
+                async with get_limiter(f"openai/{self.model}").slot():
+                    new_vectors = await self.embeddings.aembed_documents([text for text, _ in missing.values()])
+                new_vectors = self._as_arrays(new_vectors)
+                self._store(missing.keys(), new_vectors)
+                await asyncio.to_thread(self._persist, list(missing.keys()), new_vectors)
+            return self._fill(vectors, missing, new_vectors)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def stats(self) -> dict:
+        memory = self.memory.stats()
+        return {
+            "model": self.model,
+            "memory": memory,
+            "disk": {
+                "enabled": self.disk is not None,
+                "size": len(self.disk) if self.disk is not None else 0,
+                "hits": self.disk_hits,
+            },
+            "hits": memory["hits"] + self.disk_hits,
+            "misses": memory["misses"] - self.disk_hits,
+            "evictions": memory["evictions"],
+        }
+
+
+_embedding_models = {}
+_embedding_models_lock = threading.Lock()
+
+
+def get_embedding_model(model: str = "text-embedding-3-small") -> CachedEmbeddings:
+    """
+    Shared cached embeddings client of `model`, built on first use.
+    """
+    with _embedding_models_lock:
+        if model not in _embedding_models:
+            # Imported on first use, it pulls in the whole OpenAI SDK.
+            from langchain_openai import OpenAIEmbeddings
+            cache_config = config['embeddings']['cache']
+            disk_path = None
+            if cache_config['disk']['enabled']:
+                disk_path = BASE_DIR / cache_config['disk']['path'] / model
+            _embedding_models[model] = CachedEmbeddings(
+                OpenAIEmbeddings(
+                    openai_api_key=ENV_VARIABLES["OPENAI_KEY"],
+                    model=model,
+                    http_async_client=clients.openai_http_client,
+                    base_url=clients.openai_base_url,
+                    check_embedding_ctx_length=config['embeddings']['check_ctx_length'],
+                ),
+                model=model,
+                memory_maxbytes=int(cache_config['memory_max_mb'] * 1024 * 1024),
+                ttl_seconds=cache_config['ttl_seconds'],
+                disk_path=disk_path,
+            )
+        return _embedding_models[model]
+
+
+def embedding_cache_stats() -> dict:
+    return {model: embeddings.stats() for model, embeddings in _embedding_models.items()}
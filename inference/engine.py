@@ -0,0 +1,56 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from config.config import get_logger
+
+logger = get_logger(__name__)
+
+# Threads each process may keep busy, set by gunicorn's post_fork so that
+# workers x threads does not oversubscribe the cores. None means no limit.
+_thread_budget = None
+
+
+def set_thread_budget(threads):
+    global _thread_budget
+    _thread_budget = max(1, int(threads)) if threads else None
+
+
+def thread_budget():
+    return _thread_budget
+
+
+class InferenceEngine:
+    """
+    Bounded thread pool used to run CPU bound inference work (text
+    preprocessing, booster predict) without blocking the event loop.
+    """
+    def __init__(self, max_workers: int = 4, thread_name_prefix: str = "inference"):
+        if max_workers < 1:
+            raise ValueError("max_workers must be greater than 0.")
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._executor = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # Created on first use so the pool is owned by the process that runs it.
+        if self._executor is None:
+            logger.info(f"Starting inference pool '{self.thread_name_prefix}' with {self.max_workers} workers")
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=self.thread_name_prefix,
+            )
+        return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run func(*args, **kwargs) in the pool and await its result.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,242 @@
+import hashlib
+import threading
+import time
+import uuid
+from typing import Optional
+
+import numpy as np
+
+from inference.cache import LRUCache
+from inference.embeddings import normalize_text
+from modeling.utils import load_config
+
+config = load_config()
+
+
+class SemanticTier:
+    """
+    Ring buffer of normalized message embeddings and their verdicts. A lookup
+    returns the most similar live entry when its cosine similarity reaches
+    `threshold`. The oldest entries are overwritten once `maxsize` is reached.
+    """
+    def __init__(self, threshold: float, maxsize: int = 5000, ttl: float = None):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._vectors = None
+        self._values = [None] * maxsize
+        self._expires = np.full(maxsize, -np.inf)
+        self._next = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.array(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def get(self, vector):
+        if self._vectors is None:
+            self.misses += 1
+            return None, 0.0
+        query = self._normalize(vector)
+        with self._lock:
+            scores = self._vectors @ query
+            scores[self._expires < time.monotonic()] = -np.inf
+            best = int(np.argmax(scores))
+            similarity, value = float(scores[best]), self._values[best]
+        if similarity < self.threshold:
+            self.misses += 1
+            return None, similarity
+        self.hits += 1
+        return value, similarity
+
+    def set(self, vector, value):
+        vector = self._normalize(vector)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+            slot = self._next
+            self._vectors[slot] = vector
+            self._values[slot] = value
+            self._expires[slot] = time.monotonic() + self.ttl if self.ttl else np.inf
+            self._next = (slot + 1) % self.maxsize
+
+    def stats(self) -> dict:
+        return {
+            "threshold": self.threshold,
+            "maxsize": self.maxsize,
+            "size": int((self._expires > time.monotonic()).sum()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class PerceptualTier:
+    """
+    Ring buffer of 64 bit perceptual image hashes and their verdicts. A lookup
+    returns the closest live entry when it differs in at most `max_distance`
+    bits, so re-encoded or resized copies of a known image reuse its verdict.
+    """
+    def __init__(self, max_distance: int = 6, maxsize: int = 5000, ttl: float = None):
+        self.max_distance = max_distance
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._hashes = np.zeros(maxsize, dtype=np.uint64)
+        self._values = [None] * maxsize
+        self._expires = np.full(maxsize, -np.inf)
+        self._next = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, perceptual_hash: int):
+        with self._lock:
+            differences = np.bitwise_xor(self._hashes, np.uint64(perceptual_hash))
+            distances = np.unpackbits(differences.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+            distances[self._expires < time.monotonic()] = 65
+            best = int(np.argmin(distances))
+            distance, value = int(distances[best]), self._values[best]
+        if distance > self.max_distance:
+            self.misses += 1
+            return None, distance
+        self.hits += 1
+        return value, distance
+
+    def set(self, perceptual_hash: int, value):
+        with self._lock:
+            slot = self._next
+            self._hashes[slot] = perceptual_hash
+            self._values[slot] = value
+            self._expires[slot] = time.monotonic() + self.ttl if self.ttl else np.inf
+            self._next = (slot + 1) % self.maxsize
+
+    def stats(self) -> dict:
+        return {
+            "max_distance": self.max_distance,
+            "maxsize": self.maxsize,
+            "size": int((self._expires > time.monotonic()).sum()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class ClassificationCache:
+    """
+    Cache of LLM verdicts keyed by model name, prompt version and the hash of
+    the normalized input. The optional semantic tier also answers for inputs
+    whose embedding is close enough to an already classified one.
+    """
+    def __init__(self, maxsize: int = 20000, ttl: float = 3600, semantic_threshold: Optional[float] = None,
+                 semantic_maxsize: int = 5000, perceptual_max_distance: Optional[int] = None,
+                 perceptual_maxsize: int = 5000):
+        self.exact = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.semantic_maxsize = semantic_maxsize
+        self.semantic_threshold = semantic_threshold
+        self.perceptual_max_distance = perceptual_max_distance
+        self.perceptual_maxsize = perceptual_maxsize
+        self.ttl = ttl
+        self._semantic = {}
+        self._perceptual = {}
+
+    @staticmethod
+    def key(model_name: str, prompt_version: str, content: str) -> str:
+        digest = hashlib.sha256(normalize_text(content).encode("utf-8")).hexdigest()
+        return f"{model_name}:{prompt_version}:{digest}"
+
+    def _semantic_tier(self, model_name, prompt_version) -> Optional[SemanticTier]:
+        if self.semantic_threshold is None:
+            return None
+        tier_key = (model_name, prompt_version)
+        if tier_key not in self._semantic:
+            self._semantic[tier_key] = SemanticTier(self.semantic_threshold, self.semantic_maxsize, self.ttl)
+        return self._semantic[tier_key]
+
+    def _perceptual_tier(self, model_name, prompt_version) -> Optional[PerceptualTier]:
+        if self.perceptual_max_distance is None:
+            return None
+        tier_key = (model_name, prompt_version)
+        if tier_key not in self._perceptual:
+            self._perceptual[tier_key] = PerceptualTier(self.perceptual_max_distance, self.perceptual_maxsize, self.ttl)
+        return self._perceptual[tier_key]
+
+    def get(self, model_name: str, prompt_version: str, content: str):
+        return self.exact.get(self.key(model_name, prompt_version, content))
+
+    def get_similar(self, model_name: str, prompt_version: str, vector):
+        """
+        Return (verdict, similarity) of the closest cached input, verdict is
+        None below the threshold or when the semantic tier is disabled.
+        """
+        tier = self._semantic_tier(model_name, prompt_version)
+        if tier is None:
+            return None, 0.0
+        return tier.get(vector)
+
+    def get_perceptual(self, model_name: str, prompt_version: str, perceptual_hash: int):
+        """
+        Return (verdict, distance) of the closest cached image, verdict is
+        None beyond the max distance or when the perceptual tier is disabled.
+        """
+        tier = self._perceptual_tier(model_name, prompt_version)
+        if tier is None:
+            return None, 64
+        return tier.get(perceptual_hash)
+
+    def set(self, model_name: str, prompt_version: str, content: str, verdict, vector=None,
+            perceptual_hash: Optional[int] = None):
+        self.exact.set(self.key(model_name, prompt_version, content), verdict)
+        tier = self._semantic_tier(model_name, prompt_version)
+        if tier is not None and vector is not None:
+            tier.set(vector, verdict)
+        tier = self._perceptual_tier(model_name, prompt_version)
+        if tier is not None and perceptual_hash is not None:
+            tier.set(perceptual_hash, verdict)
+
+    def stats(self) -> dict:
+        return {
+            "exact": self.exact.stats(),
+            "semantic": {f"{model}:{version}": tier.stats() for (model, version), tier in self._semantic.items()},
+            "perceptual": {f"{model}:{version}": tier.stats() for (model, version), tier in self._perceptual.items()},
+        }
+
+
+def cached_response(verdict: dict, start: float, tier: str, similarity: float = None) -> dict:
+    """
+    Build a prediction response out of a cached verdict.
+    """
+    metadata = {
+        **verdict["metadata"],
+        "time": time.time() - start,
+        "cache_hit": True,
+        "cache_tier": tier,
+        "cached_id_pred": verdict["id_pred"],
+    }
+    if similarity is not None:
+        metadata["cache_similarity"] = similarity
+    return {**verdict, "id_pred": str(uuid.uuid4()), "metadata": metadata}
+
+
+_classification_cache = None
+
+def get_classification_cache() -> Optional[ClassificationCache]:
+    """
+    Shared classification cache, None when disabled in config.
+    """
+    global _classification_cache
+    cache_config = config['classification_cache']
+    if not cache_config['enabled']:
+        return None
+    if _classification_cache is None:
+        semantic_config = cache_config['semantic']
+        perceptual_config = cache_config['perceptual']
+        _classification_cache = ClassificationCache(
+            maxsize=cache_config['maxsize'],
+            ttl=cache_config['ttl_seconds'],
+            semantic_threshold=semantic_config['threshold'] if semantic_config['enabled'] else None,
+            semantic_maxsize=semantic_config['maxsize'],
+            perceptual_max_distance=perceptual_config['max_distance'] if perceptual_config['enabled'] else None,
+            perceptual_maxsize=perceptual_config['maxsize'],
+        )
+    return _classification_cache
@@ -1,102 +1,136 @@
+import asyncio
 import uuid
 import time
 
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
-from inference.genai.retrieval import CognitiveSearch
+from inference.clients import clients
+from inference.genai.cache import get_classification_cache, cached_response
+from inference.genai.retrieval import get_search_backend
 from inference.genai.schemas import ClassificationOutput, get_classification_examples, get_simple_examples
+from inference.genai.selection import ExampleSelector, count_tokens
+from inference.limiter import get_limiter
+from inference.telemetry import span
+from modeling.utils import load_config
+from config.prompt import classification_system_prompt, classification_prompt_version
 from config.config import ENV_VARIABLES
 
+config = load_config()
+
+
+def build_classification_prompt() -> ChatPromptTemplate:
+    """
+    The static system prompt always goes first so every request shares the
+    same prefix and provider-side prompt caching can apply; the retrieved
+    examples and the message follow it.
+    """
+    return ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            classification_system_prompt
+        ),
+        ("human", "# Some classifications examples: {examples}"),
+        ("human", "new message: {text_input}"),
+    ]
+)
+
+
 class AssistantClassificator:
     def __init__(
         self,
-        model_name: str = "gpt-4o"
+        model_name: str = "gpt-4o",
+        llm=None
     ):
         
         self.model_name = model_name
-        self.cognitive_search = CognitiveSearch()
-
-        self.llm_classification_service = ChatOpenAI(
+        self.cognitive_search = get_search_backend()
+        self.cache = get_classification_cache()
+
+        selection_config = config['example_selection']
+        self.example_selector = ExampleSelector(
+            token_budget=selection_config['token_budget'],
+            max_examples=selection_config['max_examples'],
+            duplicate_threshold=selection_config['duplicate_threshold'],
+            mmr_lambda=selection_config['mmr_lambda'],
+            max_label_share=selection_config['max_label_share'],
+            model_name=self.model_name,
+        ) if selection_config['enabled'] else None
+
+        self.llm_classification_service = llm or ChatOpenAI(
     model=self.model_name,
     api_key=ENV_VARIABLES["OPENAI_KEY"],
-    temperature=0.2
+    temperature=0.2,
+    http_async_client=clients.openai_http_client,
+    base_url=clients.openai_base_url,
         )
 
-    async def apredict(self, input_text):
+        # Compiled once and reused by every request.
+        self.prompt = build_classification_prompt()
+        self.runnable = self.prompt | self.llm_classification_service.with_structured_output(
+                schema=ClassificationOutput,
+                method="function_calling",
+                include_raw=False,
+            )
+
+    async def apredict(self, input_text, context=None):
 
         start = time.time()
         id_predict = str(uuid.uuid4())
-        
-        search_results = await self.cognitive_search.search(input_text, top=50)
 
-        classification_examples = get_simple_examples(search_results)
+        if self.cache is not None:
+            cached = self.cache.get(self.model_name, classification_prompt_version, input_text)
+            if cached is not None:
+                return cached_response(cached, start, "exact")
 
-        prompt = await self.classification_setup_prompt(
-        )
+        if context is not None:
+            vector = await context.embed(input_text)
+        else:
+            vector = await self.cognitive_search.generate_embeddings(input_text)
 
-        runnable = prompt | self.llm_classification_service.with_structured_output(
-                schema=ClassificationOutput,
-                method="function_calling",
-                include_raw=False,
+        if self.cache is not None:
+            cached, similarity = await asyncio.to_thread(
+                self.cache.get_similar, self.model_name, classification_prompt_version, vector
             )
-        
-        result = await runnable.ainvoke({"text_input": input_text,  "examples": classification_examples})
+            if cached is not None:
+                return cached_response(cached, start, "semantic", similarity)
+
+        search_results = await self.cognitive_search.search(input_text, top=50, vector=vector)
+
+        if self.example_selector is not None:
+            search_results, selection = await asyncio.to_thread(self.example_selector.select, search_results)
+            selection["input_tokens"] = count_tokens(input_text, self.model_name)
+        else:
+            selection = None
+
+        classification_examples = get_simple_examples(search_results)
+
+        async with get_limiter(f"openai/{self.model_name}").slot():
+            with span("llm", self.model_name):
+                result = await self.runnable.ainvoke({"text_input": input_text,  "examples": classification_examples})
 
         classification_result = result.Classification
         explanation_result = result.Explanation
 
         #TODO: check if the classification is allowed
 
-        return {
+        response = {
             "id_pred": id_predict,
             "result": classification_result,
             "metadata": {
                 "time": time.time() - start,
-                "explanation": explanation_result
+                "explanation": explanation_result,
+                "cache_hit": False,
+                "examples": selection,
             }
         }
+        if self.cache is not None:
+            self.cache.set(self.model_name, classification_prompt_version, input_text, response, vector)
+        return response
 
     async def classification_setup_prompt(self) -> ChatPromptTemplate:
         """
+        Prompt of the classifier, built once at startup.
         """
-
-        system_prompt = f"""You are a classifier model designed to determine whether a message is spam or ham (non-spam). Your task is to read the incoming message and classify it into one of these two categories:
-
-Spam: A message that is unsolicited, promotional, or attempting to deceive the recipient.
-Ham: A legitimate message that does not have the characteristics of spam.
-
-For each message, provide the following:
-- The classification (spam or ham).
-- A short explanation justifying why the message fits the category you selected. Use clear and concise reasoning based on features such as:
-        Unsolicited promotional content.
-        Use of financial incentives, prizes, or promotions.
-        Presence of suspicious links or requests for personal information.
-        Informal or irrelevant content typical of personal or legitimate communications.
-
-Here are a few examples of your responses:
-
-Example 1:
-Message: "Free entry in a competition to win £1000! Text WIN to 12345 now."
-Classification: spam.
-Explanation: The message promotes a contest with financial incentives and includes a request for the recipient to take an action (text WIN), which is typical of spam.
-
-Example 2:
-Message: "Hey, are we still meeting for lunch tomorrow?"
-Classification: ham.
-Explanation: This is a personal message without any promotional content or suspicious elements, typical of legitimate communication.
-
-Instructions: After classifying each message, always provide a clear and relevant justification based on the message’s content."""
-        
-        prompt = ChatPromptTemplate.from_messages(
-    [
-        (
-            "system",
-            system_prompt
-        ),
-        #MessagesPlaceholder("examples"),
-        ("human", "# Some classifications examples: {examples} \n\n new message: {text_input}"),
-    ]
-)
-        
-        return prompt
+        return self.prompt
@@ -0,0 +1,325 @@
+"""
+In-process retrieval of few-shot examples.
+
+The labeled corpus is exported from the Azure Cognitive Search index into a
+JSONL snapshot and built into a directory holding a memory-mapped float32
+matrix of the normalized `main_vector` embeddings, the documents and,
+optionally, a coarse IVF partitioning. `LocalSearch` serves it with the same
+interface as `CognitiveSearch`: exact (or IVF) top-k with NumPy
+matrix-vector products, plus BM25 keyword scores fused with reciprocal rank
+fusion for hybrid queries.
+
+    python -m inference.genai.local_index export --snapshot data/index/snapshot.jsonl
+    python -m inference.genai.local_index build --snapshot data/index/snapshot.jsonl --lists 64
+    python -m inference.genai.local_index refresh --lists 64
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import time
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from inference.embeddings import get_embedding_model
+from inference.telemetry import span
+from modeling.utils import load_config
+from config.config import BASE_DIR, get_logger
+
+logger = get_logger(__name__)
+config = load_config()
+
+_TOKEN = re.compile(r"\w+")
+# Constant of reciprocal rank fusion, the same Azure uses for hybrid queries.
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores, k):
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def kmeans(matrix, n_lists, iterations=20, seed=42):
+    """
+    Spherical k-means over normalized rows, used for the IVF partitioning.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = matrix[rng.choice(matrix.shape[0], n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(matrix @ centroids.T, axis=1)
+        for i in range(n_lists):
+            members = matrix[assignments == i]
+            if len(members):
+                centroids[i] = members.sum(axis=0)
+        centroids = _normalize_rows(centroids)
+    return centroids, np.argmax(matrix @ centroids.T, axis=1)
+
+
+class BM25:
+    """
+    Okapi BM25 over the documents' messages, kept in memory as an inverted
+    index of term -> (document ids, term frequencies).
+    """
+    def __init__(self, texts, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(texts)
+        postings = defaultdict(lambda: ([], []))
+        lengths = np.zeros(self.n_docs, dtype=np.float32)
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths[doc_id] = sum(counts.values())
+            for term, tf in counts.items():
+                postings[term][0].append(doc_id)
+                postings[term][1].append(tf)
+        self.avg_length = float(lengths.mean()) if self.n_docs else 0.0
+        self.length_norm = self.k1 * (1 - self.b + self.b * lengths / (self.avg_length or 1.0))
+        self.postings = {
+            term: (np.array(ids, dtype=np.int64), np.array(tfs, dtype=np.float32))
+            for term, (ids, tfs) in postings.items()
+        }
+
+    def scores(self, query: str):
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            ids, tfs = posting
+            idf = math.log(1 + (self.n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + self.length_norm[ids])
+        return scores
+
+
+class LocalVectorIndex:
+    """
+    Read-only index built by `build_index`.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        meta = json.loads((self.path / "meta.json").read_text())
+        self.size = meta["size"]
+        self.dimensions = meta["dimensions"]
+        self.vectors = np.memmap(self.path / "vectors.f32", dtype=np.float32, mode="r",
+                                 shape=(self.size, self.dimensions))
+        with open(self.path / "documents.jsonl", encoding="utf-8") as f:
+            self.documents = [json.loads(line) for line in f]
+
+        self.centroids = None
+        if meta.get("lists"):
+            self.centroids = np.load(self.path / "ivf_centroids.npy")
+            self.list_order = np.load(self.path / "ivf_order.npy", mmap_mode="r")
+            self.list_offsets = np.load(self.path / "ivf_offsets.npy")
+        self.bm25 = BM25([doc["message"] for doc in self.documents])
+
+    def vector_search(self, vector, top: int, nprobe: Optional[int] = None):
+        """
+        Cosine top-k. Exact unless the index has IVF lists and nprobe is set.
+        """
+        query = np.array(vector, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+
+        if self.centroids is None or not nprobe or nprobe >= len(self.centroids):
+            scores = self.vectors @ query
+            ids = _top_k(scores, top)
+            return ids, scores[ids]
+
+        lists = _top_k(self.centroids @ query, nprobe)
+        candidates = np.sort(np.concatenate([
+            self.list_order[self.list_offsets[i]:self.list_offsets[i + 1]] for i in lists
+        ]))
+        scores = self.vectors[candidates] @ query
+        top_ids = _top_k(scores, top)
+        return candidates[top_ids], scores[top_ids]
+
+    def keyword_search(self, query: str, top: int):
+        scores = self.bm25.scores(query)
+        ids = _top_k(scores, top)
+        ids = ids[scores[ids] > 0]
+        return ids, scores[ids]
+
+    def search(self, query: str, vector, top: int = 5, use_hybrid: bool = True, nprobe: Optional[int] = None):
+        vector_ids, vector_scores = self.vector_search(vector, top, nprobe)
+        if not use_hybrid:
+            return [self._result(i, s) for i, s in zip(vector_ids, vector_scores)]
+
+        keyword_ids, _ = self.keyword_search(query, top)
+        fused = defaultdict(float)
+        for ids in (vector_ids, keyword_ids):
+            for rank, doc_id in enumerate(ids):
+                fused[int(doc_id)] += 1.0 / (RRF_K + rank + 1)
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top]
+        return [self._result(doc_id, score) for doc_id, score in ranked]
+
+    def _result(self, doc_id, score):
+        doc = self.documents[int(doc_id)]
+        return {"message": doc["message"], "label": doc["label"], "score": float(score)}
+
+
+def current_index_path(root) -> Path:
+    root = Path(root)
+    return root / (root / "CURRENT").read_text().strip()
+
+
+def build_index(snapshot_path, root, n_lists: int = 0) -> Path:
+    """
+    Build a new version of the index from a JSONL snapshot of
+    {message, label, main_vector} records and point CURRENT at it.
+    """
+    root = Path(root)
+    with open(snapshot_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if not records:
+        raise ValueError(f"The snapshot {snapshot_path} is empty.")
+
+    # Sortable by time and unique, so two builds in the same second do not collide.
+    version = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    path = root / version
+    path.mkdir(parents=True, exist_ok=False)
+
+    matrix = _normalize_rows(np.asarray([r["main_vector"] for r in records], dtype=np.float32))
+    vectors = np.memmap(path / "vectors.f32", dtype=np.float32, mode="w+", shape=matrix.shape)
+    vectors[:] = matrix
+    vectors.flush()
+
+    with open(path / "documents.jsonl", "w", encoding="utf-8") as f:
+        for r in records:
+            f.write(json.dumps({"message": r["message"], "label": r["label"]}) + "\n")
+
+    n_lists = min(n_lists, len(records))
+    if n_lists > 1:
+        centroids, assignments = kmeans(matrix, n_lists)
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.searchsorted(assignments[order], np.arange(n_lists + 1))
+        np.save(path / "ivf_centroids.npy", centroids)
+        np.save(path / "ivf_order.npy", order)
+        np.save(path / "ivf_offsets.npy", offsets)
+    else:
+        n_lists = 0
+
+    meta = {"size": matrix.shape[0], "dimensions": matrix.shape[1], "lists": n_lists, "snapshot": str(snapshot_path)}
+    (path / "meta.json").write_text(json.dumps(meta))
+
+    current = root / "CURRENT.tmp"
+    current.write_text(version)
+    os.replace(current, root / "CURRENT")
+    logger.info(f"Built local index {path} with {matrix.shape[0]} documents and {n_lists} IVF lists")
+    return path
+
+
+async def export_snapshot(snapshot_path, index_name: str = None):
+    """
+    Dump every document of the Azure Search index to a JSONL snapshot.
+    """
+    from inference.clients import clients
+
+    search_client = clients.search_client(index_name)
+    snapshot_path = Path(snapshot_path)
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    try:
+        results = await search_client.search(search_text="*", select=["message", "label", "main_vector"])
+        with open(snapshot_path, "w", encoding="utf-8") as f:
+            async for doc in results:
+                f.write(json.dumps({"message": doc["message"], "label": doc["label"], "main_vector": doc["main_vector"]}) + "\n")
+                count += 1
+    finally:
+        await clients.close()
+    logger.info(f"Exported {count} documents to {snapshot_path}")
+    return count
+
+
+class LocalSearch:
+    """
+    Drop-in replacement of CognitiveSearch backed by a LocalVectorIndex. A
+    newly built version of the index is looked for every `reload_interval`
+    seconds and loaded in a thread while searches keep using the current one.
+    """
+    def __init__(self, root, nprobe: Optional[int] = None, reload_interval: float = 60.0):
+        self.root = Path(root)
+        self.nprobe = nprobe
+        self.reload_interval = reload_interval
+        self.embedding_model = get_embedding_model("text-embedding-3-small")
+        self.index = LocalVectorIndex(current_index_path(self.root))
+        self._checked_at = time.monotonic()
+        self._reload_task = None
+
+    def maybe_reload(self):
+        """
+        Start loading a new version of the index in the background when due.
+        """
+        if time.monotonic() - self._checked_at < self.reload_interval:
+            return
+        if self._reload_task is not None and not self._reload_task.done():
+            return
+        self._checked_at = time.monotonic()
+        self._reload_task = asyncio.create_task(self.reload())
+
+    async def reload(self):
+        try:
+            path = await asyncio.to_thread(current_index_path, self.root)
+            if path == self.index.path:
+                return
+            logger.info(f"Loading new local index version {path}")
+            index = await asyncio.to_thread(LocalVectorIndex, path)
+            # A single assignment: each search uses either the old or the new index.
+            self.index = index
+        except Exception as e:
+            logger.error(f"Error loading the local index from {self.root}: {e}")
+
+    async def generate_embeddings(self, text):
+        return await self.embedding_model.aembed_query(text)
+
+    async def search(
+        self,
+        semantic_query: str,
+        top: int = 5,
+        use_hybrid: bool = True,
+        vector: Optional[List[float]] = None,
+        **kwargs: Optional[Dict]
+    ):
+        if vector is None:
+            vector = await self.generate_embeddings(semantic_query)
+        self.maybe_reload()
+        index = self.index
+        with span("search", "local"):
+            return await asyncio.to_thread(index.search, semantic_query, vector, top, use_hybrid, self.nprobe)
+
+
+def main():
+    local_config = config['retrieval']['local']
+    default_root = BASE_DIR / local_config['path']
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export", "build", "refresh"])
+    parser.add_argument("--snapshot", default=str(default_root / "snapshot.jsonl"))
+    parser.add_argument("--root", default=str(default_root))
+    parser.add_argument("--lists", type=int, default=local_config['lists'], help="IVF lists, 0 for exact search only")
+    args = parser.parse_args()
+
+    if args.command in ("export", "refresh"):
+        asyncio.run(export_snapshot(args.snapshot))
+    if args.command in ("build", "refresh"):
+        build_index(args.snapshot, args.root, args.lists)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,22 @@
 from typing import Dict, Optional, List
 import os
 
-from azure.search.documents import SearchClient
-from azure.core.credentials import AzureKeyCredential
 from azure.search.documents.models import (
     VectorizedQuery
 )
-from langchain_openai import OpenAIEmbeddings
+from inference.clients import clients
+from inference.embeddings import get_embedding_model
+from inference.limiter import get_limiter
+from inference.telemetry import span
+from modeling.utils import load_config
+from config.config import BASE_DIR
 
-from config.config import ENV_VARIABLES
+config = load_config()
 
 class CognitiveSearch:
     def __init__(self) -> None:
         
-        self.embedding_model = OpenAIEmbeddings(
-        openai_api_key=ENV_VARIABLES["OPENAI_KEY"],
-        model="text-embedding-3-small",
-    )
+        self.embedding_model = get_embedding_model("text-embedding-3-small")
 
     async def generate_embeddings(self, text):
         embedding = await self.embedding_model.aembed_query(text)
@@ -27,22 +27,29 @@ class CognitiveSearch:
         semantic_query: str, 
         top: int=5,
         use_hybrid: bool = True,
+        vector: Optional[List[float]] = None,
         **kwargs: Optional[Dict]
     ):
-        
-        return await self._search(semantic_query, top, use_hybrid, **kwargs)
+        """
+        Hybrid (or pure vector) search of the examples index. `vector` is the
+        precomputed embedding of semantic_query; it is generated when missing.
+        """
+        if vector is None:
+            vector = await self.generate_embeddings(semantic_query)
+        async with get_limiter("azure_search").slot():
+            with span("search", "azure"):
+                return await self._search(semantic_query, top, use_hybrid, vector=vector, **kwargs)
 
     async def _search(self, semantic_query: str, 
         top: int=5,
         use_hybrid: bool = True,
+        vector: Optional[List[float]] = None,
         **kwargs: Optional[Dict]):
 
-        self.search_client = SearchClient(
-            endpoint=f"https://{ENV_VARIABLES['AZURE_SEARCH_SERVICE']}.search.windows.net",
-            index_name=ENV_VARIABLES['AZURE_SEARCH_INDEX'],
-            credential=AzureKeyCredential(ENV_VARIABLES['AZURE_SEARCH_KEY']))
+        search_client = clients.search_client()
 
-        vector = await self.generate_embeddings(semantic_query)
+        if vector is None:
+            vector = await self.generate_embeddings(semantic_query)
 
         vector_query = VectorizedQuery(
             vector=vector,
@@ -51,7 +58,7 @@ class CognitiveSearch:
 )
         
         if use_hybrid:
-            documents = self.search_client.search(
+            documents = await search_client.search(
                     search_text=semantic_query,
                     vector_queries=[vector_query],
                     top=top,
@@ -60,7 +67,7 @@ class CognitiveSearch:
                     #filter=f"type eq '{type_case}'")
                     
         else:
-            documents = self.search_client.search(
+            documents = await search_client.search(
                 search_text=None,
                 vector_queries=[vector_query],
                 top=top,
@@ -68,7 +75,7 @@ class CognitiveSearch:
                 ) #filter=filter_instruction)
 
         documents_related = []
-        for doc in documents:
+        async for doc in documents:
             documents_related.append({
                 "message": doc["message"],
                 "label": doc["label"],
@@ -76,4 +83,27 @@ class CognitiveSearch:
             })
 
         return documents_related
-   
\ No newline at end of file
+
+
+_search_backend = None
+
+def get_search_backend():
+    """
+    Retrieval backend configured in retrieval.backend, shared by every classifier.
+    """
+    global _search_backend
+    if _search_backend is None:
+        retrieval_config = config['retrieval']
+        if retrieval_config['backend'] == 'azure':
+            _search_backend = CognitiveSearch()
+        elif retrieval_config['backend'] == 'local':
+            from inference.genai.local_index import LocalSearch
+            local_config = retrieval_config['local']
+            _search_backend = LocalSearch(
+                BASE_DIR / local_config['path'],
+                nprobe=local_config['nprobe'],
+                reload_interval=local_config['reload_interval_seconds'],
+            )
+        else:
+            raise ValueError(f"The retrieval backend {retrieval_config['backend']} is not supported.")
+    return _search_backend
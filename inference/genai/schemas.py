@@ -36,11 +36,13 @@ class Example(TypedDict):
     input: str  # This is the example text
     tool_calls: List[BaseModel]  # Instances of pydantic model that should be extracted
 
+def format_example(doc):
+    return f"message: {doc['message']} \n Classification: {doc['label']}"
+
 def get_simple_examples(classification_context_data):
     examples = []
     for doc in classification_context_data:
-        text = f"message: {doc['message']} \n Classification: {doc['label']}"
-        examples.append(text)
+        examples.append(format_example(doc))
     return "\n\n".join(examples)
 
 def get_classification_examples(classification_context_data):
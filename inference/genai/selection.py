@@ -0,0 +1,123 @@
+import math
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from inference.embeddings import normalize_text
+from inference.genai.schemas import format_example
+from inference.genai.local_index import tokenize
+from config.config import get_logger
+
+logger = get_logger(__name__)
+
+_encoding = None
+
+
+def count_tokens(text: str, model_name: str = "gpt-4o") -> int:
+    """
+    Tokens of `text` for the model's tiktoken encoding, approximated as four
+    characters per token if the encoding cannot be loaded.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.encoding_for_model(model_name)
+        except Exception as e:
+            logger.warning(f"Could not load the tiktoken encoding, approximating token counts: {e}")
+            _encoding = False
+    if _encoding is False:
+        return math.ceil(len(text) / 4)
+    return len(_encoding.encode(text))
+
+
+def _shingles(text: str, size: int = 2) -> frozenset:
+    tokens = tokenize(text)
+    if len(tokens) < size:
+        return frozenset(tokens)
+    return frozenset(zip(*(tokens[i:] for i in range(size))))
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class ExampleSelector:
+    """
+    Pick the few-shot examples that go into the prompt out of the retrieved
+    documents: drop near-duplicates, order by MMR (relevance against
+    similarity to the examples already taken), cap the share of any label
+    in the selection so far and stop at a token budget.
+    """
+    def __init__(self, token_budget: int = 1500, max_examples: int = 20, duplicate_threshold: float = 0.8,
+                 mmr_lambda: float = 0.7, max_label_share: float = 0.7, model_name: str = "gpt-4o"):
+        self.token_budget = token_budget
+        self.max_examples = max_examples
+        self.duplicate_threshold = duplicate_threshold
+        self.mmr_lambda = mmr_lambda
+        self.max_label_share = max_label_share
+        self.model_name = model_name
+
+    def deduplicate(self, documents: List[Dict]) -> List[Tuple[Dict, frozenset]]:
+        kept, seen = [], set()
+        for doc in documents:
+            normalized = normalize_text(doc["message"]).lower()
+            if normalized in seen:
+                continue
+            shingles = _shingles(normalized)
+            if any(_jaccard(shingles, other) >= self.duplicate_threshold for _, other in kept):
+                continue
+            seen.add(normalized)
+            kept.append((doc, shingles))
+        return kept
+
+    def select(self, documents: List[Dict]) -> Tuple[List[Dict], Dict]:
+        candidates = self.deduplicate(documents)
+        max_score = max((doc.get("score") or 0.0 for doc, _ in candidates), default=0.0) or 1.0
+        relevance = [(doc.get("score") or 0.0) / max_score for doc, _ in candidates]
+        # Candidates left per label, so the share cap is lifted once the other labels run out.
+        labels = Counter(doc["label"] for doc, _ in candidates)
+
+        selected, selected_shingles = [], []
+        label_counts = Counter()
+        tokens = 0
+        remaining = list(range(len(candidates)))
+        while remaining and len(selected) < self.max_examples:
+            # Share of the selection once one more example is taken.
+            label_cap = max(1, math.ceil(self.max_label_share * (len(selected) + 1)))
+            best, best_score = None, -math.inf
+            for i in remaining:
+                doc, shingles = candidates[i]
+                # The cap only applies while the other labels still have candidates.
+                if label_counts[doc["label"]] >= label_cap and len(labels) > 1:
+                    continue
+                redundancy = max((_jaccard(shingles, other) for other in selected_shingles), default=0.0)
+                score = self.mmr_lambda * relevance[i] - (1 - self.mmr_lambda) * redundancy
+                if score > best_score:
+                    best, best_score = i, score
+            if best is None:
+                break
+            remaining.remove(best)
+
+            doc, shingles = candidates[best]
+            labels[doc["label"]] -= 1
+            if labels[doc["label"]] == 0:
+                del labels[doc["label"]]
+            doc_tokens = count_tokens(format_example(doc), self.model_name)
+            if tokens + doc_tokens > self.token_budget:
+                continue
+            tokens += doc_tokens
+            selected.append(doc)
+            selected_shingles.append(shingles)
+            label_counts[doc["label"]] += 1
+
+        report = {
+            "retrieved": len(documents),
+            "deduplicated": len(candidates),
+            "selected": len(selected),
+            "labels": dict(label_counts),
+            "example_tokens": tokens,
+            "retrieved_tokens": sum(count_tokens(format_example(doc), self.model_name) for doc in documents),
+        }
+        return selected, report
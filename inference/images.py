@@ -0,0 +1,248 @@
+"""
+Image stage of /predict: decode the base64 payload once, check its real
+format and size, and shrink it to the resolution the vision model uses.
+"""
+import base64
+import binascii
+import hashlib
+import io
+import os
+import threading
+
+from PIL import Image, ImageOps
+
+from modeling.utils import load_config
+
+config = load_config()
+
+# Formats accepted by the vision model, by their leading bytes.
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+class ImageTooLarge(InvalidImage):
+    pass
+
+
+def sniff_mime_type(data: bytes) -> str:
+    """
+    MIME type of the image from its magic bytes, regardless of what the
+    client claims.
+    """
+    for signature, mime_type in _SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    raise InvalidImage("Unsupported image format")
+
+
+def dhash(image: Image.Image, size: int = 8) -> int:
+    """
+    64 bit difference hash: each bit tells whether a pixel of the 9x8
+    grayscale thumbnail is brighter than its right neighbour. Resized,
+    recompressed or slightly edited copies of an image hash within a few bits.
+    """
+    thumbnail = image.convert("L").resize((size + 1, size), Image.LANCZOS)
+    pixels = list(thumbnail.getdata())
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+class PreparedImage:
+    """
+    Decoded and, when needed, downscaled image ready for the vision model.
+    """
+    def __init__(self, data: bytes, mime_type: str, width: int, height: int,
+                 original_size: int, digest: str, perceptual_hash: int):
+        self.data = data
+        self.mime_type = mime_type
+        self.width = width
+        self.height = height
+        self.original_size = original_size
+        self.digest = digest
+        self.perceptual_hash = perceptual_hash
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_size - self.size
+
+    def data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('ascii')}"
+
+    def describe(self) -> dict:
+        return {
+            "mime_type": self.mime_type,
+            "width": self.width,
+            "height": self.height,
+            "original_bytes": self.original_size,
+            "sent_bytes": self.size,
+        }
+
+
+class ImagePreprocessor:
+    """
+    Turn a base64 payload or raw image bytes into a PreparedImage. The image
+    is fitted inside `max_long_side` x `max_short_side`, which is what the
+    vision model's high detail mode scales it to anyway, and re-encoded only
+    if that is smaller. CPU bound, run it in a thread.
+    """
+    def __init__(self, max_bytes: int = 10 * 1024 * 1024, max_pixels: int = 40_000_000,
+                 max_long_side: int = 2048, max_short_side: int = 768, jpeg_quality: int = 85):
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self.max_long_side = max_long_side
+        self.max_short_side = max_short_side
+        self.jpeg_quality = jpeg_quality
+        self._lock = threading.Lock()
+        self.images = 0
+        self.downscaled = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def decode(self, image_base64: str) -> bytes:
+        # Reject oversized payloads before allocating the decoded bytes.
+        if len(image_base64) * 3 // 4 > self.max_bytes:
+            raise ImageTooLarge(f"Image larger than {self.max_bytes} bytes")
+        if image_base64.startswith("data:"):
+            image_base64 = image_base64.partition(",")[2]
+        try:
+            data = base64.b64decode(image_base64, validate=True)
+        except (binascii.Error, ValueError):
+            raise InvalidImage("Invalid image encoding")
+        if len(data) > self.max_bytes:
+            raise ImageTooLarge(f"Image larger than {self.max_bytes} bytes")
+        return data
+
+    def _target_size(self, width: int, height: int):
+        scale = min(1.0, self.max_long_side / max(width, height), self.max_short_side / min(width, height))
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def _encode(self, image: Image.Image, mime_type: str):
+        buffer = io.BytesIO()
+        if mime_type == "image/jpeg" or image.mode not in ("RGBA", "LA", "P"):
+            image.convert("RGB").save(buffer, format="JPEG", quality=self.jpeg_quality, optimize=True)
+            return buffer.getvalue(), "image/jpeg"
+        image.save(buffer, format="PNG", optimize=True)
+        return buffer.getvalue(), "image/png"
+
+    def prepare(self, image_base64: str) -> PreparedImage:
+        return self.prepare_bytes(self.decode(image_base64))
+
+    def prepare_bytes(self, data: bytes) -> PreparedImage:
+        return self._prepare(io.BytesIO(data), data)
+
+    def prepare_file(self, file) -> PreparedImage:
+        """
+        Same as prepare_bytes from a seekable binary file, such as a spooled
+        upload. The image is decoded straight from the file; its bytes are
+        only read into memory when they are forwarded unchanged.
+        """
+        return self._prepare(file)
+
+    @staticmethod
+    def _digest(file) -> str:
+        digest = hashlib.sha256()
+        file.seek(0)
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+        return digest.hexdigest()
+
+    def _prepare(self, file, data: bytes = None) -> PreparedImage:
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        if size > self.max_bytes:
+            raise ImageTooLarge(f"Image larger than {self.max_bytes} bytes")
+        file.seek(0)
+        mime_type = sniff_mime_type(file.read(16))
+        file.seek(0)
+        try:
+            image = Image.open(file)
+            width, height = image.size
+            if width * height > self.max_pixels:
+                raise ImageTooLarge(f"Image larger than {self.max_pixels} pixels")
+            if mime_type == "image/jpeg":
+                # Let the JPEG decoder skip the resolution we would drop anyway.
+                image.draft("RGB", self._target_size(width, height))
+            image.load()
+            if mime_type == "image/jpeg":
+                image = ImageOps.exif_transpose(image)
+                width, height = image.size
+        except InvalidImage:
+            raise
+        except Exception as e:
+            raise InvalidImage(f"Corrupt image: {e}")
+
+        perceptual_hash = dhash(image)
+        sent, sent_mime_type, sent_width, sent_height = None, mime_type, width, height
+        # Animated GIFs are forwarded as they are.
+        if mime_type != "image/gif":
+            target = self._target_size(width, height)
+            if target != (width, height):
+                image = image.resize(target, Image.LANCZOS)
+                encoded, encoded_mime_type = self._encode(image, mime_type)
+                if len(encoded) < size:
+                    sent, sent_mime_type = encoded, encoded_mime_type
+                    sent_width, sent_height = image.size
+        downscaled = sent is not None
+        digest = hashlib.sha256(data).hexdigest() if data is not None else self._digest(file)
+        if sent is None:
+            if data is None:
+                file.seek(0)
+                data = file.read()
+            sent = data
+
+        with self._lock:
+            self.images += 1
+            self.downscaled += downscaled
+            self.bytes_in += size
+            self.bytes_out += len(sent)
+
+        return PreparedImage(
+            sent, sent_mime_type, sent_width, sent_height,
+            original_size=size,
+            digest=digest,
+            perceptual_hash=perceptual_hash,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "images": self.images,
+            "downscaled": self.downscaled,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_in - self.bytes_out,
+        }
+
+
+_preprocessor = None
+
+def get_image_preprocessor() -> ImagePreprocessor:
+    global _preprocessor
+    if _preprocessor is None:
+        images_config = config['images']
+        _preprocessor = ImagePreprocessor(
+            max_bytes=images_config['max_bytes'],
+            max_pixels=images_config['max_pixels'],
+            max_long_side=images_config['max_long_side'],
+            max_short_side=images_config['max_short_side'],
+            jpeg_quality=images_config['jpeg_quality'],
+        )
+    return _preprocessor
@@ -0,0 +1,230 @@
+"""
+Adaptive concurrency limits per upstream (an OpenAI model, Azure Search).
+
+Each AdaptiveLimiter lets `limit` calls run at once and queues a bounded
+number of callers behind them. The limit grows by about one per window of
+successful calls (additive increase) and is cut by `backoff` when the
+upstream throttles, times out or answers much slower than its best observed
+latency (multiplicative decrease). A caller that finds the queue full, or
+waits longer than `queue_timeout`, gets Overloaded right away, which the
+app answers with 503 and Retry-After instead of piling up more requests.
+A caller whose request deadline runs out first gets asyncio.TimeoutError
+instead: that is the request being late, not the upstream being overloaded.
+
+Limits are per worker process.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from inference.deadline import current_deadline
+from modeling.utils import load_config
+from config.config import get_logger
+
+logger = get_logger(__name__)
+config = load_config()
+
+# Statuses of an upstream telling us to slow down.
+OVERLOAD_STATUSES = (429, 503)
+
+
+class Overloaded(Exception):
+    """
+    The limiter of `upstream` rejected the call: retry after `retry_after` seconds.
+    """
+    def __init__(self, upstream: str, retry_after: int, reason: str):
+        super().__init__(f"{upstream} is overloaded ({reason}), retry after {retry_after}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+def is_overload_error(error: BaseException) -> bool:
+    if getattr(error, "status_code", None) in OVERLOAD_STATUSES:
+        return True
+    return isinstance(error, (asyncio.TimeoutError, TimeoutError)) or "Timeout" in type(error).__name__
+
+
+class AdaptiveLimiter:
+    def __init__(self, name: str, initial_limit: int = 16, min_limit: int = 1, max_limit: int = 64,
+                 max_queue: int = 100, queue_timeout: float = 5.0, latency_tolerance: float = 2.0,
+                 backoff: float = 0.7):
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("Expected 1 <= min_limit <= initial_limit <= max_limit.")
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.in_flight = 0
+        self.best_latency = None
+        self._waiters = deque()
+        self._last_decrease = 0.0
+        self.counters = {"accepted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_timeout": 0,
+                         "deadline_expired": 0, "overloads": 0, "slow": 0, "decreases": 0}
+
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+
+    def retry_after(self) -> int:
+        """
+        Seconds until the queue ahead has likely drained.
+        """
+        latency = self.best_latency or 1.0
+        return max(1, math.ceil(latency * (len(self._waiters) + 1) / self.current_limit))
+
+    def _reject(self, reason: str):
+        self.counters[f"rejected_{reason}"] += 1
+        raise Overloaded(self.name, self.retry_after(), reason)
+
+    def _expire(self):
+        self.counters["deadline_expired"] += 1
+        raise asyncio.TimeoutError()
+
+    async def acquire(self):
+        deadline = current_deadline()
+        if deadline is not None and deadline.expired:
+            self._expire()
+        if not self._waiters and self.in_flight < self.current_limit:
+            self.in_flight += 1
+            self.counters["accepted"] += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.counters["queued"] += 1
+        timeout = self.queue_timeout
+        # Never queue past the deadline of the request.
+        deadline_first = deadline is not None and deadline.remaining() < timeout
+        if deadline_first:
+            timeout = deadline.remaining()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            if future.done():
+                return
+            self._discard(future)
+            if deadline_first:
+                self._expire()
+            self._reject("timeout")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before the cancellation.
+                self._release()
+            else:
+                self._discard(future)
+            raise
+
+    def _discard(self, future):
+        future.cancel()
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+
+    def _release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        # Slots are handed over here, so they are counted before the waiter runs.
+        while self._waiters and self.in_flight < self.current_limit:
+            future = self._waiters.popleft()
+            if future.done():
+                continue
+            self.in_flight += 1
+            self.counters["accepted"] += 1
+            future.set_result(None)
+
+    def _decrease(self, started: float):
+        # Calls started before the last decrease were already accounted for.
+        if started < self._last_decrease:
+            return
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self._last_decrease = time.monotonic()
+        self.counters["decreases"] += 1
+        logger.warning(f"Concurrency limit of {self.name} lowered to {self.current_limit}")
+
+    def _record(self, started: float, latency: float, overloaded: bool):
+        if overloaded:
+            self.counters["overloads"] += 1
+            self._decrease(started)
+            return
+        if self.best_latency is None or latency < self.best_latency:
+            self.best_latency = latency
+        else:
+            # Let the best latency drift up slowly so a permanently slower
+            # upstream is not taken for an overloaded one forever.
+            self.best_latency += (latency - self.best_latency) * 0.01
+        if latency > self.latency_tolerance * self.best_latency:
+            self.counters["slow"] += 1
+            self._decrease(started)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Run the enclosed upstream call within the limit.
+        """
+        await self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            if is_overload_error(e):
+                self._record(started, time.monotonic() - started, overloaded=True)
+            raise
+        else:
+            self._record(started, time.monotonic() - started, overloaded=False)
+        finally:
+            self._release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.current_limit,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "max_queue": self.max_queue,
+            "best_latency": self.best_latency,
+            **self.counters,
+        }
+
+
+class _Unlimited:
+    @asynccontextmanager
+    async def slot(self):
+        yield
+
+    def stats(self) -> dict:
+        return {"enabled": False}
+
+
+_limiters = {}
+
+
+def get_limiter(upstream: str):
+    """
+    Shared limiter of `upstream`, with the defaults of `limits` in config
+    and the overrides of limits.upstreams.<upstream>.
+    """
+    if upstream not in _limiters:
+        limits_config = config['limits']
+        if not limits_config['enabled']:
+            _limiters[upstream] = _Unlimited()
+        else:
+            options = {**limits_config['default'], **(limits_config['upstreams'].get(upstream) or {})}
+            _limiters[upstream] = AdaptiveLimiter(upstream, **options)
+    return _limiters[upstream]
+
+
+def limiter_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
@@ -1,6 +1,4 @@
-import pickle
-from inference.xgboost import XGBoostPredictor
-from inference.genai.chains import AssistantClassificator
+from inference.telemetry import span
 from config.config import get_logger
 
 logger = get_logger(__name__)
@@ -14,14 +12,18 @@ class ModelManager:
         """
         Load the model based on the model type.
         """
+        # Backends are imported here so only the enabled ones are loaded.
         if self.model_type == "xgboost":
             logger.info("Loading XGBoost model for inference.")
+            from inference.xgboost import XGBoostPredictor
             self.model = XGBoostPredictor()
         elif self.model_type == "gpt-4o":
             logger.info("Loading GPT-4o model for inference.")
+            from inference.genai.chains import AssistantClassificator
             self.model = AssistantClassificator(model_name="gpt-4o")
         elif self.model_type == "gpt-4o-mini":
             logger.info("Loading GPT-4o-mini model for inference.")
+            from inference.genai.chains import AssistantClassificator
             self.model = AssistantClassificator(model_name="gpt-4o-mini")
         else:
             raise ValueError(f"The model type {self.model_type} is not supported.")
@@ -35,11 +37,27 @@ class ModelManager:
         
         return self.model.predict(input_text)
     
-    async def apredict(self, input_text):
+    async def apredict(self, input_text, context=None):
         """
         Generate the predicion.
+
+        `context` is an optional FeatureContext holding the embeddings already
+        computed for this request.
+        """
+        if not self.model:
+            raise ValueError("The model is not loaded. Call load_model() first.")
+
+        with span("model", self.model_type):
+            return await self.model.apredict(input_text, context=context)
+
+    async def apredict_batch(self, input_texts):
+        """
+        Generate the predictions of a batch of texts.
         """
         if not self.model:
             raise ValueError("The model is not loaded. Call load_model() first.")
+        if not hasattr(self.model, "apredict_batch"):
+            raise ValueError(f"The model type {self.model_type} does not support batch prediction.")
 
-        return await self.model.apredict(input_text)
+        with span("model", self.model_type):
+            return await self.model.apredict_batch(input_texts)
@@ -0,0 +1,267 @@
+import asyncio
+import json
+import os
+import random
+from pathlib import Path
+
+from inference.telemetry import span
+from config.config import get_logger
+
+logger = get_logger(__name__)
+
+OVERFLOW_POLICIES = ("drop", "sample")
+# Marks the end of the queue on shutdown.
+_STOP = object()
+
+
+class MonitoringWriter:
+    """
+    Background writer of prediction records.
+
+    Records are queued without blocking the request and a writer task flushes
+    them in batches, when `batch_size` records are waiting or every
+    `flush_interval` seconds. Failed writes are retried with jittered
+    exponential backoff and, once retries are exhausted, spilled to a local
+    append-only file that is replayed later.
+
+    When the queue is full the `overflow_policy` applies: "drop" discards the
+    new record, "sample" keeps a `sample_rate` fraction of them by evicting
+    the oldest queued record.
+
+    `container_factory` returns an object with an async `create_item(body=...)`
+    method, the Cosmos DB container in production or a fake one in tests.
+    """
+    def __init__(self, container_factory, max_queue_size: int = 10000, batch_size: int = 50,
+                 flush_interval: float = 1.0, max_retries: int = 3, retry_base_delay: float = 0.2,
+                 overflow_policy: str = "drop", sample_rate: float = 0.1, spill_path=None,
+                 replay_interval: float = 60.0):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"The overflow policy {overflow_policy} is not supported.")
+        self.container_factory = container_factory
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.overflow_policy = overflow_policy
+        self.sample_rate = sample_rate
+        self.spill_path = Path(spill_path) if spill_path else None
+        self.replay_interval = replay_interval
+
+        self._queue = None
+        self._writer = None
+        self._replayer = None
+        self._spill_lock = None
+        self._closing = False
+        self.counters = {
+            "submitted": 0,
+            "written": 0,
+            "dropped": 0,
+            "evicted": 0,
+            "failed": 0,
+            "spilled": 0,
+            "replayed": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._writer is not None and not self._writer.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._closing = False
+        self._spill_lock = asyncio.Lock()
+        self._writer = asyncio.create_task(self._run())
+        if self.spill_path is not None:
+            self._replayer = asyncio.create_task(self._replay_periodically())
+        logger.info("Monitoring writer started")
+
+    def submit(self, record: dict) -> bool:
+        """
+        Queue a record for writing. Never blocks or raises: the prediction
+        was already made, so returns False when the record was discarded by
+        the overflow policy or because the writer is not running.
+        """
+        self.counters["submitted"] += 1
+        if self._queue is None:
+            self.counters["dropped"] += 1
+            logger.error("Monitoring writer not started, dropping the prediction record")
+            return False
+        if self._closing:
+            self.counters["dropped"] += 1
+            return False
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.overflow_policy == "sample" and random.random() < self.sample_rate:
+            self._queue.get_nowait()
+            self._queue.put_nowait(record)
+            self.counters["evicted"] += 1
+            return True
+
+        self.counters["dropped"] += 1
+        return False
+
+    async def _next_batch(self):
+        """
+        Wait for a batch of records. Returns the batch and whether the stop
+        marker was reached.
+        """
+        batch = []
+        loop = asyncio.get_running_loop()
+        deadline = None
+        while len(batch) < self.batch_size:
+            try:
+                record = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                if deadline is None:
+                    record = await self._queue.get()
+                else:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        record = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+            if record is _STOP:
+                return batch, True
+            batch.append(record)
+            if deadline is None:
+                deadline = loop.time() + self.flush_interval
+        return batch, False
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._next_batch()
+            if batch:
+                try:
+                    await self._flush(batch)
+                except Exception as e:
+                    logger.error(f"Error flushing {len(batch)} monitoring records: {e}")
+
+    async def _write(self, records):
+        """
+        Write the records concurrently and return the ones that failed.
+        """
+        container = self.container_factory()
+        with span("cosmos_write", "monitoring"):
+            results = await asyncio.gather(
+                *(container.create_item(body=record) for record in records),
+                return_exceptions=True,
+            )
+        failed = []
+        for record, result in zip(records, results):
+            # A conflict means the record was already written by an earlier attempt.
+            if isinstance(result, Exception) and getattr(result, "status_code", None) != 409:
+                failed.append((record, result))
+        return failed
+
+    async def _flush(self, records):
+        pending = list(records)
+        for attempt in range(self.max_retries + 1):
+            try:
+                failed = await self._write(pending)
+            except Exception as e:
+                failed = [(record, e) for record in pending]
+
+            self.counters["written"] += len(pending) - len(failed)
+            pending = [record for record, _ in failed]
+            if not pending:
+                return
+            if attempt < self.max_retries:
+                delay = self.retry_base_delay * 2 ** attempt
+                logger.warning(f"Retrying {len(pending)} monitoring records in {delay:.2f}s: {failed[0][1]}")
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+
+        self.counters["failed"] += len(pending)
+        logger.error(f"Could not write {len(pending)} monitoring records: {failed[0][1]}")
+        await self._spill(pending)
+
+    async def _spill(self, records):
+        if self.spill_path is None:
+            return
+        lines = "".join(json.dumps(record, default=str) + "\n" for record in records)
+        async with self._spill_lock:
+            await asyncio.to_thread(self._append_spill, lines)
+        self.counters["spilled"] += len(records)
+
+    def _append_spill(self, lines):
+        self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    async def replay(self):
+        """
+        Write the spilled records again. Records that fail again go back to
+        the spill file.
+        """
+        if self.spill_path is None:
+            return
+        replaying_path = self.spill_path.with_suffix(self.spill_path.suffix + ".replaying")
+        async with self._spill_lock:
+            if not replaying_path.exists():
+                if not self.spill_path.exists():
+                    return
+                os.replace(self.spill_path, replaying_path)
+
+        records = await asyncio.to_thread(self._read_spill, replaying_path)
+        logger.info(f"Replaying {len(records)} spilled monitoring records")
+        for i in range(0, len(records), self.batch_size):
+            batch = records[i:i + self.batch_size]
+            written = self.counters["written"]
+            await self._flush(batch)
+            self.counters["replayed"] += self.counters["written"] - written
+        replaying_path.unlink()
+
+    @staticmethod
+    def _read_spill(path):
+        records = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+        return records
+
+    async def _replay_periodically(self):
+        while True:
+            await asyncio.sleep(self.replay_interval)
+            try:
+                await self.replay()
+            except Exception as e:
+                logger.error(f"Error replaying spilled monitoring records: {e}")
+
+    async def stop(self):
+        """
+        Flush every queued record and stop the background tasks.
+        """
+        if self._queue is None or self._closing:
+            return
+        self._closing = True
+        if self._replayer is not None:
+            self._replayer.cancel()
+            try:
+                await self._replayer
+            except asyncio.CancelledError:
+                pass
+            self._replayer = None
+
+        if self.running:
+            await self._queue.put(_STOP)
+            await self._writer
+        self._writer = None
+        logger.info(f"Monitoring writer stopped: {self.stats()}")
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_size": self.max_queue_size,
+            "overflow_policy": self.overflow_policy,
+            **self.counters,
+        }
@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 import time
 
@@ -5,51 +6,101 @@ from langchain_openai import ChatOpenAI
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
+from inference.clients import clients
+from inference.genai.cache import get_classification_cache, cached_response
+from inference.images import PreparedImage, get_image_preprocessor
 from inference.genai.schemas import ClassificationOutput
-from config.prompt import image_analysis_prompt
+from inference.limiter import get_limiter
+from inference.telemetry import span
+from config.prompt import image_analysis_prompt, image_analysis_prompt_version
 from config.config import ENV_VARIABLES
 
 class ImageAnalyser:
-    def __init__(self, model_type: str = "gpt-4o"):
+    def __init__(self, model_type: str = "gpt-4o", llm=None):
         self.model_type = model_type
-        self.model = ChatOpenAI(
+        self.model = llm or ChatOpenAI(
     model=model_type,
     api_key=ENV_VARIABLES["OPENAI_KEY"],
-    temperature=0.2
+    temperature=0.2,
+    http_async_client=clients.openai_http_client,
+    base_url=clients.openai_base_url,
         )
+        self.cache = get_classification_cache()
+        self.preprocessor = get_image_preprocessor()
+        self.requests = 0
+        self.cache_hits = {"exact": 0, "perceptual": 0}
 
-    async def apredict(self, image_base64):
+        # Compiled once and reused by every request.
+        self.structured_model = self.model.with_structured_output(
+            schema=ClassificationOutput,
+            method="function_calling",
+            include_raw=False,
+        )
+        # Static instructions first so every request shares the same prefix.
+        self.system_message = SystemMessage(content=image_analysis_prompt)
 
+    async def apredict(self, image):
+        """
+        Classify an image, given as base64 or already prepared by the image
+        stage. Known images, including near duplicates by perceptual hash,
+        are answered from the cache without calling the model.
+        """
         start = time.time()
-        if image_base64 is None:
+        if image is None:
             return {}
+        if not isinstance(image, PreparedImage):
+            image = await asyncio.to_thread(self.preprocessor.prepare, image)
 
-        id_predict = str(uuid.uuid4())
-        imgs_content = [{"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_base64}"}}]
+        self.requests += 1
+        if self.cache is not None:
+            cached = self.cache.get(self.model_type, image_analysis_prompt_version, image.digest)
+            if cached is not None:
+                self.cache_hits["exact"] += 1
+                return cached_response(cached, start, "exact")
+            cached, distance = self.cache.get_perceptual(self.model_type, image_analysis_prompt_version, image.perceptual_hash)
+            if cached is not None:
+                self.cache_hits["perceptual"] += 1
+                response = cached_response(cached, start, "perceptual")
+                response["metadata"]["cache_distance"] = distance
+                return response
 
-        structured_model = self.model.with_structured_output(
-            schema=ClassificationOutput,
-            method="function_calling",
-            include_raw=False,
-        )
+        id_predict = str(uuid.uuid4())
+        imgs_content = [{"type": "image_url", "image_url": {"url": image.data_url()}}]
 
-        result = await structured_model.ainvoke(
-                    [
-                        HumanMessage(
-                        content=[
-                            {"type": "text", "text": image_analysis_prompt}] + imgs_content
+        # Shares the rate limit of the model with the text classifier.
+        async with get_limiter(f"openai/{self.model_type}").slot():
+            with span("llm", "image"):
+                result = await self.structured_model.ainvoke(
+                            [
+                                self.system_message,
+                                HumanMessage(content=imgs_content)
+                            ]
                         )
-                    ]
-                )
         
         classification_result = result.Classification
         explanation_result = result.Explanation
 
-        return {
+        response = {
             "id_pred": id_predict,
             "result": classification_result,
             "metadata": {
                 "time": time.time() - start,
-                "explanation": explanation_result
+                "explanation": explanation_result,
+                "cache_hit": False,
+                "image": image.describe(),
             }
         }
+        if self.cache is not None:
+            self.cache.set(self.model_type, image_analysis_prompt_version, image.digest, response,
+                           perceptual_hash=image.perceptual_hash)
+        return response
+
+    def stats(self) -> dict:
+        hits = sum(self.cache_hits.values())
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "cache_hit_rate": hits / self.requests if self.requests else 0.0,
+            "llm_calls": self.requests - hits,
+            "preprocessing": self.preprocessor.stats(),
+        }
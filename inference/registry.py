@@ -0,0 +1,130 @@
+import asyncio
+import time
+from typing import Callable, Dict, Iterable
+
+from config.config import get_logger
+
+logger = get_logger(__name__)
+
+
+class ModelDisabled(KeyError):
+    pass
+
+
+class ModelRegistry:
+    """
+    Heavy inference components, built once and only when enabled in config.
+
+    Every component is loaded by its loader the first time it is requested,
+    or all together in parallel by `start`, which the FastAPI lifespan runs
+    in the background so the worker accepts connections right away. Sync
+    loaders run in a thread; async loaders may request other components.
+    A failed load is forgotten, so the next request for it tries again.
+    """
+    def __init__(self, enabled: Iterable[str]):
+        self.enabled = set(enabled)
+        self._loaders: Dict[str, Callable] = {}
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self._status: Dict[str, dict] = {}
+        self._provided = {}
+        self.startup_time = None
+
+    def register(self, name: str, loader: Callable, enabled: bool = True):
+        """
+        Register the loader of a component. `enabled` can switch off a
+        component on top of the enabled list, e.g. for config flags.
+        """
+        self._loaders[name] = loader
+        if not enabled:
+            self.enabled.discard(name)
+        if name in self.enabled:
+            self._status[name] = {"state": "pending"}
+
+    def provide(self, name: str, component):
+        """
+        Install an already built component instead of loading it, e.g. a
+        fake in the benchmarks.
+        """
+        self._provided[name] = component
+        self.enabled.add(name)
+        self._loaders.setdefault(name, lambda: component)
+        self._status[name] = {"state": "ready", "seconds": 0.0}
+
+    def is_enabled(self, name: str) -> bool:
+        return name in self.enabled and name in self._loaders
+
+    async def get(self, name: str):
+        """
+        The loaded component, loading it first if needed. Raises
+        ModelDisabled for components not enabled.
+        """
+        if not self.is_enabled(name):
+            raise ModelDisabled(name)
+        if name in self._provided:
+            return self._provided[name]
+        task = self._tasks.get(name)
+        if task is None:
+            task = self._tasks[name] = asyncio.ensure_future(self._load(name))
+        # A cancelled request must not cancel the load other requests wait on.
+        return await asyncio.shield(task)
+
+    def loaded(self, name: str):
+        """
+        The component if it is already loaded, None otherwise.
+        """
+        if name in self._provided:
+            return self._provided[name]
+        task = self._tasks.get(name)
+        if task is None or not task.done() or task.cancelled() or task.exception() is not None:
+            return None
+        return task.result()
+
+    async def _load(self, name: str):
+        loader = self._loaders[name]
+        self._status[name] = {"state": "loading"}
+        start = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(loader):
+                component = await loader()
+            else:
+                component = await asyncio.to_thread(loader)
+        except Exception as e:
+            self._status[name] = {"state": "failed", "error": str(e), "seconds": time.perf_counter() - start}
+            logger.error(f"Error al cargar {name}: {e}")
+            # The requests waiting on this load get the error, later ones retry it.
+            if self._tasks.get(name) is asyncio.current_task():
+                del self._tasks[name]
+            raise
+        self._status[name] = {"state": "ready", "seconds": time.perf_counter() - start}
+        logger.info(f"{name} loaded in {self._status[name]['seconds']:.2f}s")
+        return component
+
+    async def start(self):
+        """
+        Load every enabled component in parallel. The registry is ready once
+        all of them loaded.
+        """
+        start = time.perf_counter()
+        names = [name for name in self._loaders if self.is_enabled(name)]
+        await asyncio.gather(*(self.get(name) for name in names), return_exceptions=True)
+        self.startup_time = time.perf_counter() - start
+        if self.ready:
+            logger.info(f"Model registry ready in {self.startup_time:.2f}s")
+        else:
+            logger.error("Model registry started with failed components")
+
+    @property
+    def ready(self) -> bool:
+        """
+        Whether every enabled component is loaded right now, so a component
+        that failed at startup and loaded on a later retry counts.
+        """
+        states = [status["state"] for name, status in self._status.items() if self.is_enabled(name)]
+        return all(state == "ready" for state in states)
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "startup_time": self.startup_time,
+            "models": dict(self._status),
+        }
@@ -0,0 +1,157 @@
+"""
+Spans around each stage of a prediction (preprocess, embeddings, search,
+LLM call, booster predict, monitoring write), aggregated per stage and
+model into latency histograms, in-flight gauges and error counters, and
+optionally exported as OpenTelemetry spans.
+
+    with span("search", "azure"):
+        documents = await search_client.search(...)
+
+Each gunicorn worker keeps its own numbers; every scrape of
+/telemetry/metrics answers with those of the worker that served it.
+"""
+import threading
+import time
+
+from inference.metrics import Histogram
+from modeling.utils import load_config
+from config.config import get_logger
+
+logger = get_logger(__name__)
+config = load_config()
+
+# From 100us (stemming a message) to 30s (a slow LLM call).
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Span:
+    __slots__ = ("telemetry", "key", "start", "_otel")
+
+    def __init__(self, telemetry, key):
+        self.telemetry = telemetry
+        self.key = key
+        self._otel = None
+
+    def __enter__(self):
+        tracer = self.telemetry.tracer
+        if tracer is not None:
+            self._otel = tracer.start_as_current_span(self.key[0], attributes={"model": self.key[1]})
+            self._otel.__enter__()
+        self.telemetry._begin(self.key)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.telemetry._end(self.key, time.perf_counter() - self.start, exc_type is not None)
+        if self._otel is not None:
+            self._otel.__exit__(exc_type, exc, traceback)
+        return False
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Telemetry:
+    """
+    Registry of the stage metrics, keyed by (stage, model).
+    """
+    def __init__(self, enabled: bool = True, buckets=STAGE_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self.tracer = None
+        self._histograms = {}
+        self._in_flight = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def enable_opentelemetry(self, service_name: str):
+        """
+        Also export every span through the OpenTelemetry tracer provider the
+        process configured. Needs the opentelemetry-api package.
+        """
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            logger.warning("opentelemetry is not installed, spans are only aggregated")
+            return
+        self.tracer = trace.get_tracer(service_name)
+
+    def span(self, stage: str, model: str = ""):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, (stage, model))
+
+    def _begin(self, key):
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(f"{key[0]}_{key[1]}", buckets=self.buckets)
+                self._errors[key] = 0
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+
+    def _end(self, key, seconds: float, error: bool):
+        self._histograms[key].observe(seconds)
+        with self._lock:
+            self._in_flight[key] -= 1
+            if error:
+                self._errors[key] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            keys = list(self._histograms)
+            in_flight, errors = dict(self._in_flight), dict(self._errors)
+        return {
+            f"{stage}/{model}": {
+                **self._histograms[(stage, model)].snapshot(),
+                "in_flight": in_flight[(stage, model)],
+                "errors": errors[(stage, model)],
+            }
+            for stage, model in keys
+        }
+
+    def render_prometheus(self) -> str:
+        """
+        The metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP stage_duration_seconds Latency of each prediction stage.",
+            "# TYPE stage_duration_seconds histogram",
+        ]
+        for key, metric in snapshot.items():
+            labels = _labels(key)
+            for bound, count in metric["buckets"].items():
+                lines.append(f'stage_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"stage_duration_seconds_sum{{{labels}}} {metric['sum']}")
+            lines.append(f"stage_duration_seconds_count{{{labels}}} {metric['count']}")
+        lines += ["# HELP stage_in_flight Stage calls running right now.", "# TYPE stage_in_flight gauge"]
+        lines += [f"stage_in_flight{{{_labels(key)}}} {metric['in_flight']}" for key, metric in snapshot.items()]
+        lines += ["# HELP stage_errors_total Stage calls that raised.", "# TYPE stage_errors_total counter"]
+        lines += [f"stage_errors_total{{{_labels(key)}}} {metric['errors']}" for key, metric in snapshot.items()]
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key: str) -> str:
+    stage, model = key.split("/", 1)
+    return f'stage="{stage}",model="{model}"'
+
+
+telemetry_config = config['telemetry']
+telemetry = Telemetry(enabled=telemetry_config['enabled'])
+if telemetry_config['enabled'] and telemetry_config['opentelemetry']['enabled']:
+    telemetry.enable_opentelemetry(telemetry_config['opentelemetry']['service_name'])
+
+
+def span(stage: str, model: str = ""):
+    """
+    Time the enclosed block as `stage` of `model` in the shared telemetry.
+    """
+    return telemetry.span(stage, model)
@@ -1,23 +1,101 @@
+import json
 import pickle
-import re
 import uuid
 import time
+from pathlib import Path
 
 import numpy as np
-from nltk.corpus import stopwords
-from nltk.stem.porter import PorterStemmer
-
-from langchain_openai import OpenAIEmbeddings
+import xgboost as xgb
 
+from inference.embeddings import get_embedding_model
+from inference.engine import InferenceEngine, thread_budget
+from inference.telemetry import span
+from modeling.preprocessing import preprocess_text, preprocess_batch
+from modeling.utils import load_config
 from config.config import ENV_VARIABLES, get_logger
 
 logger = get_logger(__name__)
+config = load_config()
+
+
+def load_model(model_path='models/spam_model.pkl'):
+    """
+    Load the pickled XGBClassifier written by the training pipeline.
+    """
+    logger.info(f"Cargando modelo XGBoost desde {model_path}")
+    with open(model_path, 'rb') as f:
+        return pickle.load(f)
+
+
+# Boosters loaded by preload_booster, keyed by path.
+_preloaded_boosters = {}
+
+
+def preload_booster(model_path='models/spam_model.ubj'):
+    """
+    Load the booster once in the gunicorn master (preload_app) so every
+    forked worker shares its pages copy-on-write instead of loading its
+    own. Nothing is predicted here: XGBoost must not start its OpenMP
+    threads before the fork, the workers warm up after it.
+    """
+    _preloaded_boosters[str(Path(model_path))] = load_booster(model_path)
+
+
+def load_booster(model_path='models/spam_model.ubj', nthread=None):
+    """
+    Load the native booster exported by training and its metadata sidecar.
+    Falls back to the booster inside the pickle next to it for models
+    trained before the export existed. A booster preloaded in this process
+    is reused instead of read again.
+    """
+    model_path = Path(model_path)
+    metadata_path = model_path.with_suffix('.meta.json')
+    if str(model_path) in _preloaded_boosters:
+        booster, metadata = _preloaded_boosters[str(model_path)]
+        metadata = dict(metadata)
+    elif model_path.exists():
+        logger.info(f"Cargando booster XGBoost desde {model_path}")
+        booster = xgb.Booster(model_file=str(model_path))
+        metadata = json.loads(metadata_path.read_text()) if metadata_path.exists() else {}
+    else:
+        pickle_path = model_path.with_suffix('.pkl')
+        logger.warning(f"{model_path} not found, using the booster of {pickle_path}")
+        booster = load_model(pickle_path).get_booster()
+        metadata = {}
+    if nthread:
+        booster.set_param({"nthread": nthread})
+    metadata.setdefault("num_features", booster.num_features())
+    metadata.setdefault("threshold", 0.5)
+    return booster, metadata
+
+
+def booster_predict_proba(booster, matrix):
+    """
+    Spam probability of each row, predicted in place on contiguous float32
+    input so XGBoost does not copy or convert it.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    probabilities = booster.inplace_predict(matrix)
+    # Softprob objectives return one column per class.
+    return probabilities[:, 1] if probabilities.ndim == 2 else probabilities
+
 
 class XGBoostPredictor:
-    def __init__(self, model_path='models/spam_model.pkl'):
+    def __init__(self, model_path='models/spam_model.ubj', executor_workers=None, nthread=None):
         self.model_path = model_path
-        self.model = None
+        self.booster = None
+        self.metadata = None
         self.vectorizer = None
+        xgboost_config = config['inference']['xgboost']
+        if executor_workers is None:
+            executor_workers = xgboost_config['executor_workers']
+        self.nthread = nthread if nthread is not None else xgboost_config['nthread']
+        budget = thread_budget()
+        if budget:
+            # Under gunicorn each worker only gets its share of the cores.
+            self.nthread = min(self.nthread or budget, budget)
+            executor_workers = max(1, min(executor_workers, budget // self.nthread))
+        self.engine = InferenceEngine(max_workers=executor_workers, thread_name_prefix="xgboost")
         self._load_model_and_vectorizer()
         
     def _load_model_and_vectorizer(self):
@@ -25,47 +103,100 @@ class XGBoostPredictor:
         Load model XGBoost and embedding openai client.
         """
         try:
-            logger.info(f"Cargando modelo XGBoost desde {self.model_path}")
-            with open(self.model_path, 'rb') as f:
-                self.model = pickle.load(f)
-            
-            self.vectorizer = OpenAIEmbeddings(
-        openai_api_key=ENV_VARIABLES["OPENAI_KEY"],
-         model="text-embedding-3-small"
-    )
+            self.booster, self.metadata = load_booster(self.model_path, nthread=self.nthread)
+            self.threshold = self.metadata["threshold"]
+            self.warmup()
+
+            self.vectorizer = get_embedding_model("text-embedding-3-small")
         except Exception as e:
             logger.error(f"Error al cargar el modelo o vectorizador: {e}")
             raise e
+
+    def warmup(self):
+        """
+        Run one preprocess and predict so the first request does not pay for
+        the lazy initialization of the stopwords, the booster and its threads.
+        """
+        start = time.time()
+        # Also loads the stopwords, failing here if the corpus is missing.
+        preprocess_text("warm up")
+        self.predict_proba_vectors(np.zeros((1, self.metadata["num_features"]), dtype=np.float32))
+        logger.info(f"XGBoost warm-up in {(time.time() - start) * 1000:.1f} ms")
     
     def preprocess_text(self, text):
         """
         Preprocesa el texto de entrada para eliminar ruido y normalizar.
         """
         logger.info(f"Preprocesando texto: {text}")
-        ps = PorterStemmer()
-        sms = re.sub('[^a-zA-Z]', ' ', text)
-        sms = sms.lower()
-        sms = sms.split()
-        sms = [ps.stem(word) for word in sms if word not in stopwords.words('english')]
-        sms = ' '.join(sms)
-        return sms
+        with span("preprocess", "xgboost"):
+            return preprocess_text(text)
     
-    async def apredict(self, input_text):
+    def preprocess_texts(self, texts):
+        with span("preprocess", "xgboost"):
+            return preprocess_batch(texts)
+
+    def predict_proba_vectors(self, text_vectors):
+        """
+        Spam probability of a stacked matrix of embeddings. CPU bound, call it from the engine.
+        """
+        matrix = np.asarray(text_vectors, dtype=np.float32).reshape(len(text_vectors), -1)
+        with span("predict", "xgboost"):
+            return booster_predict_proba(self.booster, matrix)
+
+    def predict_vectors(self, text_vectors):
+        """
+        Label and spam probability of each embedding, with the threshold of
+        the model metadata (0.5, like XGBClassifier.predict).
+        """
+        probabilities = self.predict_proba_vectors(text_vectors)
+        return [('spam' if probability > self.threshold else 'ham', float(probability)) for probability in probabilities]
+
+    def predict_vector(self, text_vector):
+        return self.predict_vectors([text_vector])[0]
+
+    async def apredict(self, input_text, context=None):
         """
         Prediction model by XGBoost.
+
+        Preprocessing and booster predict run in the inference pool and the
+        embedding is requested with the async client, so nothing here blocks
+        the event loop. The preprocessed text and the embedding are taken
+        from `context` when given.
         """
         start = time.time()
         id_prediction = str(uuid.uuid4())
-        processed_text = self.preprocess_text(input_text)
-        text_vector = self.vectorizer.embed_query(processed_text)
-        text_vector = np.array(text_vector)
-        text_vector = text_vector.reshape(1, -1)
+        processed_text = context.processed_texts.get(input_text) if context is not None else None
+        if processed_text is None:
+            processed_text = await self.engine.run(self.preprocess_text, input_text)
+            if context is not None:
+                context.processed_texts[input_text] = processed_text
+        if context is not None:
+            text_vector = await context.embed(processed_text)
+        else:
+            text_vector = await self.vectorizer.aembed_query(processed_text)
+        result, probability = await self.engine.run(self.predict_vector, text_vector)
 
-        prediction = self.model.predict(text_vector)
-        result = 'spam' if prediction[0] == 1 else 'ham'
-        
         logger.info(f"Prediction result: {result}")
-        return {"id_pred": id_prediction, "result": result, "metadata": {"time": time.time() - start,"input_text": input_text}}
+        return {"id_pred": id_prediction, "result": result, "metadata": {"time": time.time() - start,"input_text": input_text, "probability": probability}}
+
+    async def apredict_batch(self, input_texts):
+        """
+        Prediction of several texts with one embedding call and one booster predict.
+        """
+        start = time.time()
+        processed_texts = await self.engine.run(self.preprocess_texts, input_texts)
+        text_vectors = await self.vectorizer.aembed_documents(processed_texts)
+        results = await self.engine.run(self.predict_vectors, text_vectors)
+        elapsed = time.time() - start
+
+        return [
+            {
+                "id_pred": str(uuid.uuid4()),
+                "result": result,
+                "metadata": {"time": elapsed, "input_text": input_text, "probability": probability, "batch_size": len(input_texts)}
+            }
+            for input_text, (result, probability) in zip(input_texts, results)
+        ]
 
     def predict(self, input_text):
         """
@@ -77,8 +208,7 @@ class XGBoostPredictor:
         
         text_vector = self.vectorizer.embed_query(processed_text)
 
-        prediction = self.model.predict(text_vector)
-        result = 'spam' if prediction[0] == 1 else 'ham'
-        
+        result, probability = self.predict_vector(text_vector)
+
         logger.info(f"Prediction result: {result}")
-        return {"id_pred": id_prediction, "result": result, "metadata": {"input_text": input_text}}
+        return {"id_pred": id_prediction, "result": result, "metadata": {"input_text": input_text, "probability": probability}}
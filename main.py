@@ -1,26 +1,62 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
 import uvicorn
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, ORJSONResponse
 
 
-from routers.predict import router
+from routers.predict import router, monitoring_writer, registry
 from routers.data import router_data
+from routers.telemetry import router_telemetry
+from inference.clients import clients
+from inference.limiter import Overloaded
 from config.config import ENV_VARIABLES
 
 from dotenv import load_dotenv
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await clients.start()
+    await monitoring_writer.start()
+    # Models load in the background; /ready reports when they are done.
+    warmup = asyncio.create_task(registry.start())
+    yield
+    warmup.cancel()
+    await monitoring_writer.stop()
+    await clients.close()
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.title = "Spam detection for Twilio use case"
 app.version = "0.0.1" 
 
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    """
+    An upstream limiter rejected the call: fail fast so the client backs off.
+    """
+    return ORJSONResponse(
+        {"detail": str(exc), "upstream": exc.upstream},
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 app.include_router(router)
 app.include_router(router_data)
+app.include_router(router_telemetry)
 
 @app.get('/', tags=['home'])
 def message():
     return HTMLResponse('<h1>Backend ML - Spam detection for Twilio use case</h1>')
 
+@app.get('/ready', tags=['home'])
+def ready():
+    """
+    Readiness of the worker: 200 once every enabled model is loaded and warmed up.
+    """
+    status = registry.status()
+    return ORJSONResponse(status, status_code=200 if status["ready"] else 503)
+
 if __name__ == '__main__':
     uvicorn.run('main:app', host='0.0.0.0', port=8000)
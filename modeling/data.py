@@ -1,13 +1,8 @@
 import pandas as pd
-from nltk.corpus import stopwords
-from nltk.stem.porter import PorterStemmer
-import re
-import nltk
-
-nltk.download('stopwords')
 
+from modeling.preprocessing import preprocess_text, preprocess_batch
 from modeling.utils import load_config
-from config.config import get_logger
+from config.config import get_logger, DATA_DIR
 
 logger = get_logger(__name__)
 config = load_config()
@@ -19,11 +14,21 @@ def ingest_data():
     df = pd.read_csv(raw_data_path)
     return df
 
-def preprocess_text(text):
-    ps = PorterStemmer()
-    sms = re.sub('[^a-zA-Z]', ' ', text)
-    sms = sms.lower()
-    sms = sms.split()
-    sms = [ps.stem(word) for word in sms if word not in stopwords.words('english')]
-    sms = ' '.join(sms)
-    return sms
\ No newline at end of file
+def load_valid_dataset():
+    df_valid = pd.read_csv(DATA_DIR / "valid"/ "sample.csv")
+    return df_valid
+
+
+def iter_chunks(path, chunksize: int = 50000, columns=None):
+    """
+    Stream a CSV or Parquet file as DataFrames of at most `chunksize` rows,
+    so files larger than memory can be processed.
+    """
+    path = str(path)
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=columns)
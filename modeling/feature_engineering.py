@@ -1,13 +1,154 @@
+import asyncio
+import random
+from pathlib import Path
 
-from langchain_openai import OpenAIEmbeddings
+import numpy as np
+import openai
 
-from config.config import ENV_VARIABLES
+from inference.embeddings import DiskVectorStore, embedding_key, get_embedding_model
+from modeling.utils import load_config
+from config.config import get_logger, BASE_DIR
+
+logger = get_logger(__name__)
+config = load_config()
+
+# Errors worth retrying: rate limits, timeouts and provider side failures.
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+def _retry_after(error) -> float:
+    """
+    Seconds requested by the provider in the Retry-After header, if any.
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+async def _embed_with_retry(embedding_model, texts, max_retries, base_delay):
+    for attempt in range(max_retries + 1):
+        try:
+            return await embedding_model.aembed_documents(texts)
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            delay = _retry_after(e) or base_delay * 2 ** attempt
+            delay += random.uniform(0, delay / 2)
+            logger.warning(f"Embedding batch of {len(texts)} failed ({type(e).__name__}), retry {attempt + 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def aembed_in_batches(texts, embedding_model=None, batch_size: int = 512, concurrency: int = 4,
+                            max_retries: int = 6, base_delay: float = 1.0) -> np.ndarray:
+    """
+    Embed a large list of texts as a float32 matrix, sending `batch_size`
+    texts per request with at most `concurrency` requests in flight.
+    Rate limits and transient errors are retried with exponential backoff,
+    honouring Retry-After when the provider sends it.
+    """
+    if embedding_model is None:
+        embedding_model = get_embedding_model("text-embedding-3-small")
+    texts = list(texts)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def embed(batch):
+        async with semaphore:
+            return await _embed_with_retry(embedding_model, batch, max_retries, base_delay)
+
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    results = await asyncio.gather(*(embed(batch) for batch in batches))
+    vectors = [vector for batch in results for vector in batch]
+    if not vectors:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+class FeatureStore:
+    """
+    Persistent embeddings of the training corpus, keyed by the hash of the
+    cleaned message and the embedding model, so a run only sends the rows it
+    has never seen to the provider.
+    """
+    def __init__(self, path=None, model: str = "text-embedding-3-small", batch_size: int = 512,
+                 concurrency: int = 4, max_retries: int = 6, persist_every: int = 10000):
+        if path is None:
+            path = BASE_DIR / config['training']['feature_store']['path']
+        self.path = Path(path) / model
+        self.model = model
+        self.store = DiskVectorStore(self.path)
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.persist_every = persist_every
+
+    def keys(self, texts):
+        return [embedding_key(text, self.model) for text in texts]
+
+    async def aembed_missing(self, texts) -> int:
+        """
+        Embed and store the distinct texts not in the store yet. Vectors are
+        persisted every `persist_every` texts, so an interrupted run keeps
+        what it already paid for. Returns the number of texts embedded.
+        """
+        keys = self.keys(texts)
+        rows = self.store.rows(keys)
+        missing = {key: text for key, text, row in zip(keys, texts, rows) if row < 0}
+        logger.info(f"Feature store: {len(texts) - int((rows < 0).sum())} cached rows, {len(missing)} texts to embed")
+
+        # The store is the cache here, skip the in-memory one.
+        embedding_model = get_embedding_model(self.model).embeddings
+        missing = list(missing.items())
+        for start in range(0, len(missing), self.persist_every):
+            chunk = missing[start:start + self.persist_every]
+            vectors = await aembed_in_batches(
+                [text for _, text in chunk], embedding_model=embedding_model, batch_size=self.batch_size,
+                concurrency=self.concurrency, max_retries=self.max_retries,
+            )
+            await asyncio.to_thread(self.store.put_many, zip([key for key, _ in chunk], vectors))
+        return len(missing)
+
+    def features(self, texts, output_path=None, block_size: int = 10000) -> np.memmap:
+        """
+        Feature matrix of `texts`, embedding the missing ones first. The rows
+        are copied block by block from the store into a .npy file that is
+        returned memory mapped.
+        """
+        texts = list(texts)
+        asyncio.run(self.aembed_missing(texts))
+
+        rows = self.store.rows(self.keys(texts))
+        if (rows < 0).any():
+            raise RuntimeError(f"{int((rows < 0).sum())} texts missing from the feature store after embedding")
+        matrix = self.store.matrix()
+
+        output_path = Path(output_path or self.path / "features.npy")
+        features = np.lib.format.open_memmap(output_path, mode="w+", dtype=np.float32,
+                                             shape=(len(texts), self.store.dimensions))
+        for start in range(0, len(texts), block_size):
+            features[start:start + block_size] = matrix[rows[start:start + block_size]]
+        features.flush()
+        del features
+        return np.load(output_path, mmap_mode="r")
 
 
 def create_features(corpus):
-    embedding_model = OpenAIEmbeddings(
-        openai_api_key=ENV_VARIABLES["OPENAI_KEY"],
+    """
+    Embeddings of the corpus as a read-only memory-mapped float32 matrix.
+    """
+    store_config = config['training']['feature_store']
+    feature_store = FeatureStore(
         model="text-embedding-3-small",
+        batch_size=store_config['embed_batch_size'],
+        concurrency=store_config['embed_concurrency'],
+        max_retries=store_config['max_retries'],
     )
-    corpus_embeddings = embedding_model.embed_documents(corpus)
-    return corpus_embeddings
\ No newline at end of file
+    return feature_store.features(corpus)
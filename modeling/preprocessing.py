@@ -0,0 +1,86 @@
+"""
+Text preprocessing shared by training and inference.
+
+Produces exactly the same output as the original implementation (letters
+only, lowercase, english stopwords removed, Porter stemming) but compiles the
+regex once, loads the stopwords once into a frozenset and memoizes stems.
+"""
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import nltk
+import pandas as pd
+from nltk.corpus import stopwords
+from nltk.stem.porter import PorterStemmer
+
+_NON_LETTERS = re.compile('[^a-zA-Z]')
+_stemmer = PorterStemmer()
+_stopwords = None
+
+
+def ensure_stopwords(download: bool = False):
+    """
+    Check that the NLTK stopwords corpus is installed. The service never
+    downloads it, the Docker image bakes it in; offline jobs may pass
+    download=True.
+    """
+    try:
+        nltk.data.find('corpora/stopwords')
+    except LookupError:
+        if not download:
+            raise LookupError(
+                "NLTK stopwords corpus not found: run `python -m nltk.downloader stopwords` "
+                "or point NLTK_DATA to a directory that has it"
+            )
+        nltk.download('stopwords', quiet=True)
+
+
+def get_stopwords() -> frozenset:
+    global _stopwords
+    if _stopwords is None:
+        ensure_stopwords()
+        _stopwords = frozenset(stopwords.words('english'))
+    return _stopwords
+
+
+@lru_cache(maxsize=500_000)
+def stem(word: str) -> str:
+    return _stemmer.stem(word)
+
+
+def preprocess_text(text: str) -> str:
+    """
+    Remove noise from a message and normalize it before embedding.
+    """
+    english_stopwords = get_stopwords()
+    words = _NON_LETTERS.sub(' ', text).lower().split()
+    return ' '.join([stem(word) for word in words if word not in english_stopwords])
+
+
+def _preprocess_chunk(texts):
+    return [preprocess_text(text) for text in texts]
+
+
+def preprocess_batch(texts, n_jobs: int = 1, chunksize: int = 5000, executor=None):
+    """
+    Preprocess a list or Series of texts. With n_jobs > 1 the texts are split
+    in chunks processed by a pool of processes; pass `executor` to reuse a
+    long lived pool across calls. A Series input returns a Series with the
+    same index, anything else returns a list.
+    """
+    index = texts.index if isinstance(texts, pd.Series) else None
+    texts = list(texts)
+    chunks = [texts[i:i + chunksize] for i in range(0, len(texts), chunksize)]
+
+    if executor is not None:
+        processed = [text for chunk in executor.map(_preprocess_chunk, chunks) for text in chunk]
+    elif n_jobs is None or n_jobs <= 1 or len(texts) <= chunksize:
+        processed = _preprocess_chunk(texts)
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            processed = [text for chunk in executor.map(_preprocess_chunk, chunks) for text in chunk]
+
+    if index is not None:
+        return pd.Series(processed, index=index)
+    return processed
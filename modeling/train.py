@@ -1,4 +1,7 @@
+import json
 import pickle
+import time
+
 import xgboost as xgb
 import mlflow
 import mlflow.xgboost
@@ -10,6 +13,29 @@ from config.config import get_logger
 logger = get_logger(__name__)
 config = load_config()
 
+def export_booster(model, model_output_path, name="spam_model"):
+    """
+    Save the native booster (UBJSON) and a metadata sidecar next to the
+    pickle, so inference can load the booster without the sklearn wrapper.
+    """
+    booster = model.get_booster()
+    booster.save_model(f"{model_output_path}/{name}.ubj")
+    metadata = {
+        "format": "ubj",
+        "xgboost_version": xgb.__version__,
+        "objective": model.objective,
+        "num_features": booster.num_features(),
+        "num_boosted_rounds": booster.num_boosted_rounds(),
+        "classes": ["ham", "spam"],
+        "threshold": 0.5,
+        "embedding_model": "text-embedding-3-small",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(f"{model_output_path}/{name}.meta.json", 'w') as f:
+        json.dump(metadata, f, indent=2)
+    logger.info(f"Booster exportado en {model_output_path}/{name}.ubj")
+    return metadata
+
 def train_model(X_train, y_train):
     params = config['model']['parameters']
     with mlflow.start_run():
@@ -22,4 +48,11 @@ def train_model(X_train, y_train):
     model_output_path = config['training']['model_output_path']
     with open(f"{model_output_path}/spam_model.pkl", 'wb') as f:
         pickle.dump(model, f)
+    export_booster(model, model_output_path)
     return model
+
+if __name__ == "__main__":
+    # Export the booster of an already trained pickle.
+    model_output_path = config['training']['model_output_path']
+    with open(f"{model_output_path}/spam_model.pkl", 'rb') as f:
+        export_booster(pickle.load(f), model_output_path)
@@ -1,8 +1,13 @@
 import yaml
 
-from config.config import CONFIG_DIR
+from config.config import CONFIG_DIR, ENV_VARIABLES
 
-def load_config(config_path=CONFIG_DIR / 'config.yaml'):
+def load_config(config_path=None):
+    """
+    The service config, from CONFIG_PATH when set (e.g. by the load test)
+    or config/config.yaml.
+    """
+    config_path = config_path or ENV_VARIABLES.get("CONFIG_PATH") or CONFIG_DIR / 'config.yaml'
     with open(config_path, 'r') as f:
         config = yaml.safe_load(f)
     return config
\ No newline at end of file
@@ -3,13 +3,12 @@ from pydantic import BaseModel
 from typing import List
 import uuid
 
-from langchain_openai import OpenAIEmbeddings
 from azure.cosmos import exceptions
-from azure.cosmos.aio import CosmosClient
-from azure.core.credentials import AzureKeyCredential
-from azure.search.documents import SearchClient  
 
 import logging
+from inference.clients import clients
+from inference.embeddings import get_embedding_model, embedding_cache_stats
+from inference.genai.cache import get_classification_cache
 from schemas.schema import NewKnowledge
 from config.config import get_logger, ENV_VARIABLES
 
@@ -17,12 +16,6 @@ logger = get_logger(__name__)
 
 router_data = APIRouter()
 
-# Create the async Cosmos DB client
-client = CosmosClient(
-    f"https://{ENV_VARIABLES['AZURE_COSMOSDB_ACCOUNT']}.documents.azure.com:443/",
-    credential=ENV_VARIABLES["AZURE_COSMOSDB_ACCOUNT_KEY"]
-)
-
 # Reference the database and container
 database_name = ENV_VARIABLES["AZURE_COSMOSDB_DATABASE"]
 container_name = ENV_VARIABLES["AZURE_COSMOSDB_EVALUATIONS_CONTAINER"]
@@ -30,8 +23,7 @@ container_name = ENV_VARIABLES["AZURE_COSMOSDB_EVALUATIONS_CONTAINER"]
 
 async def get_all_items():
     try:
-        database = client.get_database_client(database_name)
-        container = database.get_container_client(container_name)
+        container = clients.cosmos_container(container_name, database_name)
 
         # Query to retrieve all items
         query = "SELECT * FROM c"
@@ -54,19 +46,29 @@ async def read_items():
         logger.error(f"Failed to fetch items: {e}")
         raise HTTPException(status_code=500, detail="Error retrieving items from Cosmos DB")
 
+@router_data.get("/embeddings/stats")
+async def embeddings_stats():
+    """
+    Hit, miss and eviction counters of the shared embedding caches.
+    """
+    return embedding_cache_stats()
+
+@router_data.get("/classification_cache/stats")
+async def classification_cache_stats():
+    """
+    Hit and eviction counters of the LLM classification cache.
+    """
+    cache = get_classification_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
 @router_data.post("/continous_training")
 async def continous_training(new_knowledge: NewKnowledge):
 
-    search_client = SearchClient(
-        endpoint=f"https://{ENV_VARIABLES['AZURE_SEARCH_SERVICE']}.search.windows.net/",
-        index_name=ENV_VARIABLES['AZURE_SEARCH_INDEX'],
-        credential=AzureKeyCredential(ENV_VARIABLES['AZURE_SEARCH_KEY'])
-    )
+    search_client = clients.search_client()
 
-    embedding_model = OpenAIEmbeddings(
-        openai_api_key=ENV_VARIABLES["OPENAI_KEY"],
-        model="text-embedding-3-small",
-    )
+    embedding_model = get_embedding_model("text-embedding-3-small")
 
     try:
         record = [
@@ -75,10 +77,10 @@ async def continous_training(new_knowledge: NewKnowledge):
                 "message": new_knowledge.text,
                 "label": new_knowledge.label,
                 "source": "continous_training",
-                "main_vector": embedding_model.embed_query(new_knowledge.text),
+                "main_vector": await embedding_model.aembed_query(new_knowledge.text),
             }
         ]
-        result = search_client.upload_documents(documents=record)
+        result = await search_client.upload_documents(documents=record)
         succeeded = sum([1 for r in result if r.succeeded])
         logger.info(f"Uploaded {succeeded} of {len(record)} documents")
     
@@ -1,62 +1,411 @@
 from typing import Optional, Dict
 from datetime import datetime
 import uuid
+import time
 import asyncio
-import base64
+from functools import partial
+from tempfile import SpooledTemporaryFile
 
-from fastapi import  APIRouter, Request, BackgroundTasks, HTTPException
-from azure.cosmos import CosmosClient
+import orjson
+
+from fastapi import  APIRouter, Request, HTTPException, File, Form, Query, UploadFile
+from fastapi.responses import StreamingResponse
 
 from inference.models   import ModelManager
-from inference.multimodal import ImageAnalyser
-from config.config     import ENV_VARIABLES
+from inference.registry import ModelRegistry, ModelDisabled
+from inference.batching import MicroBatcher
+from inference.cascade  import CascadePolicy
+from inference.clients  import clients
+from inference.context  import FeatureContext
+from inference.deadline import Deadline, Hedger
+from inference.embeddings import get_embedding_model
+from inference.limiter  import Overloaded, limiter_stats
+from inference.images   import PreparedImage, InvalidImage, ImageTooLarge, get_image_preprocessor
+from inference.monitoring import MonitoringWriter
+from modeling.utils     import load_config
+from config.config     import ENV_VARIABLES, BASE_DIR
 from schemas.schema    import TextInput, PredictInputModel
 
 from config.config import get_logger
 
 logger = get_logger(__name__)
+config = load_config()
 
 
 router = APIRouter()
 
-xgboost_manager = ModelManager(model_type="xgboost")
-xgboost_manager.load_model()
+def load_manager(model_type: str) -> ModelManager:
+    manager = ModelManager(model_type=model_type)
+    manager.load_model()
+    return manager
+
+def load_image_analyser():
+    # Imported here so the vision client is only loaded when enabled.
+    from inference.multimodal import ImageAnalyser
+    return ImageAnalyser()
+
+async def load_cascade_policy() -> CascadePolicy:
+    cascade_config = config['cascade']
+    return CascadePolicy(
+        await registry.get("xgboost"),
+        await registry.get("gpt-4o-mini"),
+        await registry.get("gpt-4o"),
+        lower=cascade_config['lower'],
+        upper=cascade_config['upper'],
+    )
+
+TEXT_MODELS = ("xgboost", "gpt-4o", "gpt-4o-mini")
+
+# Models are built by the lifespan (or on first use), never at import time.
+registry = ModelRegistry(config['models']['enabled'])
+for model_type in TEXT_MODELS:
+    registry.register(model_type, partial(load_manager, model_type))
+registry.register("image", load_image_analyser)
+registry.register(
+    "cascade",
+    load_cascade_policy,
+    enabled=config['cascade']['enabled'] and all(registry.is_enabled(m) for m in TEXT_MODELS),
+)
+
+def preload_shared_artifacts():
+    """
+    Load the read-only artifacts of the enabled models in this process: the
+    gunicorn master calls it before forking so the workers share them
+    copy-on-write. The registry still builds the models in each worker and
+    picks these up instead of loading them again.
+    """
+    if registry.is_enabled("xgboost"):
+        from inference.xgboost import preload_booster
+        from modeling.preprocessing import get_stopwords
+        preload_booster()
+        get_stopwords()
+    if any(registry.is_enabled(m) for m in ("gpt-4o", "gpt-4o-mini")):
+        # Importing the chains module in the master also shares LangChain's modules.
+        import inference.genai.chains  # noqa: F401
+        from inference.genai.retrieval import get_search_backend
+        if config['retrieval']['backend'] == 'local':
+            get_search_backend()
+
+async def get_model(name: str):
+    """
+    Loaded model `name`, 404 when it is not enabled in config.
+    """
+    try:
+        return await registry.get(name)
+    except ModelDisabled:
+        raise HTTPException(status_code=404, detail=f"Model {name} is not enabled")
+
+async def _xgboost_predict_batch(input_texts):
+    xgboost_manager = await registry.get("xgboost")
+    return await xgboost_manager.apredict_batch(input_texts)
+
+batching_config = config['inference']['xgboost']['batching']
+xgboost_batcher = MicroBatcher(
+    _xgboost_predict_batch,
+    max_batch_size=batching_config['max_batch_size'],
+    max_wait_ms=batching_config['max_wait_ms'],
+    name="xgboost",
+) if batching_config['enabled'] and registry.is_enabled("xgboost") else None
+
+def monitoring_container():
+    return clients.cosmos_container(ENV_VARIABLES["AZURE_COSMOSDB_MONITORING_CONTAINER"])
+
+monitoring_config = config['monitoring']
+monitoring_writer = MonitoringWriter(
+    monitoring_container,
+    max_queue_size=monitoring_config['max_queue_size'],
+    batch_size=monitoring_config['batch_size'],
+    flush_interval=monitoring_config['flush_interval_seconds'],
+    max_retries=monitoring_config['max_retries'],
+    retry_base_delay=monitoring_config['retry_base_delay_seconds'],
+    overflow_policy=monitoring_config['overflow_policy'],
+    sample_rate=monitoring_config['sample_rate'],
+    spill_path=BASE_DIR / monitoring_config['spill_path'],
+    replay_interval=monitoring_config['replay_interval_seconds'],
+)
+
+def send_data_to_cosmos(data: Dict):
+    """
+    Queue a prediction record for the monitoring container.
+    """
+    monitoring_writer.submit(data)
+
+async def _bounded(semaphore: Optional[asyncio.Semaphore], coroutine):
+    if semaphore is None:
+        return await coroutine
+    async with semaphore:
+        return await coroutine
+
+deadline_config = config['deadline']
+
+def request_deadline(request: Optional[Request] = None) -> Deadline:
+    """
+    Deadline of the request: the seconds of the deadline header when sent,
+    the config default otherwise, capped at max_seconds.
+    """
+    seconds = deadline_config['default_seconds']
+    value = request.headers.get(deadline_config['header']) if request is not None else None
+    if value is not None:
+        try:
+            seconds = float(value)
+        except ValueError:
+            seconds = 0
+        if not seconds > 0:
+            raise HTTPException(status_code=400, detail=f"{deadline_config['header']} must be a positive number of seconds")
+    return Deadline(min(seconds, deadline_config['max_seconds']))
+
+hedging_config = config['hedging']
+hedgers = {
+    model_type: Hedger(
+        quantile=hedging_config['quantile'],
+        min_samples=hedging_config['min_samples'],
+        min_delay=hedging_config['min_delay_seconds'],
+        window=hedging_config['window'],
+    )
+    for model_type in hedging_config['models']
+} if hedging_config['enabled'] else {}
+
+async def call_model(model_type: str, manager, text: str, context=None):
+    """
+    apredict of a model, hedged when hedging is enabled for it.
+    """
+    hedger = hedgers.get(model_type)
+    if hedger is None:
+        return await manager.apredict(text, context=context)
+    return await hedger.run(lambda: manager.apredict(text, context=context))
+
+async def _guarded(name: str, coroutine, deadline: Deadline, errors: Dict) -> Dict:
+    """
+    Result of a model within the deadline or, when it times out, is rejected
+    or fails, a result marked with that status. The exception is kept in
+    `errors` under the model name.
+    """
+    start = time.time()
+    try:
+        return await deadline.wait_for(coroutine)
+    except asyncio.TimeoutError as e:
+        errors[name] = e
+        logger.warning(f"{name} did not finish within the {deadline.seconds}s deadline")
+        status, detail, extra = "timeout", f"Deadline of {deadline.seconds}s exceeded", {}
+    except Overloaded as e:
+        errors[name] = e
+        status, detail, extra = "rejected", str(e), {"retry_after": e.retry_after}
+    except Exception as e:
+        errors[name] = e
+        logger.error(f"Error en predicción de {name}: {e}")
+        status, detail, extra = "error", str(e), {}
+    return {"result": None, "status": status, "error": detail, **extra, "metadata": {"time": time.time() - start}}
+
+def _raise_if_nothing_finished(model_types, errors: Dict):
+    """
+    Fail the request only when every text model failed: 503 if a limiter
+    rejected one of them, 504 if they timed out, the error otherwise.
+    """
+    if not model_types or any(model_type not in errors for model_type in model_types):
+        return
+    failures = [errors[model_type] for model_type in model_types]
+    overloaded = next((e for e in failures if isinstance(e, Overloaded)), None)
+    if overloaded is not None:
+        raise overloaded
+    errors_besides_timeouts = [e for e in failures if not isinstance(e, asyncio.TimeoutError)]
+    if not errors_besides_timeouts:
+        raise HTTPException(status_code=504, detail="No model finished before the request deadline")
+    raise errors_besides_timeouts[0]
+
+async def _prepare(prepare, payload) -> PreparedImage:
+    try:
+        return await asyncio.to_thread(prepare, payload)
+    except ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidImage as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def prepare_image(image_base64: Optional[str]) -> Optional[PreparedImage]:
+    """
+    If an image is provided, decode, validate and downscale it once for the
+    image analysis.
+    """
+    if not image_base64:
+        return None
+    return await _prepare(get_image_preprocessor().prepare, image_base64)
+
+async def prepare_image_file(file) -> PreparedImage:
+    return await _prepare(get_image_preprocessor().prepare_file, file)
+
+async def read_image_body(request: Request) -> Optional[SpooledTemporaryFile]:
+    """
+    Stream the request body into a spooled buffer, which moves to disk past
+    1 MB, rejecting it as soon as it exceeds the image size limit. The
+    caller closes the buffer; None for an empty body.
+    """
+    max_bytes = get_image_preprocessor().max_bytes
+    size = 0
+    buffer = SpooledTemporaryFile(max_size=1024 * 1024)
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Image larger than {max_bytes} bytes")
+            buffer.write(chunk)
+    except BaseException:
+        buffer.close()
+        raise
+    if size == 0:
+        buffer.close()
+        return None
+    buffer.seek(0)
+    return buffer
 
-gpt_4o_manager = ModelManager(model_type="gpt-4o")
-gpt_4o_manager.load_model()
+async def analyse_image(image: Optional[PreparedImage]) -> Dict:
+    if image is None:
+        return {}
+    if not registry.is_enabled("image"):
+        return {"enabled": False}
+    multimodal_analyser = await registry.get("image")
+    return await multimodal_analyser.apredict(image)
+
+async def run_models(text: str, image: Optional[PreparedImage], limits: Optional[Dict[str, asyncio.Semaphore]] = None,
+                     deadline: Optional[Deadline] = None) -> Dict:
+    """
+    Run the enabled text models (all of them, or the cascade when enabled)
+    and the image analysis. `limits` bounds the concurrent calls per backend.
+
+    Every model call gets the time left until `deadline` (the config default
+    when not given). Models that time out, are rejected by a limiter or fail
+    are returned with "status" and "error" instead of failing the request,
+    unless no text model finished.
+    """
+    limits = limits or {}
+    deadline = deadline or request_deadline()
+    # Seen by the model calls, e.g. the limiter queues.
+    deadline.activate()
+    errors = {}
+    # Shared by the models of the request, so each distinct text is embedded once.
+    context = FeatureContext(get_embedding_model("text-embedding-3-small"))
+
+    if registry.is_enabled("cascade"):
+        model_types = ["cascade"]
+        cascade_policy = await registry.get("cascade")
+        # The LLM embeddings are only computed if the cascade escalates.
+        cascade_result, image_result = await asyncio.gather(
+            _guarded("cascade", _bounded(limits.get("cascade"), cascade_policy.apredict(text, context=context)), deadline, errors),
+            _guarded("image_analysis", _bounded(limits.get("image"), analyse_image(image)), deadline, errors),
+        )
+        text_results = {"cascade": cascade_result} if "cascade" in errors else cascade_result
+    else:
+        model_types = [model_type for model_type in TEXT_MODELS if registry.is_enabled(model_type)]
+        managers = {model_type: await registry.get(model_type) for model_type in model_types}
 
-gpt_4o_mini_manager = ModelManager(model_type="gpt-4o-mini")
-gpt_4o_mini_manager.load_model()
+        # XGBoost embeds the stemmed text and the LLMs the raw text: request
+        # the distinct inputs in one call and share them across models.
+        texts = []
+        try:
+            if "xgboost" in managers:
+                xgboost_model = managers["xgboost"].model
+                processed_text = await xgboost_model.engine.run(xgboost_model.preprocess_text, text)
+                # Reused by XGBoostPredictor.apredict instead of preprocessing again.
+                context.processed_texts[text] = processed_text
+                texts.append(processed_text)
+            if any(model_type != "xgboost" for model_type in model_types):
+                texts.append(text)
+            await deadline.wait_for(context.prefetch(texts))
+        except Exception as e:
+            # Each model embeds what is missing itself, or reports the error.
+            logger.warning(f"Embedding prefetch failed: {e!r}")
 
-multimodal_analyser = ImageAnalyser()
+        *results, image_result = await asyncio.gather(
+            *(
+                _guarded(model_type, _bounded(limits.get(model_type), call_model(model_type, managers[model_type], text, context)), deadline, errors)
+                for model_type in model_types
+            ),
+            _guarded("image_analysis", _bounded(limits.get("image"), analyse_image(image)), deadline, errors),
+        )
+        text_results = dict(zip(model_types, results))
 
-async def send_data_to_cosmos(data: Dict):
-    client = CosmosClient(f"https://{ENV_VARIABLES['AZURE_COSMOSDB_ACCOUNT']}.documents.azure.com:443/", credential=ENV_VARIABLES["AZURE_COSMOSDB_ACCOUNT_KEY"])
-    database = client.get_database_client(ENV_VARIABLES["AZURE_COSMOSDB_DATABASE"])
-    container = database.get_container_client(ENV_VARIABLES["AZURE_COSMOSDB_MONITORING_CONTAINER"])
-    container.create_item(body=data)
-    print("Item saved successfully")
+    _raise_if_nothing_finished(model_types, errors)
+    return {
+        **text_results,
+        "image_analysis": image_result,
+        "deadline": {"seconds": deadline.seconds, "partial": bool(errors), "failed": sorted(errors)},
+    }
 
 @router.post("/xgboost/predict")
 async def predict_xgboost(request: Request, input_text: TextInput):
     """
     Predict using XGBoost model.
     """
+    deadline = request_deadline(request)
+    deadline.activate()
+    xgboost_manager = await get_model("xgboost")
     try:
-        result = await xgboost_manager.apredict(input_text.text)
+        if xgboost_batcher is not None:
+            return await deadline.wait_for(xgboost_batcher.submit(input_text.text))
+        result = await deadline.wait_for(xgboost_manager.apredict(input_text.text))
         return result
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Prediction did not finish before the request deadline")
+    except Overloaded:
+        # Answered with 503 and Retry-After by the handler of main.
+        raise
     except Exception as e:
         logger.error(f"Error en predicción de spam: {e}")
         raise HTTPException(status_code=500, detail="Error interno en la predicción de spam")
+
+@router.get("/monitoring/stats")
+async def monitoring_stats():
+    """
+    Queue depth and write counters of the monitoring writer.
+    """
+    return monitoring_writer.stats()
+
+@router.get("/xgboost/batching/stats")
+async def xgboost_batching_stats():
+    """
+    Batch size and queue wait histograms of the XGBoost micro-batcher.
+    """
+    if xgboost_batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **xgboost_batcher.stats()}
+
+@router.get("/limits/stats")
+async def limits_stats():
+    """
+    Concurrency limit, queue depth and rejections of each upstream limiter.
+    """
+    return limiter_stats()
+
+@router.get("/hedging/stats")
+async def hedging_stats():
+    """
+    Hedged calls, hedge wins and current hedge delay of each model.
+    """
+    return {model_type: hedger.stats() for model_type, hedger in hedgers.items()}
+
+@router.get("/images/stats")
+async def images_stats():
+    """
+    Bytes saved by the image stage and verdict cache hit rate of the image analysis.
+    """
+    multimodal_analyser = registry.loaded("image")
+    if multimodal_analyser is None:
+        return {"enabled": registry.is_enabled("image"), "loaded": False}
+    return multimodal_analyser.stats()
     
 @router.post("/generative/gpt-4o")
 async def predict_gpt_4o(request: Request, input_text: TextInput):
     """
     Predict using GPT-4o model.
     """
+    deadline = request_deadline(request)
+    deadline.activate()
+    gpt_4o_manager = await get_model("gpt-4o")
     try:
-        result = await gpt_4o_manager.apredict(input_text.text)
+        result = await deadline.wait_for(call_model("gpt-4o", gpt_4o_manager, input_text.text))
         return result
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Prediction did not finish before the request deadline")
+    except Overloaded:
+        raise
     except Exception as e:
         logger.error(f"Error en predicción de spam: {e}")
         raise HTTPException(status_code=500, detail="Error interno en la predicción de spam")
@@ -66,55 +415,207 @@ async def predict_gpt_4o_mini(request: Request, input_text: TextInput):
     """
     Predict using GPT-4o-mini model.
     """
+    deadline = request_deadline(request)
+    deadline.activate()
+    gpt_4o_mini_manager = await get_model("gpt-4o-mini")
     try:
-        result = await gpt_4o_mini_manager.apredict(input_text.text)
+        result = await deadline.wait_for(call_model("gpt-4o-mini", gpt_4o_mini_manager, input_text.text))
         return result
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Prediction did not finish before the request deadline")
+    except Overloaded:
+        raise
     except Exception as e:
         logger.error(f"Error en predicción de spam: {e}")
         raise HTTPException(status_code=500, detail="Error interno en la predicción de spam")
     
+async def predict_all(text: Optional[str], image: Optional[PreparedImage], limits: Optional[Dict[str, asyncio.Semaphore]] = None,
+                      deadline: Optional[Deadline] = None) -> Dict:
+    """
+    Run every model and queue the prediction record for monitoring. Shared by
+    the JSON, multipart, raw image and batch variants of /predict.
+    """
+    results = await run_models(text, image, limits, deadline)
+
+    pred_results = {
+            "id": str(uuid.uuid4()),
+            "predId": str(uuid.uuid4()),
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            **results,
+        }
+
+    send_data_to_cosmos(pred_results)
+    return pred_results
+
+async def _predict_or_500(text: Optional[str], image: Optional[PreparedImage], deadline: Deadline) -> Dict:
+    try:
+        return await predict_all(text, image, deadline=deadline)
+    except (Overloaded, HTTPException):
+        raise
+    except Exception as e:
+        logger.error(f"Error en predicción de spam: {e}")
+        raise HTTPException(status_code=500, detail="Error interno en la predicción de spam")
+
 # predict with all models
 @router.post("/predict")
-async def predict(request: Request, background_tasks: BackgroundTasks):
+async def predict(request: Request, input_data: PredictInputModel):
     """
-    Predict using all models.
+    Predict using all models, with the image as base64 inside the JSON body.
     """
-    pred_id = str(uuid.uuid4()) #predId
-    data = await request.json()
+    deadline = request_deadline(request)
+    image = await prepare_image(input_data.image)
+    return await _predict_or_500(input_data.text, image, deadline)
+
+@router.post("/predict/upload")
+async def predict_upload(request: Request, text: str = Form(..., min_length=1), image: Optional[UploadFile] = File(None)):
+    """
+    Predict using all models, with the image uploaded as a multipart file.
+    The file is spooled to disk by the multipart parser and decoded from
+    there, without the base64 overhead.
+    """
+    deadline = request_deadline(request)
+    prepared = None
+    if image is not None:
+        max_bytes = get_image_preprocessor().max_bytes
+        if image.size is not None and image.size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Image larger than {max_bytes} bytes")
+        prepared = await prepare_image_file(image.file)
+    return await _predict_or_500(text, prepared, deadline)
+
+@router.post("/predict/image")
+async def predict_image(request: Request, text: str = Query(..., min_length=1)):
+    """
+    Predict using all models, with the raw image bytes as the request body and
+    the text as a query parameter.
+    """
+    deadline = request_deadline(request)
+    body = await read_image_body(request)
+    prepared = None
+    if body is not None:
+        with body:
+            prepared = await prepare_image_file(body)
+    return await _predict_or_500(text, prepared, deadline)
+
+BATCH_MODELS = ("xgboost", "ensemble")
+# Longest NDJSON line: a base64 image of images.max_bytes plus room for the text.
+MAX_LINE_BYTES = config['images']['max_bytes'] * 4 // 3 + config['batch']['line_slack_bytes']
+# Yielded by _read_ndjson in place of a line longer than MAX_LINE_BYTES.
+_OVERSIZED = object()
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Streaming response whose iterator reads the request body while it writes
+    the results. StreamingResponse listens for the client disconnect on the
+    same receive channel, which would consume the body chunks, so this one
+    only streams; a disconnect surfaces as an error reading the body or
+    sending a line.
+    """
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+async def _read_ndjson(request: Request, max_line_bytes: int = MAX_LINE_BYTES):
+    """
+    Yield the lines of a streamed NDJSON body without buffering all of it.
+    Only the new chunk is scanned for newlines. A line longer than
+    `max_line_bytes` is discarded as it arrives and yields _OVERSIZED.
+    """
+    parts, size, oversized = [], 0, False
+    async for chunk in request.stream():
+        start = 0
+        while start <= len(chunk):
+            end = chunk.find(b"\n", start)
+            piece = chunk[start:] if end == -1 else chunk[start:end]
+            if not oversized:
+                size += len(piece)
+                if size > max_line_bytes:
+                    oversized, parts = True, []
+                elif piece:
+                    parts.append(piece)
+            if end == -1:
+                break
+            if oversized:
+                yield _OVERSIZED
+            else:
+                line = b"".join(parts)
+                if line.strip():
+                    yield line
+            parts, size, oversized = [], 0, False
+            start = end + 1
+    if oversized:
+        yield _OVERSIZED
+    else:
+        line = b"".join(parts)
+        if line.strip():
+            yield line
+
+async def _classify_record(index: int, line: bytes, models: str, limits: Dict[str, asyncio.Semaphore]) -> Dict:
     try:
-        
-        text = data.get('text', None)
-        image_base64 = data.get('image', None) # This can be None if not provided
-
-        # If an image is provided, validate that it is a valid Base64 string
-        if image_base64:
-            try:
-                # Decode to verify the image is a valid base64 string
-                base64.b64decode(image_base64)
-            except Exception as e:
-                raise HTTPException(status_code=400, detail="Invalid image encoding")
-
-        xg_result, gpt_4o_result, gpt_4o_mini_result, image_result = await asyncio.gather(
-            xgboost_manager.apredict(text),
-            gpt_4o_manager.apredict(text),
-            gpt_4o_mini_manager.apredict(text),
-            multimodal_analyser.apredict(image_base64)
-        )
+        record = orjson.loads(line)
+        text = record.get('text', None)
+        if not isinstance(text, str) or not text:
+            raise ValueError("Every record needs a non-empty 'text' string.")
 
+        if models == "xgboost":
+            xgboost_manager = await get_model("xgboost")
+            if xgboost_batcher is not None:
+                result = await _bounded(limits["xgboost"], xgboost_batcher.submit(text))
+            else:
+                result = await _bounded(limits["xgboost"], xgboost_manager.apredict(text))
+            return {"index": index, "xgboost": result}
 
-        pred_results = {
-                "id": str(uuid.uuid4()),
-                "predId": pred_id,
-                "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "xgboost": xg_result,
-                "gpt-4o": gpt_4o_result,
-                "gpt-4o-mini": gpt_4o_mini_result,
-                "image_analysis": image_result,
-            }
-        
-        background_tasks.add_task(send_data_to_cosmos, pred_results)
-        return pred_results
-    
+        image = await prepare_image(record.get('image', None))
+        pred_results = await predict_all(text, image, limits)
+        return {"index": index, **pred_results}
+
+    except HTTPException as e:
+        return {"index": index, "error": e.detail}
+    except Overloaded as e:
+        return {"index": index, "error": str(e), "retry_after": e.retry_after}
     except Exception as e:
-        logger.error(f"Error en predicción de spam: {e}")
-        raise HTTPException(status_code=500, detail="Error interno en la predicción de spam")
\ No newline at end of file
+        logger.error(f"Error en predicción de spam del registro {index}: {e}")
+        return {"index": index, "error": str(e)}
+
+async def _stream_batch(request: Request, models: str):
+    batch_config = config['batch']
+    limits = {name: asyncio.Semaphore(size) for name, size in batch_config['concurrency'].items()}
+    max_in_flight = batch_config['max_in_flight']
+
+    pending = set()
+    index = 0
+    try:
+        async for line in _read_ndjson(request):
+            if line is _OVERSIZED:
+                yield orjson.dumps({"index": index, "error": f"Line longer than {MAX_LINE_BYTES} bytes"}) + b"\n"
+                index += 1
+                continue
+            pending.add(asyncio.create_task(_classify_record(index, line, models, limits)))
+            index += 1
+            # Stop reading input while the window is full, which keeps memory constant.
+            while len(pending) >= max_in_flight:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield orjson.dumps(task.result(), default=str) + b"\n"
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield orjson.dumps(task.result(), default=str) + b"\n"
+    finally:
+        # The client went away: do not keep classifying records nobody will read.
+        for task in pending:
+            task.cancel()
+
+@router.post("/predict/batch")
+async def predict_batch(request: Request, models: str = "xgboost"):
+    """
+    Classify a streamed NDJSON body of {"text", "image"} records. Results are
+    streamed back as NDJSON in completion order, each with the `index` of its
+    input line. `models` is "xgboost" or "ensemble" (the models of /predict).
+    """
+    if models not in BATCH_MODELS:
+        raise HTTPException(status_code=400, detail=f"models must be one of {', '.join(BATCH_MODELS)}")
+    return NDJSONStreamingResponse(_stream_batch(request, models))
@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from inference.telemetry import telemetry
+
+router_telemetry = APIRouter()
+
+
+@router_telemetry.get("/telemetry/metrics", response_class=PlainTextResponse)
+def telemetry_metrics():
+    """
+    Stage latency histograms, in-flight gauges and errors of this worker in
+    the Prometheus text format. /metrics serves the stored evaluations.
+    """
+    return PlainTextResponse(telemetry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@router_telemetry.get("/telemetry/stats")
+def telemetry_stats():
+    """
+    Same metrics as JSON, with the mean latency of each stage.
+    """
+    return telemetry.snapshot()
@@ -5,7 +5,7 @@ class TextInput(BaseModel):
     text: str
 
 class PredictInputModel(BaseModel):
-    text: Optional[str] = Field(None, description="The text input for analysis")
+    text: str = Field(..., min_length=1, description="The text input for analysis")
     image: Optional[str] = Field(None, description="Base64 encoded image for analysis (optional)")
 
 class NewKnowledge(BaseModel):
@@ -0,0 +1,164 @@
+"""
+Score a CSV or Parquet file of messages offline with the XGBoost model.
+
+The input is streamed in chunks: each chunk is preprocessed on a process
+pool, embedded in concurrent batches and scored with one vectorized
+inplace_predict call, then written as its own Parquet part file. A
+checkpoint records the finished chunks, so rerunning the same command
+after a failure resumes from the first unfinished chunk.
+
+    python scoring_pipeline.py data/archive.csv --output data/scores/archive/ --id-column id
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from inference.embeddings import get_embedding_model
+from inference.xgboost import booster_predict_proba, load_booster
+from modeling.data import iter_chunks
+from modeling.feature_engineering import aembed_in_batches
+from modeling.preprocessing import ensure_stopwords, preprocess_batch
+from modeling.utils import load_config
+
+from config.config import get_logger, BASE_DIR
+
+logger = get_logger(__name__)
+config = load_config()
+
+
+class Checkpoint:
+    """
+    Finished chunks of a scoring run, rewritten atomically after each chunk.
+    """
+    def __init__(self, path, run: dict):
+        self.path = Path(path)
+        self.run = run
+        self.completed = {}
+        if self.path.exists():
+            state = json.loads(self.path.read_text())
+            if state["run"] != run:
+                raise ValueError(
+                    f"{self.path} belongs to a different run ({state['run']}), "
+                    "use another output directory or remove it"
+                )
+            self.completed = {int(chunk_id): rows for chunk_id, rows in state["completed"].items()}
+
+    def __contains__(self, chunk_id):
+        return chunk_id in self.completed
+
+    def mark(self, chunk_id: int, rows: int):
+        self.completed[chunk_id] = rows
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"run": self.run, "completed": self.completed}, indent=2))
+        os.replace(tmp_path, self.path)
+
+
+def write_part(frame: pd.DataFrame, output_dir: Path, chunk_id: int):
+    part_path = output_dir / f"part-{chunk_id:06d}.parquet"
+    # Files starting with "_" are ignored by Parquet dataset readers.
+    tmp_path = output_dir / f"_{part_path.name}.tmp"
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, part_path)
+
+
+async def score_file(input_path, output_dir, text_column="message", id_column=None, chunksize=20000,
+                     preprocess_jobs=4, embed_batch_size=512, embed_concurrency=4, max_retries=6,
+                     model_path="models/spam_model.ubj", use_cache=False):
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    run = {"input": str(Path(input_path).resolve()), "chunksize": chunksize, "model": str(model_path)}
+    checkpoint = Checkpoint(output_dir / "_checkpoint.json", run)
+    if checkpoint.completed:
+        logger.info(f"Resuming, {len(checkpoint.completed)} chunks already scored")
+
+    ensure_stopwords(download=True)
+    booster, metadata = load_booster(model_path)
+    embedding_model = get_embedding_model("text-embedding-3-small")
+    if not use_cache:
+        # Archives are mostly seen once: by default skip the memory and disk
+        # caches instead of filling them with one-off vectors.
+        embedding_model = embedding_model.embeddings
+
+    columns = [text_column] + ([id_column] if id_column else [])
+    stats = {"chunks": 0, "rows": 0, "skipped_chunks": 0}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=preprocess_jobs) as pool:
+        async def prepare(chunk_id, df):
+            texts = df[text_column].fillna("").astype(str)
+            cleaned = await asyncio.to_thread(preprocess_batch, texts, chunksize=2000, executor=pool)
+            return chunk_id, df, cleaned
+
+        async def score(chunk_id, df, cleaned):
+            vectors = await aembed_in_batches(
+                cleaned, embedding_model=embedding_model, batch_size=embed_batch_size,
+                concurrency=embed_concurrency, max_retries=max_retries,
+            )
+            probabilities = await asyncio.to_thread(booster_predict_proba, booster, vectors)
+            frame = pd.DataFrame({
+                "row": np.arange(len(df)) + chunk_id * chunksize,
+                "probability": probabilities.astype(np.float32),
+                "prediction": np.where(probabilities > metadata["threshold"], "spam", "ham"),
+            })
+            if id_column:
+                frame.insert(0, id_column, df[id_column].to_numpy())
+            await asyncio.to_thread(write_part, frame, output_dir, chunk_id)
+            checkpoint.mark(chunk_id, len(df))
+            stats["chunks"] += 1
+            stats["rows"] += len(df)
+            logger.info(f"Chunk {chunk_id} scored ({len(df)} rows, {stats['rows'] / (time.perf_counter() - start):.0f} rows/s)")
+
+        # Preprocessing of the next chunk overlaps the embedding of the current one.
+        pending = None
+        for chunk_id, df in enumerate(iter_chunks(input_path, chunksize=chunksize, columns=columns)):
+            if chunk_id in checkpoint:
+                stats["skipped_chunks"] += 1
+                continue
+            task = asyncio.create_task(prepare(chunk_id, df))
+            if pending is not None:
+                await score(*await pending)
+            pending = task
+        if pending is not None:
+            await score(*await pending)
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["output"] = str(output_dir)
+    return stats
+
+
+def main():
+    scoring_config = config['scoring']
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV or Parquet file")
+    parser.add_argument("--output", help="directory of the Parquet part files and the checkpoint")
+    parser.add_argument("--text-column", default="message")
+    parser.add_argument("--id-column", help="column copied to the output next to the scores")
+    parser.add_argument("--chunksize", type=int, default=scoring_config['chunksize'])
+    parser.add_argument("--jobs", type=int, default=scoring_config['preprocess_jobs'])
+    parser.add_argument("--embed-batch-size", type=int, default=scoring_config['embed_batch_size'])
+    parser.add_argument("--embed-concurrency", type=int, default=scoring_config['embed_concurrency'])
+    parser.add_argument("--max-retries", type=int, default=scoring_config['max_retries'])
+    parser.add_argument("--model-path", default="models/spam_model.ubj")
+    parser.add_argument("--use-cache", action="store_true",
+                        help="go through the embeddings cache, e.g. when rescoring messages already embedded")
+    args = parser.parse_args()
+
+    output = args.output or BASE_DIR / scoring_config['output_path'] / Path(args.input).stem
+    stats = asyncio.run(score_file(
+        args.input, output, text_column=args.text_column, id_column=args.id_column,
+        chunksize=args.chunksize, preprocess_jobs=args.jobs, embed_batch_size=args.embed_batch_size,
+        embed_concurrency=args.embed_concurrency, max_retries=args.max_retries,
+        model_path=args.model_path, use_cache=args.use_cache,
+    ))
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
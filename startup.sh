@@ -1 +1 @@
-gunicorn -w 2 -k uvicorn.workers.UvicornWorker main:app
+gunicorn -c gunicorn.conf.py main:app
\ No newline at end of file
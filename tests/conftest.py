@@ -0,0 +1,15 @@
+"""
+The project modules read their credentials at import time, the tests run
+with the dummy ones of the benchmarks and never reach the network.
+"""
+import pytest
+
+from benchmarks.fakes import set_dummy_env
+
+set_dummy_env()
+
+
+@pytest.fixture
+def anyio_backend():
+    # The service only runs on asyncio.
+    return "asyncio"
@@ -0,0 +1,30 @@
+import pytest
+
+from routers.predict import _OVERSIZED, _read_ndjson
+
+
+class StreamedRequest:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+async def read(chunks, max_line_bytes=20):
+    return [line async for line in _read_ndjson(StreamedRequest(chunks), max_line_bytes)]
+
+
+@pytest.mark.anyio
+async def test_lines_split_across_chunks():
+    lines = await read([b'{"a": 1}\n{"b"', b': 2}\n\n', b'{"c": 3}'])
+
+    assert lines == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}']
+
+
+@pytest.mark.anyio
+async def test_oversized_lines_are_reported_and_skipped():
+    lines = await read([b'{"a": 1}\n{"image": "', b"x" * 50, b'"}\n{"b": 2}\n', b"y" * 30])
+
+    assert lines == [b'{"a": 1}', _OVERSIZED, b'{"b": 2}', _OVERSIZED]
@@ -0,0 +1,12 @@
+from config.prompt import classification_prompt_version, image_analysis_prompt_version
+from inference.genai.cache import ClassificationCache
+
+
+def test_text_and_image_verdicts_do_not_share_keys():
+    cache = ClassificationCache()
+    digest = "3f2a9c"
+    cache.set("gpt-4o", image_analysis_prompt_version, digest, {"Classification": "spam"})
+
+    # A message whose text equals the digest of a cached image.
+    assert cache.get("gpt-4o", classification_prompt_version, digest) is None
+    assert cache.get("gpt-4o", image_analysis_prompt_version, digest) == {"Classification": "spam"}
@@ -0,0 +1,183 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.fakes import FakeEmbeddings
+from inference.deadline import Deadline, Hedger, current_deadline
+from inference.limiter import Overloaded
+from inference.registry import ModelRegistry
+from main import app
+from routers import predict
+
+
+def warm_hedger(delay=0.05, samples=5):
+    hedger = Hedger(min_samples=samples, min_delay=delay)
+    for _ in range(samples):
+        hedger.observe(delay)
+    return hedger
+
+
+@pytest.mark.anyio
+async def test_wait_for_times_out_and_closes_late_coroutines():
+    deadline = Deadline(0.05)
+    with pytest.raises(asyncio.TimeoutError):
+        await deadline.wait_for(asyncio.sleep(1))
+
+    coroutine = asyncio.sleep(0)
+    with pytest.raises(asyncio.TimeoutError):
+        await Deadline(0).wait_for(coroutine)
+    assert coroutine.cr_frame is None
+
+
+@pytest.mark.anyio
+async def test_wait_for_returns_the_result_in_time():
+    deadline = Deadline(1)
+    deadline.activate()
+
+    assert await deadline.wait_for(asyncio.sleep(0, result="done")) == "done"
+    assert current_deadline() is deadline
+
+
+@pytest.mark.anyio
+async def test_hedger_does_not_hedge_before_warm_up():
+    hedger = Hedger(min_samples=3, min_delay=0.01)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    assert hedger.delay() is None
+    assert await hedger.run(call) == "ok"
+    assert len(calls) == 1
+    assert hedger.counters == {"calls": 1, "hedged": 0, "hedge_wins": 0}
+
+
+@pytest.mark.anyio
+async def test_hedge_wins_and_the_slow_call_is_cancelled():
+    hedger = warm_hedger()
+    attempts = []
+
+    async def call():
+        attempt = len(attempts)
+        attempts.append("running")
+        try:
+            await asyncio.sleep(5 if attempt == 0 else 0.01)
+            return attempt
+        except asyncio.CancelledError:
+            attempts[attempt] = "cancelled"
+            raise
+
+    assert await hedger.run(call) == 1
+    await asyncio.sleep(0)
+    assert attempts == ["cancelled", "running"]
+    assert hedger.counters == {"calls": 1, "hedged": 1, "hedge_wins": 1}
+
+
+@pytest.mark.anyio
+async def test_failed_first_call_falls_back_to_the_hedge():
+    hedger = warm_hedger()
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        if len(attempts) == 1:
+            await asyncio.sleep(0.1)
+            raise RuntimeError("upstream error")
+        await asyncio.sleep(0.2)
+        return "hedge"
+
+    assert await hedger.run(call) == "hedge"
+    assert hedger.counters["hedge_wins"] == 1
+
+
+@pytest.mark.anyio
+async def test_error_is_raised_when_every_attempt_fails():
+    hedger = warm_hedger()
+
+    async def call():
+        await asyncio.sleep(0.1)
+        raise RuntimeError("upstream error")
+
+    with pytest.raises(RuntimeError):
+        await hedger.run(call)
+
+
+class FakeManager:
+    def __init__(self, behaviour="ok"):
+        self.behaviour = behaviour
+
+    async def apredict(self, text, context=None):
+        if self.behaviour == "hang":
+            await asyncio.sleep(60)
+        if self.behaviour == "overloaded":
+            raise Overloaded("openai/fake", retry_after=7, reason="queue_full")
+        if self.behaviour == "error":
+            raise ValueError("model error")
+        return {"id_pred": "fake", "result": "ham", "metadata": {}}
+
+
+@pytest.fixture
+def client_with(monkeypatch):
+    def build(**behaviours):
+        registry = ModelRegistry(behaviours)
+        for model_type, behaviour in behaviours.items():
+            registry.provide(model_type, FakeManager(behaviour))
+        monkeypatch.setattr(predict, "registry", registry)
+        monkeypatch.setattr(predict, "get_embedding_model", lambda model: FakeEmbeddings(latency=0))
+        monkeypatch.setattr(predict, "send_data_to_cosmos", lambda data: None)
+        return TestClient(app)
+    return build
+
+
+def post(client, timeout="0.3"):
+    return client.post("/predict", json={"text": "win a prize"}, headers={"X-Request-Timeout": timeout})
+
+
+def test_hanging_model_gives_a_partial_result(client_with):
+    response = post(client_with(**{"gpt-4o": "hang", "gpt-4o-mini": "ok"}))
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["gpt-4o"]["status"] == "timeout"
+    assert body["gpt-4o-mini"]["result"] == "ham"
+    assert body["deadline"] == {"seconds": 0.3, "partial": True, "failed": ["gpt-4o"]}
+
+
+def test_every_model_timing_out_gives_504(client_with):
+    response = post(client_with(**{"gpt-4o": "hang", "gpt-4o-mini": "hang"}))
+
+    assert response.status_code == 504
+
+
+def test_every_model_rejected_gives_503_with_retry_after(client_with):
+    response = post(client_with(**{"gpt-4o": "overloaded", "gpt-4o-mini": "overloaded"}))
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+
+
+def test_model_error_is_kept_over_a_timeout(client_with, monkeypatch):
+    raised = []
+    original = predict._raise_if_nothing_finished
+
+    def spy(model_types, errors):
+        try:
+            original(model_types, errors)
+        except Exception as e:
+            raised.append(e)
+            raise
+
+    monkeypatch.setattr(predict, "_raise_if_nothing_finished", spy)
+    response = post(client_with(**{"gpt-4o": "hang", "gpt-4o-mini": "error"}))
+
+    assert response.status_code == 500
+    assert isinstance(raised[0], ValueError)
+
+
+def test_invalid_deadline_header_gives_400(client_with):
+    response = post(client_with(**{"gpt-4o": "ok"}), timeout="soon")
+
+    assert response.status_code == 400
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from benchmarks.fakes import FakeEmbeddings, fake_vector
+from inference.cache import LRUCache
+from inference.embeddings import CachedEmbeddings, _entry_bytes
+
+
+def test_lru_cache_evicts_by_bytes():
+    cache = LRUCache(maxsize=None, maxbytes=100, sizeof=len)
+    cache.set("a", "x" * 40)
+    cache.set("b", "x" * 40)
+    cache.set("c", "x" * 40)
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
+    assert cache.nbytes == 80
+
+    cache.set("b", "x" * 10)
+    assert cache.nbytes == 50
+
+
+def test_memory_tier_holds_float32_arrays_and_returns_lists(tmp_path):
+    embeddings = CachedEmbeddings(FakeEmbeddings(latency=0), model="fake", disk_path=tmp_path)
+
+    first = embeddings.embed_documents(["hola", "hola", "adios"])
+    second = embeddings.embed_query("hola")
+
+    assert embeddings.embeddings.calls == 1
+    assert isinstance(first[0], list) and first[0] == first[1] == second
+    assert np.allclose(first[2], fake_vector("adios"))
+    stored = embeddings.memory.get(next(iter(embeddings.memory._data)))
+    assert isinstance(stored, np.ndarray) and stored.dtype == np.float32
+    assert embeddings.memory.nbytes == 2 * _entry_bytes(stored)
+
+
+@pytest.mark.anyio
+async def test_disk_hits_are_promoted_as_arrays(tmp_path):
+    CachedEmbeddings(FakeEmbeddings(latency=0), model="fake", disk_path=tmp_path).embed_query("hola")
+    embeddings = CachedEmbeddings(FakeEmbeddings(latency=0), model="fake", disk_path=tmp_path)
+
+    vector = await embeddings.aembed_query("hola")
+
+    assert embeddings.embeddings.calls == 0
+    assert embeddings.disk_hits == 1
+    assert np.allclose(vector, fake_vector("hola"))
+
+
+def test_memory_tier_respects_its_byte_budget():
+    vector_bytes = _entry_bytes(np.zeros(1536, dtype=np.float32))
+    embeddings = CachedEmbeddings(FakeEmbeddings(latency=0), model="fake", memory_maxbytes=3 * vector_bytes)
+
+    embeddings.embed_documents([f"text {i}" for i in range(10)])
+
+    assert len(embeddings.memory) == 3
+    assert embeddings.memory.nbytes <= 3 * vector_bytes
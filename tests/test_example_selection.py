@@ -0,0 +1,65 @@
+from inference.genai.selection import ExampleSelector
+
+SPAM = [
+    "WINNER you have been selected for a cash prize call now",
+    "Claim your free cruise today reply YES to this number",
+    "URGENT your account is locked verify your PIN at the link",
+    "Txt WIN to 80086 for a chance at a brand new phone",
+    "Congratulations you won a 1000 pound voucher text CLAIM",
+    "Your loan is pre approved with no credit check apply today",
+    "Final notice your package fee is unpaid pay at the website",
+    "Hot singles in your area are waiting chat free tonight",
+    "Exclusive offer 90 percent discount on designer watches",
+    "You have an unclaimed tax refund submit your bank details",
+    "Get paid 500 dollars a day working from home sign up",
+]
+HAM = [
+    "Are we still meeting for lunch tomorrow at noon",
+    "Can you pick up milk on the way home please",
+    "Thanks for yesterday it was great to see everyone",
+    "Running ten minutes late save me a seat at the back",
+    "Did you finish the slides for the quarterly review",
+    "Mum says dinner is at seven and bring the kids",
+    "The train is delayed so I will call you from the station",
+    "Happy birthday hope you have a lovely day with family",
+    "I left the keys under the mat when I went out",
+    "Let me know when you land and I will pick you up",
+]
+
+
+def long_message(text):
+    # About 40 tokens per example, so the budget binds well before max_examples.
+    return " ".join([text] * 3)[:150]
+
+
+def documents():
+    # Every spam document ranks above every ham one.
+    spam = [{"message": long_message(text), "label": "spam", "score": 2.0 - i * 0.01} for i, text in enumerate(SPAM)]
+    ham = [{"message": long_message(text), "label": "ham", "score": 1.0 - i * 0.01} for i, text in enumerate(HAM)]
+    return spam + ham
+
+
+def test_label_share_is_kept_within_the_token_budget():
+    selected, report = ExampleSelector(token_budget=400, max_examples=20, max_label_share=0.7).select(documents())
+
+    assert report["example_tokens"] <= 400
+    assert len(selected) < len(SPAM)
+    assert report["labels"]["ham"] > 0
+    assert report["labels"]["spam"] <= -(-0.7 * len(selected) // 1)
+
+
+def test_cap_is_lifted_when_the_other_label_is_exhausted():
+    docs = documents()[:len(SPAM) + 1]
+    selected, report = ExampleSelector(token_budget=10000, max_examples=20, max_label_share=0.7).select(docs)
+
+    assert report["labels"] == {"spam": len(SPAM), "ham": 1}
+
+
+def test_documents_skipped_for_budget_no_longer_hold_the_cap():
+    docs = documents()[:len(SPAM)]
+    # A ham example that never fits the budget.
+    docs.append({"message": " ".join(HAM * 10), "label": "ham", "score": 3.0})
+    selected, report = ExampleSelector(token_budget=400, max_examples=20, max_label_share=0.7).select(docs)
+
+    assert "ham" not in report["labels"]
+    assert report["labels"]["spam"] == len(selected) >= 8
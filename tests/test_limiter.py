@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from inference.deadline import Deadline
+from inference.limiter import AdaptiveLimiter, Overloaded
+
+
+def limiter(**options):
+    return AdaptiveLimiter("test", **{"initial_limit": 1, "min_limit": 1, "max_limit": 1, **options})
+
+
+@pytest.mark.anyio
+async def test_expired_deadline_is_a_timeout_not_an_overload():
+    Deadline(0).activate()
+    upstream = limiter()
+
+    with pytest.raises(asyncio.TimeoutError):
+        async with upstream.slot():
+            pass
+
+    assert upstream.counters["deadline_expired"] == 1
+    assert upstream.counters["accepted"] == 0
+
+
+@pytest.mark.anyio
+async def test_deadline_ending_in_the_queue_is_a_timeout():
+    upstream = limiter(queue_timeout=5.0)
+    await upstream.acquire()
+    Deadline(0.05).activate()
+
+    with pytest.raises(asyncio.TimeoutError) as raised:
+        await upstream.acquire()
+
+    assert not isinstance(raised.value, Overloaded)
+    assert upstream.counters["deadline_expired"] == 1
+    assert upstream.counters["rejected_timeout"] == 0
+    assert upstream.stats()["queue_depth"] == 0
+
+
+@pytest.mark.anyio
+async def test_full_limiter_is_rejected_as_overloaded():
+    upstream = limiter(queue_timeout=0.05, max_queue=1)
+    Deadline(10).activate()
+    await upstream.acquire()
+    waiter = asyncio.create_task(upstream.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(Overloaded) as full:
+        await upstream.acquire()
+    with pytest.raises(Overloaded) as slow:
+        await waiter
+
+    assert full.value.reason == "queue_full"
+    assert slow.value.reason == "timeout"
+    assert upstream.counters["deadline_expired"] == 0
@@ -0,0 +1,55 @@
+import json
+import threading
+
+import pytest
+
+from benchmarks.fakes import FakeEmbeddings, fake_vector
+from inference.genai import local_index
+from inference.genai.local_index import LocalSearch, build_index, current_index_path
+
+
+def write_snapshot(path, messages):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, message in enumerate(messages):
+            f.write(json.dumps({"message": message, "label": "spam" if i % 2 else "ham", "main_vector": fake_vector(message)}) + "\n")
+
+
+def test_builds_in_the_same_second_get_distinct_versions(tmp_path):
+    snapshot = tmp_path / "snapshot.jsonl"
+    write_snapshot(snapshot, ["hola", "win a prize"])
+
+    first = build_index(snapshot, tmp_path / "index")
+    second = build_index(snapshot, tmp_path / "index")
+
+    assert first != second
+    assert current_index_path(tmp_path / "index") == second
+
+
+@pytest.mark.anyio
+async def test_new_version_is_loaded_off_the_loop_and_swapped(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_index, "get_embedding_model", lambda model: FakeEmbeddings(latency=0))
+    root = tmp_path / "index"
+    snapshot = tmp_path / "snapshot.jsonl"
+    write_snapshot(snapshot, ["hola", "win a prize"])
+    build_index(snapshot, root)
+    search = LocalSearch(root, reload_interval=0)
+
+    write_snapshot(snapshot, ["hola", "win a prize", "claim your cash now"])
+    new_path = build_index(snapshot, root)
+    loader_threads = []
+    original_init = local_index.LocalVectorIndex.__init__
+
+    def init(self, path):
+        loader_threads.append(threading.current_thread())
+        original_init(self, path)
+
+    monkeypatch.setattr(local_index.LocalVectorIndex, "__init__", init)
+
+    # Served by the old version while the new one loads.
+    results = await search.search("claim cash", top=5)
+    assert len(results) == 2
+    await search._reload_task
+
+    assert loader_threads and all(thread is not threading.main_thread() for thread in loader_threads)
+    assert search.index.path == new_path
+    assert len(await search.search("claim cash", top=5)) == 3
@@ -0,0 +1,142 @@
+import asyncio
+import json
+
+import pytest
+
+from inference.monitoring import MonitoringWriter
+
+
+class FakeCosmosError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class FakeContainer:
+    """
+    Stand-in for the Cosmos DB container: keeps the created items, fails
+    the first `failures` calls and answers 409 for ids already written.
+    """
+    def __init__(self, failures=0, latency=0.0):
+        self.failures = failures
+        self.latency = latency
+        self.items = {}
+        self.calls = 0
+        self.batches = []
+
+    async def create_item(self, body):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.failures > 0:
+            self.failures -= 1
+            raise FakeCosmosError(503)
+        if body["id"] in self.items:
+            raise FakeCosmosError(409)
+        self.items[body["id"]] = body
+        return body
+
+
+def writer_for(container, **options):
+    options = {"flush_interval": 0.05, "retry_base_delay": 0.0, "replay_interval": 3600, **options}
+    return MonitoringWriter(lambda: container, **options)
+
+
+def records(n, start=0):
+    return [{"id": str(i), "result": "spam"} for i in range(start, start + n)]
+
+
+@pytest.mark.anyio
+async def test_records_are_written_in_batches():
+    container = FakeContainer()
+    writer = writer_for(container, batch_size=10)
+    await writer.start()
+    original_write = writer._write
+    batch_sizes = []
+
+    async def write(batch):
+        batch_sizes.append(len(batch))
+        return await original_write(batch)
+
+    writer._write = write
+    for record in records(25):
+        assert writer.submit(record)
+    await writer.stop()
+
+    assert len(container.items) == 25
+    assert batch_sizes == [10, 10, 5]
+    assert writer.counters["written"] == 25
+
+
+@pytest.mark.anyio
+async def test_failed_records_are_spilled_and_replayed(tmp_path):
+    spill_path = tmp_path / "spill.jsonl"
+    # Every attempt of the first flush fails: 1 try + 2 retries, 3 records each.
+    container = FakeContainer(failures=9)
+    writer = writer_for(container, batch_size=3, max_retries=2, spill_path=spill_path)
+    await writer.start()
+    for record in records(3):
+        writer.submit(record)
+    await writer.stop()
+
+    assert container.items == {}
+    assert writer.counters["failed"] == 3
+    assert writer.counters["spilled"] == 3
+    assert [json.loads(line)["id"] for line in spill_path.read_text().splitlines()] == ["0", "1", "2"]
+
+    await writer.start()
+    await writer.replay()
+    await writer.stop()
+
+    assert sorted(container.items) == ["0", "1", "2"]
+    assert writer.counters["replayed"] == 3
+    assert not spill_path.exists()
+    assert not spill_path.with_suffix(".jsonl.replaying").exists()
+
+
+@pytest.mark.anyio
+async def test_conflicts_count_as_written():
+    container = FakeContainer()
+    container.items["1"] = {"id": "1"}
+    writer = writer_for(container, batch_size=5, max_retries=0)
+    await writer.start()
+    for record in records(3):
+        writer.submit(record)
+    await writer.stop()
+
+    assert writer.counters["written"] == 3
+    assert writer.counters["failed"] == 0
+
+
+@pytest.mark.anyio
+async def test_full_queue_drops_new_records():
+    container = FakeContainer()
+    writer = writer_for(container, max_queue_size=5, batch_size=100)
+    await writer.start()
+    # Nothing runs in between, so the writer task cannot drain the queue.
+    accepted = [writer.submit(record) for record in records(8)]
+    await writer.stop()
+
+    assert accepted == [True] * 5 + [False] * 3
+    assert writer.counters["dropped"] == 3
+    assert sorted(container.items, key=int) == [str(i) for i in range(5)]
+
+
+@pytest.mark.anyio
+async def test_stop_flushes_queued_records():
+    container = FakeContainer(latency=0.01)
+    writer = writer_for(container, batch_size=50, flush_interval=60)
+    await writer.start()
+    for record in records(20):
+        writer.submit(record)
+    await writer.stop()
+
+    assert len(container.items) == 20
+    assert writer.stats()["queued"] == 0
+    assert not writer.submit({"id": "late"})
+
+
+def test_submit_before_start_drops_the_record():
+    writer = writer_for(FakeContainer())
+
+    assert not writer.submit({"id": "0"})
+    assert writer.counters["dropped"] == 1
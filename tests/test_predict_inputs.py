@@ -0,0 +1,45 @@
+import io
+from tempfile import SpooledTemporaryFile
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from inference.images import ImagePreprocessor
+from main import app
+
+
+def jpeg(side):
+    pixels = np.random.default_rng(0).integers(0, 255, (side, side, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("side", [64, 3000])
+def test_prepare_file_matches_prepare_bytes(side):
+    data = jpeg(side)
+    preprocessor = ImagePreprocessor()
+    with SpooledTemporaryFile(max_size=1024) as file:
+        file.write(data)
+        from_file = preprocessor.prepare_file(file)
+    from_bytes = preprocessor.prepare_bytes(data)
+
+    assert from_file.describe() == from_bytes.describe()
+    assert from_file.data == from_bytes.data
+    assert (from_file.digest, from_file.perceptual_hash) == (from_bytes.digest, from_bytes.perceptual_hash)
+
+
+@pytest.mark.parametrize("body", [{}, {"text": None}, {"text": ""}, {"image": "aGVsbG8="}])
+def test_predict_without_text_is_rejected(body):
+    # No lifespan: the request must fail validation before any model is used.
+    response = TestClient(app).post("/predict", json=body)
+
+    assert response.status_code == 422
+
+
+def test_raw_image_without_text_is_rejected():
+    response = TestClient(app).post("/predict/image", content=jpeg(64), headers={"content-type": "image/jpeg"})
+
+    assert response.status_code == 422
@@ -0,0 +1,46 @@
+import pytest
+
+from inference.registry import ModelRegistry
+
+
+class FlakyLoader:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("transient")
+        return "model"
+
+
+@pytest.mark.anyio
+async def test_failed_load_is_retried_and_ready_recovers():
+    loader = FlakyLoader(failures=1)
+    registry = ModelRegistry(["flaky", "other"])
+    registry.register("flaky", loader)
+    registry.register("other", lambda: "other")
+
+    assert not registry.ready
+    await registry.start()
+    assert not registry.ready
+    assert registry.status()["models"]["flaky"]["state"] == "failed"
+    assert registry.loaded("flaky") is None
+
+    assert await registry.get("flaky") == "model"
+    assert loader.calls == 2
+    assert registry.ready and registry.status()["ready"]
+
+
+@pytest.mark.anyio
+async def test_successful_load_runs_once():
+    loader = FlakyLoader(failures=0)
+    registry = ModelRegistry(["model"])
+    registry.register("model", loader)
+
+    await registry.start()
+    await registry.get("model")
+
+    assert loader.calls == 1
+    assert registry.ready
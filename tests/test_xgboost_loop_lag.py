@@ -0,0 +1,16 @@
+import numpy as np
+import pytest
+
+from benchmarks.loop_lag import measure
+
+EMBEDDING_LATENCY = 0.1
+
+
+@pytest.mark.anyio
+async def test_concurrent_xgboost_predict_does_not_block_the_loop():
+    lags_ms, _ = await measure(n_requests=100, concurrency=20, embedding_latency=EMBEDDING_LATENCY, interval=0.005)
+
+    # Anything blocking the loop for an embedding call would show up as lag
+    # of the order of the embedding latency.
+    assert len(lags_ms) > 0
+    assert np.percentile(lags_ms, 99) < EMBEDDING_LATENCY * 1000 / 2
@@ -2,7 +2,8 @@ import pandas as pd
 from sklearn.model_selection import train_test_split
 
 from modeling.data import ingest_data
-from modeling.data import preprocess_text
+from modeling.data import preprocess_batch
+from modeling.preprocessing import ensure_stopwords
 from modeling.feature_engineering import create_features
 from modeling.train import train_model
 from modeling.eval import evaluate_model
@@ -15,9 +16,10 @@ config = load_config()
 
 def run_training_pipeline():
 
+    ensure_stopwords(download=True)
     df = ingest_data()
 
-    df['cleaned_message'] = df['message'].apply(preprocess_text)
+    df['cleaned_message'] = preprocess_batch(df['message'], n_jobs=config['training']['preprocess_jobs'])
 
     X = create_features(df['cleaned_message'])
     y = pd.get_dummies(df['label'], drop_first=True).values.ravel()